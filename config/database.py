@@ -0,0 +1,71 @@
+"""
+Configuração dos bancos de dados (DATABASES em config/settings.py).
+
+DB_ENGINE escolhe o banco: 'sqlite' (padrão, desenvolvimento) ou 'postgresql'.
+Nos dois casos as conexões são persistentes (DB_CONN_MAX_AGE segundos) e
+verificadas antes de serem reutilizadas por uma nova requisição
+(CONN_HEALTH_CHECKS), em vez de abrir uma conexão por requisição.
+
+No SQLite, `configure_sqlite_connection` aplica as pragmas de SQLITE_PRAGMAS a
+cada nova conexão (ligado ao sinal connection_created em core.apps):
+
+- journal_mode=WAL: leitores não bloqueiam o escritor e vice-versa;
+- synchronous=NORMAL: seguro com WAL, sem fsync a cada commit;
+- busy_timeout: espera pelo bloqueio de escrita em vez de falhar na hora;
+- mmap_size, cache_size e temp_store: leituras pela memória mapeada e
+  tabelas temporárias em memória.
+
+Mesmo com WAL só há um escritor por vez; as transações de escrita das views
+repetem com espera exponencial quando o banco está bloqueado (ver
+core.transactions.retry_on_lock).
+"""
+from decouple import config
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+    'temp_store': 'MEMORY',
+}
+
+
+def database_settings(base_dir):
+    """Retorna a configuração do banco `default` conforme DB_ENGINE."""
+    common = {
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+    if config('DB_ENGINE', default='sqlite') == 'postgresql':
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='cincocincojam2'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default='postgres'),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432', cast=int),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+            **common,
+        }
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': base_dir / 'db.sqlite3',
+        **common,
+    }
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Receptor de connection_created: aplica as pragmas às novas conexões SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+
+    from django.conf import settings
+
+    # Direto na conexão do driver: não entra na instrumentação de SQL da requisição
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -12,8 +12,11 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from decouple import config, Csv
 
+from config.database import SQLITE_PRAGMAS as DEFAULT_SQLITE_PRAGMAS, database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,8 +55,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -85,26 +91,105 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# For development, we'll use SQLite initially
-# In production or when ready, switch to PostgreSQL
+# SQLite em desenvolvimento; DB_ENGINE=postgresql (com DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST e DB_PORT) em produção. Conexões persistentes por
+# DB_CONN_MAX_AGE segundos; pragmas do SQLite em SQLITE_PRAGMAS (config.database)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(BASE_DIR),
 }
+SQLITE_PRAGMAS = dict(DEFAULT_SQLITE_PRAGMAS)
+
+# Transações de escrita das views (core.transactions.retry_on_lock): novas
+# tentativas quando o banco está bloqueado e espera inicial (segundos), dobrada a cada tentativa
+DB_LOCK_RETRIES = config('DB_LOCK_RETRIES', default=5, cast=int)
+DB_LOCK_RETRY_DELAY = config('DB_LOCK_RETRY_DELAY', default=0.05, cast=float)
+
+# Réplicas de leitura (core.routers): lista separada por vírgulas de arquivos
+# SQLite ou, com PostgreSQL, de hosts que compartilham as credenciais do
+# primário. As views somente leitura (catálogo, detalhes do curso e dashboards)
+# leem de uma réplica; após uma escrita, as leituras do usuário ficam no
+# primário por DATABASE_REPLICA_STICKY_SECONDS segundos.
+DATABASE_REPLICAS = []
+for _index, _location in enumerate(config('DB_REPLICAS', default='', cast=Csv())):
+    _alias = f'replica_{_index + 1}'
+    _key = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        _key: _location,
+        # Nos testes, a réplica usa a conexão do banco de teste do primário
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+
+# Nos testes há sempre uma réplica espelhando o primário, fora de
+# DATABASE_REPLICAS: os testes do roteamento a ativam com override_settings
+TEST_REPLICA_ALIAS = 'replica_test'
+if sys.argv[1:2] == ['test']:
+    DATABASES[TEST_REPLICA_ALIAS] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Em desenvolvimento usa memória local (locmem) ou arquivos (file); em produção,
+# um servidor compatível com Redis (CACHE_BACKEND=redis e CACHE_LOCATION=redis://...)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_LOCATION', default='redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'cincocincojam',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache')),
+            'KEY_PREFIX': 'cincocincojam',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cincocincojam',
+            'KEY_PREFIX': 'cincocincojam',
+        }
+    }
 
-# Configuração para PostgreSQL (descomente quando estiver pronto para usar)
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': config('DB_NAME', default='cincocincojam2'),
-#         'USER': config('DB_USER', default='postgres'),
-#         'PASSWORD': config('DB_PASSWORD', default='postgres'),
-#         'HOST': config('DB_HOST', default='localhost'),
-#         'PORT': config('DB_PORT', default='5432', cast=int),
-#     }
-# }
+# Tempo de vida (segundos) dos dados de cursos e aulas em cache (courses.cache)
+COURSE_CACHE_TIMEOUT = config('COURSE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+# Intervalo máximo (segundos) entre os envios dos contadores de acertos e falhas
+# de cada processo ao cache compartilhado (0 envia a cada acesso)
+COURSE_CACHE_STATS_FLUSH_INTERVAL = config('COURSE_CACHE_STATS_FLUSH_INTERVAL', default=10, cast=int)
+
+# Cache de páginas públicas para visitantes anônimos (core.response_cache):
+# validade das respostas (0 desativa) e espera máxima enquanto outra requisição
+# renderiza a mesma página
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=60 * 5, cast=int)
+RESPONSE_CACHE_LOCK_WAIT = 5
+RESPONSE_CACHE_LOCK_TIMEOUT = 30
+
+# Heartbeats do player (courses.heartbeats): buffer 'local' (por processo, com
+# thread de descarga) ou 'cache' (compartilhado; descarregado pelo comando
+# flush_heartbeats --interval N)
+HEARTBEAT_BUFFER = config('HEARTBEAT_BUFFER', default='local')
+HEARTBEAT_BUFFER_MAX_EVENTS = config('HEARTBEAT_BUFFER_MAX_EVENTS', default=10000, cast=int)
+HEARTBEAT_FLUSH_INTERVAL = config('HEARTBEAT_FLUSH_INTERVAL', default=10, cast=int)
+HEARTBEAT_MAX_SECONDS = 60
+# Segundos que a descarga do buffer 'cache' espera por um evento numerado mas
+# ainda não gravado antes de contá-lo como perdido
+HEARTBEAT_QUEUE_GRACE = 5
+
+# Idade máxima (segundos) do snapshot de estatísticas do dashboard administrativo
+# (comando refresh_platform_stats); 0 calcula os totais a cada acesso
+PLATFORM_STATS_MAX_AGE = config('PLATFORM_STATS_MAX_AGE', default=60 * 60, cast=int)
 
 
 # Password validation
@@ -151,10 +236,47 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic gera nomes com hash e variantes .gz/.br (core.staticfiles); o
+# StaticFilesMiddleware serve STATIC_ROOT com cache imutável, sem servidor web à
+# parte. Arquivos sem hash no nome usam STATIC_MAX_AGE segundos.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+STATIC_SERVE = config('STATIC_SERVE', default=not DEBUG, cast=bool)
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Derivadas responsivas das imagens enviadas (core.images): larguras por campo,
+# cada uma em JPEG/PNG e WebP. Com IMAGE_DERIVATIVES_ASYNC, a geração ocorre em
+# uma thread do processo após o commit; sem, dentro da própria requisição.
+IMAGE_DERIVATIVES = {
+    'courses.Course.image': (320, 640, 960, 1280),
+    'core.User.profile_image': (64, 128, 256),
+}
+IMAGE_DERIVATIVES_ASYNC = config('IMAGE_DERIVATIVES_ASYNC', default=True, cast=bool)
+IMAGE_DERIVATIVE_QUALITY = 82
+IMAGE_DERIVATIVE_WEBP_QUALITY = 80
+
+# Fila de tarefas em segundo plano no banco de dados (core.taskqueue), executada
+# pelo comando run_worker. Com TASKS_EAGER (padrão no DEBUG), as tarefas rodam no
+# próprio processo após o commit, sem worker. Tempos em segundos: tarefas em
+# execução há mais de TASK_LOCK_TIMEOUT voltam para a fila; falhas são repetidas
+# com espera exponencial a partir de TASK_RETRY_BACKOFF; as concluídas são
+# removidas após TASK_RETENTION
+TASKS_EAGER = config('TASKS_EAGER', default=DEBUG, cast=bool)
+TASK_LOCK_TIMEOUT = config('TASK_LOCK_TIMEOUT', default=60 * 10, cast=int)
+TASK_RETRY_BACKOFF = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_RETENTION = 60 * 60 * 24 * 7
+
+# Identificador da versão publicada (ex.: o commit do deploy), incluído nas ETags
+# das páginas (core.conditional) para invalidar as cópias dos navegadores
+RELEASE_VERSION = config('RELEASE_VERSION', default='')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -170,3 +292,40 @@ LOGOUT_REDIRECT_URL = 'login'
 
 # Para usar modelo de usuário customizado (será criado no app core)
 AUTH_USER_MODEL = 'core.User'
+
+# Busca do catálogo de cursos (courses.search). Sem valor, o backend é escolhido
+# pelo banco de dados: FTS5 no SQLite e tsvector no PostgreSQL.
+COURSE_SEARCH_BACKEND = config('COURSE_SEARCH_BACKEND', default=None)
+
+# Instrumentação de SQL por requisição (core.instrumentation). Orçamentos por nome
+# de URL; views sem entrada usam SQL_QUERY_BUDGET_DEFAULT (None = sem limite)
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=DEBUG, cast=bool)
+SQL_QUERY_BUDGET_DEFAULT = None
+SQL_QUERY_BUDGETS = {
+    'courses:student:course_list': 8,
+    'courses:student:course_detail': 8,
+    'courses:student:course_learn': 10,
+    'courses:student:dashboard': 8,
+    'courses:course_list': 8,
+    'courses:dashboard': 8,
+    'users:dashboard': 8,
+}
+SQL_REPEATED_QUERY_THRESHOLD = config('SQL_REPEATED_QUERY_THRESHOLD', default=5, cast=int)
+SQL_BUDGET_STRICT = config('SQL_BUDGET_STRICT', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': config('SQL_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
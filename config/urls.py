@@ -18,10 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.generic import TemplateView
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LoginView, LogoutView, PasswordResetView
 from django.shortcuts import redirect
 
+from core.views import HomeView
+from users.forms import QueuedPasswordResetForm
+
 # View personalizada para redirecionar para o dashboard apropriado com base no tipo de usuário
 def dashboard_redirect(request):
     if request.user.is_authenticated:
@@ -39,6 +41,12 @@ urlpatterns = [
     # Authentication
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    # O email de redefinição de senha é enviado pela fila de tarefas (run_worker)
+    path(
+        'accounts/password_reset/',
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
+        name='password_reset'
+    ),
     path('accounts/', include('django.contrib.auth.urls')),  # Inclui reset de senha e outras URLs de autenticação
     
     # Dashboard redirect
@@ -51,7 +59,7 @@ urlpatterns = [
     path('courses/', include('courses.urls')),
     
     # Home page
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('', HomeView.as_view(), name='home'),
 ]
 
 # Serve media files in development
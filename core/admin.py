@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .models import User
+from .models import Task, User
 
 
 @admin.register(User)
@@ -27,3 +29,30 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('email', 'password1', 'password2', 'user_type', 'first_name', 'last_name'),
         }),
     )
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Acompanhamento da fila de tarefas em segundo plano (core.taskqueue).
+    """
+    list_display = ('name', 'queue', 'status', 'priority', 'attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'queue', 'name')
+    search_fields = ('name', 'dedup_key', 'last_error')
+    ordering = ('-created_at',)
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    actions = ['requeue_tasks']
+    
+    @admin.action(description=_('Reenfileirar as tarefas selecionadas'))
+    def requeue_tasks(self, request, queryset):
+        requeued = 0
+        for task in queryset.exclude(status__in=[Task.Status.PENDING, Task.Status.RUNNING]):
+            try:
+                with transaction.atomic():
+                    requeued += Task.objects.filter(pk=task.pk).update(
+                        status=Task.Status.PENDING, run_at=timezone.now(), attempts=0, finished_at=None
+                    )
+            except IntegrityError:
+                # Já existe uma tarefa pendente com a mesma chave de deduplicação
+                continue
+        self.message_user(request, _('%d tarefa(s) reenfileirada(s).') % requeued)
@@ -7,5 +7,13 @@ class CoreConfig(AppConfig):
     verbose_name = 'Núcleo'
 
     def ready(self):
-        # Importar sinais caso necessário no futuro
-        pass
+        from django.db.backends.signals import connection_created
+
+        from config.database import configure_sqlite_connection
+
+        # Pragmas do SQLite (WAL, busy_timeout...) em cada nova conexão
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='core.sqlite_pragmas')
+
+        # Derivadas responsivas das imagens enviadas (IMAGE_DERIVATIVES)
+        from .images import connect_signals
+        connect_signals()
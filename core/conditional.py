@@ -0,0 +1,58 @@
+"""
+GET condicional (ETag) para views baseadas em classe.
+
+A view informa em `get_validator()` uma tupla barata de calcular (tipicamente
+uma consulta de agregação com o maior `updated_at` e contadores) que muda
+sempre que o conteúdo da página muda. O ConditionalGetMixin deriva dela uma
+ETag fraca e, se o cliente enviar a mesma ETag em If-None-Match, responde 304
+sem executar get_context_data() nem renderizar o template.
+
+A ETag também inclui o usuário, o segredo CSRF (o token dos formulários da
+página) e RELEASE_VERSION, para que uma nova versão dos templates invalide as
+cópias dos navegadores. Requisições com mensagens pendentes sempre renderizam a
+página, para não deixar de exibi-las.
+
+Somente a ETag é enviada: exclusões e contadores não se refletem no maior
+`updated_at`, então um Last-Modified poderia validar uma cópia desatualizada.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+
+class ConditionalGetMixin:
+    """Responde 304 ao GET quando a ETag do cliente corresponde ao validador da view."""
+
+    def get_validator(self):
+        """Tupla que identifica o conteúdo atual da página, ou None para não validar."""
+        return None
+
+    def get_etag(self):
+        validator = self.get_validator()
+        if validator is None:
+            return None
+        user = self.request.user
+        parts = (
+            getattr(settings, 'RELEASE_VERSION', ''),
+            user.pk if user.is_authenticated else None,
+            self.request.META.get('CSRF_COOKIE', ''),
+            *validator,
+        )
+        return 'W/' + quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag = None if len(get_messages(request)) else self.get_etag()
+        if etag:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+        response = super().get(request, *args, **kwargs)
+        if etag:
+            response['ETag'] = etag
+            # O navegador guarda a página, mas revalida a cada acesso
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
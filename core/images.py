@@ -0,0 +1,308 @@
+"""
+Derivadas responsivas das imagens enviadas (capas de cursos e fotos de perfil).
+
+Cada campo configurado em IMAGE_DERIVATIVES ('app.Modelo.campo': larguras)
+ganha, para cada largura (limitada à largura do original), uma versão no
+formato de fallback (JPEG, ou PNG se a imagem tiver transparência) e outra em
+WebP. Os arquivos ficam ao lado do original, com o hash do conteúdo no nome:
+
+    course_images/violao.jpg
+    course_images/violao.3f2a1b9c0d12.320w.jpg
+    course_images/violao.3f2a1b9c0d12.320w.webp
+
+Como o nome depende do conteúdo, os arquivos podem ser servidos com cache
+de longa duração e uma imagem nova nunca reaproveita uma derivada antiga.
+
+A lista das derivadas (o "manifesto") fica no campo JSON `<campo>_derivatives`
+do próprio registro, de modo que os templates montam o `srcset` sem acessar o
+storage. A geração ocorre fora da requisição: ao salvar um registro com uma
+imagem nova, o trabalho é agendado para depois do commit em uma thread do
+processo (IMAGE_DERIVATIVES_ASYNC) e o manifesto é gravado com um UPDATE que
+só vale se a imagem ainda for a mesma. Até lá, os templates usam o original.
+O comando `regenerate_derivatives` processa as imagens existentes em um pool
+de processos.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Caracteres do hash do conteúdo usados nos nomes das derivadas
+HASH_LENGTH = 12
+
+# Enviado após gravar o manifesto de um registro (sender = modelo, pk = registro)
+derivatives_generated = Signal()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_specs():
+    """Retorna [(modelo, campo, larguras)] dos campos configurados em IMAGE_DERIVATIVES."""
+    specs = []
+    for label, widths in _setting('IMAGE_DERIVATIVES', {}).items():
+        app_label, model_name, field = label.split('.')
+        specs.append((apps.get_model(app_label, model_name), field, tuple(sorted(widths))))
+    return specs
+
+
+def manifest_field(field):
+    """Nome do campo JSON com o manifesto das derivadas de `field`."""
+    return f'{field}_derivatives'
+
+
+def _widths_for(model, field):
+    for spec_model, spec_field, widths in get_specs():
+        if spec_model is model and spec_field == field:
+            return widths
+    return ()
+
+
+def derivative_name(source, digest, width, extension):
+    """Nome da derivada: mesmo diretório e nome do original, com hash e largura."""
+    directory, filename = posixpath.split(source)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, f'{stem}.{digest}.{width}w.{extension}')
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, image_format):
+    output = BytesIO()
+    if image_format == 'JPEG':
+        image.save(output, 'JPEG', quality=_setting('IMAGE_DERIVATIVE_QUALITY', 82), optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(output, 'WEBP', quality=_setting('IMAGE_DERIVATIVE_WEBP_QUALITY', 80), method=4)
+    else:
+        image.save(output, image_format, optimize=True)
+    return output.getvalue()
+
+
+def build_derivatives(source, widths, storage, overwrite=False):
+    """
+    Gera as derivadas do arquivo `source` e retorna o manifesto. Arquivos que
+    já existem (mesmo conteúdo, mesma largura) são mantidos, salvo `overwrite`.
+    """
+    with storage.open(source, 'rb') as handle:
+        content = handle.read()
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+    image = Image.open(BytesIO(content))
+    # Decodifica JPEGs já reduzidos quando a maior derivada é bem menor que o original
+    image.draft(image.mode, (widths[-1], widths[-1]))
+    image = ImageOps.exif_transpose(image)
+
+    if _has_alpha(image):
+        image = image.convert('RGBA')
+        fallback_format, fallback_extension = 'PNG', 'png'
+    else:
+        image = image.convert('RGB')
+        fallback_format, fallback_extension = 'JPEG', 'jpg'
+
+    manifest = {
+        'source': source,
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'fallback': [],
+        'webp': [],
+    }
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = None
+        for key, image_format, extension in (
+            ('fallback', fallback_format, fallback_extension),
+            ('webp', 'WEBP', 'webp'),
+        ):
+            name = derivative_name(source, digest, width, extension)
+            if overwrite or not storage.exists(name):
+                if resized is None:
+                    resized = image if width == image.width else image.resize(
+                        (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+                    )
+                if storage.exists(name):
+                    storage.delete(name)
+                name = storage.save(name, ContentFile(_encode(resized, image_format)))
+            manifest[key].append([width, name])
+    return manifest
+
+
+def _derivative_names(manifest):
+    return {name for key in ('fallback', 'webp') for _, name in (manifest or {}).get(key, [])}
+
+
+def apply_manifest(model, pk, field, source, manifest, previous=None):
+    """
+    Grava o manifesto no registro se a imagem ainda for `source` e remove as
+    derivadas do manifesto anterior que deixaram de ser usadas. Retorna True
+    se o registro foi atualizado.
+    """
+    rows = model._default_manager.filter(pk=pk)
+    if source:
+        rows = rows.filter(**{field: source})
+    else:
+        rows = rows.filter(Q(**{field: ''}) | Q(**{f'{field}__isnull': True}))
+    updated = rows.update(**{manifest_field(field): manifest})
+
+    if updated:
+        storage = model._meta.get_field(field).storage
+        for name in _derivative_names(previous) - _derivative_names(manifest):
+            try:
+                storage.delete(name)
+            except OSError:
+                logger.warning('Não foi possível remover a derivada %s', name)
+        derivatives_generated.send(sender=model, pk=pk, field=field)
+    return bool(updated)
+
+
+def generate_derivatives(model, pk, field, overwrite=False):
+    """Gera as derivadas da imagem atual do registro e grava o manifesto."""
+    row = model._default_manager.filter(pk=pk).values_list(field, manifest_field(field)).first()
+    if row is None:
+        return False
+    source, previous = row
+    manifest = {}
+    if source:
+        storage = model._meta.get_field(field).storage
+        manifest = build_derivatives(source, _widths_for(model, field), storage, overwrite=overwrite)
+    return apply_manifest(model, pk, field, source, manifest, previous)
+
+
+def _run_job(model, pk, field):
+    try:
+        generate_derivatives(model, pk, field)
+    except Exception:
+        logger.exception('Falha ao gerar as derivadas de %s %s (%s)', model.__name__, pk, field)
+    finally:
+        connection.close()
+
+
+def setup_worker():
+    """Inicializa o Django nos processos do pool quando não herdado (spawn)."""
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def build_job(model_label, field, pk, source, overwrite=False):
+    """
+    Gera as derivadas de uma imagem em um processo do pool (comando
+    regenerate_derivatives). Retorna (pk, source, manifesto, erro); o
+    manifesto é gravado pelo processo principal.
+    """
+    model = apps.get_model(model_label)
+    try:
+        storage = model._meta.get_field(field).storage
+        manifest = build_derivatives(source, _widths_for(model, field), storage, overwrite=overwrite)
+    except Exception as error:
+        return pk, source, None, f'{type(error).__name__}: {error}'
+    return pk, source, manifest, None
+
+
+def _get_executor():
+    """Thread de geração do processo (uma por processo, inclusive após fork)."""
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def schedule_derivatives(model, pk, field):
+    """Agenda a geração das derivadas para depois do commit (em thread ou na hora)."""
+    def run():
+        if _setting('IMAGE_DERIVATIVES_ASYNC', True):
+            _get_executor().submit(_run_job, model, pk, field)
+        else:
+            generate_derivatives(model, pk, field)
+    transaction.on_commit(run)
+
+
+def _image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    for model, field, _ in get_specs():
+        if not isinstance(instance, model) or field in instance.get_deferred_fields():
+            continue
+        if update_fields and field not in update_fields:
+            continue
+        source = getattr(instance, field).name or ''
+        manifest = getattr(instance, manifest_field(field), None) or {}
+        if manifest.get('source', '') != source:
+            schedule_derivatives(model, instance.pk, field)
+
+
+def connect_signals():
+    """Conecta a geração de derivadas ao post_save dos modelos configurados."""
+    for model, field, _ in get_specs():
+        post_save.connect(_image_saved, sender=model, dispatch_uid=f'core.images.{model._meta.label}.{field}')
+
+
+class ImageDerivatives:
+    """Acesso às derivadas de uma imagem (FieldFile) para os templates."""
+
+    def __init__(self, fieldfile):
+        self.file = fieldfile
+        manifest = {}
+        if fieldfile:
+            manifest = getattr(fieldfile.instance, manifest_field(fieldfile.field.name), None) or {}
+        # Manifesto de uma imagem anterior (a nova ainda está sendo gerada) é ignorado
+        self.manifest = manifest if fieldfile and manifest.get('source') == fieldfile.name else {}
+
+    def __bool__(self):
+        return bool(self.file)
+
+    @property
+    def is_ready(self):
+        return bool(self.manifest.get('fallback'))
+
+    def _url(self, name):
+        return self.file.storage.url(name)
+
+    def _srcset(self, key):
+        return ', '.join(f'{self._url(name)} {width}w' for width, name in self.manifest.get(key, []))
+
+    @property
+    def srcset(self):
+        return self._srcset('fallback')
+
+    @property
+    def webp_srcset(self):
+        return self._srcset('webp')
+
+    def url(self, width=None):
+        """
+        URL da menor derivada com pelo menos `width` pixels (sem `width`, a
+        maior); o original enquanto as derivadas não existem.
+        """
+        if not self.is_ready:
+            return self.file.url if self.file else ''
+        derivatives = self.manifest['fallback']
+        if width:
+            for derivative_width, name in derivatives:
+                if derivative_width >= int(width):
+                    return self._url(name)
+        return self._url(derivatives[-1][1])
@@ -0,0 +1,171 @@
+"""
+Instrumentação de SQL por requisição.
+
+O QueryInstrumentationMiddleware registra, para cada requisição, o número de
+consultas, o tempo total de SQL e as "formas" de consulta repetidas (a mesma
+instrução com parâmetros diferentes, típica de N+1). O resultado é registrado
+em JSON no logger `core.instrumentation`, marcado com o nome da URL.
+
+Configurações (todas opcionais):
+
+- SQL_INSTRUMENTATION: ativa o middleware (padrão: DEBUG);
+- SQL_QUERY_BUDGETS: dicionário {nome da URL: máximo de consultas};
+- SQL_QUERY_BUDGET_DEFAULT: orçamento das views sem entrada própria (None = sem limite);
+- SQL_REPEATED_QUERY_THRESHOLD: número máximo de repetições da mesma forma (padrão: 5);
+- SQL_BUDGET_STRICT: levanta SQLBudgetExceeded em vez de emitir um aviso,
+  o que faz os testes falharem quando o orçamento é excedido.
+
+O QueryRecorder também pode ser usado diretamente em testes e comandos.
+"""
+import json
+import logging
+import re
+import time
+import warnings
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Literais e listas de placeholders que variam entre execuções da mesma consulta
+STRING_REGEX = re.compile(r"'(?:[^']|'')*'")
+NUMBER_REGEX = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_REGEX = re.compile(r'\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)')
+SPACE_REGEX = re.compile(r'\s+')
+
+
+class SQLBudgetWarning(UserWarning):
+    """Uma requisição excedeu o orçamento de consultas ou repetiu a mesma consulta."""
+
+
+class SQLBudgetExceeded(Exception):
+    """Levantada no lugar do aviso quando SQL_BUDGET_STRICT está ativo."""
+
+
+def fingerprint(sql):
+    """Normaliza a instrução SQL para agrupar execuções com parâmetros diferentes."""
+    sql = STRING_REGEX.sub('?', sql)
+    sql = NUMBER_REGEX.sub('?', sql)
+    sql = IN_LIST_REGEX.sub('(...)', sql)
+    return SPACE_REGEX.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    Context manager que registra as consultas executadas em todas as conexões.
+
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.duration, recorder.repeated(5)
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        """Tempo total de SQL, em segundos."""
+        return sum(duration for sql, duration in self.queries)
+
+    def repeated(self, threshold):
+        """Formas de consulta executadas mais de `threshold` vezes, com a contagem."""
+        counts = Counter(fingerprint(sql) for sql, duration in self.queries)
+        return {shape: count for shape, count in counts.most_common() if count > threshold}
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mede o SQL de cada requisição e aplica os orçamentos configurados.
+
+    Síncrono e assíncrono. As conexões são locais à thread; no modo assíncrono
+    o recorder é instalado pelo sync_to_async com thread_sensitive, na mesma
+    thread em que o ORM executa as consultas da requisição.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.process_queries(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self.process_queries(request, response, recorder)
+
+    def process_queries(self, request, response, recorder):
+        """Registra as consultas da requisição e verifica os orçamentos."""
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        threshold = getattr(settings, 'SQL_REPEATED_QUERY_THRESHOLD', 5)
+        budget = getattr(settings, 'SQL_QUERY_BUDGETS', {}).get(
+            url_name, getattr(settings, 'SQL_QUERY_BUDGET_DEFAULT', None)
+        )
+        repeated = recorder.repeated(threshold)
+
+        record = {
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_time_ms': round(recorder.duration * 1000, 2),
+            'budget': budget,
+            'repeated': repeated,
+        }
+        logger.debug(json.dumps(record))
+
+        problems = []
+        if budget is not None and recorder.count > budget:
+            problems.append(f'{recorder.count} consultas (orçamento: {budget})')
+        if repeated:
+            problems.append(f'{len(repeated)} consulta(s) repetida(s) mais de {threshold} vezes')
+        if problems:
+            message = f"{url_name or request.path}: {'; '.join(problems)}"
+            logger.warning(json.dumps(record))
+            if getattr(settings, 'SQL_BUDGET_STRICT', False):
+                raise SQLBudgetExceeded(message)
+            warnings.warn(message, SQLBudgetWarning)
+
+        response['X-SQL-Queries'] = str(recorder.count)
+        return response
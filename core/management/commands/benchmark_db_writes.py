@@ -0,0 +1,145 @@
+import logging
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from courses.cache import invalidate_enrolled_course_ids
+from courses.models import Course, Lesson, Enrollment, LessonProgress
+
+# Configuração anterior a config.database: journal de rollback, fsync a cada
+# commit, apenas o timeout padrão do driver e nenhuma nova tentativa
+BASELINE_SETTINGS = {
+    'SQLITE_PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'DB_LOCK_RETRIES': 0,
+}
+
+ENROLLMENT_FIELDS = ['completed_lessons_count', 'progress', 'status', 'completed_at', 'completion_bitmap']
+PROGRESS_FIELDS = ['is_completed', 'completed_at', 'last_accessed_at']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara conclusões de aula concorrentes (LessonCompleteView) no SQLite com a configuração '
+        'padrão e com WAL, pragmas e novas tentativas. Usa os dados existentes: execute '
+        'seed_load_data antes. As matrículas e os progressos alterados são restaurados ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Workers concorrentes (padrão: 16)')
+        parser.add_argument('--operations', type=int, default=25,
+                            help='Conclusões de aula por worker em cada configuração (padrão: 25)')
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Este benchmark requer um banco SQLite em arquivo.')
+
+        threads, operations = options['threads'], options['operations']
+        targets = self.select_targets(threads * operations * 2)
+        if len(targets) < threads * operations * 2:
+            raise CommandError('Aulas não concluídas insuficientes. Execute seed_load_data antes.')
+
+        enrollments = list(Enrollment.objects.filter(pk__in={target.enrollment_id for target in targets}))
+        progresses = list(LessonProgress.objects.filter(pk__in=[target.pk for target in targets]))
+        half = len(targets) // 2
+
+        # Os erros de bloqueio são contados, sem tracebacks na saída
+        logging.disable(logging.CRITICAL)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], SQL_INSTRUMENTATION=False):
+                results = [
+                    ('Padrão', self.run_phase(targets[:half], threads, BASELINE_SETTINGS)),
+                    ('WAL + novas tentativas', self.run_phase(targets[half:], threads, {})),
+                ]
+        finally:
+            logging.disable(logging.NOTSET)
+            self.restore(enrollments, progresses)
+
+        for name, (elapsed, timings, errors) in results:
+            self.stdout.write(
+                f'  {name:<24} {len(timings) / elapsed:>8.1f} conclusões/s  '
+                f'mediana {statistics.median(timings) if timings else 0:>7.1f} ms  '
+                f'p95 {percentile(timings, 0.95) if timings else 0:>7.1f} ms  {errors:>4} erro(s)'
+            )
+
+    def select_targets(self, total):
+        """Progressos não concluídos de aulas publicadas em matrículas ativas."""
+        return list(LessonProgress.objects.filter(
+            is_completed=False,
+            lesson__status=Lesson.Status.PUBLISHED,
+            enrollment__status=Enrollment.Status.ACTIVE,
+            enrollment__course__status=Course.Status.PUBLISHED
+        ).select_related('enrollment__student').order_by('pk')[:total])
+
+    def run_phase(self, targets, threads, overrides):
+        """Distribui as conclusões entre os workers, cada um com um cliente por aluno."""
+        connections.close_all()
+        with override_settings(**overrides):
+            # A primeira conexão aplica as pragmas (mudar o journal exige acesso exclusivo)
+            connections[DEFAULT_DB_ALIAS].ensure_connection()
+
+            clients = {}
+            for target in targets:
+                student = target.enrollment.student
+                if student.pk not in clients:
+                    clients[student.pk] = Client()
+                    clients[student.pk].force_login(student)
+
+            timings = []
+            errors = []
+            lock = threading.Lock()
+
+            def worker(chunk):
+                local, failures = [], 0
+                try:
+                    for target in chunk:
+                        url = reverse('courses:student:lesson_complete', kwargs={
+                            'course_id': target.enrollment.course_id,
+                            'lesson_id': target.lesson_id,
+                        })
+                        started = time.perf_counter()
+                        try:
+                            response = clients[target.enrollment.student_id].post(url)
+                        except Exception:
+                            failures += 1
+                            continue
+                        if response.status_code == 302:
+                            local.append((time.perf_counter() - started) * 1000)
+                        else:
+                            failures += 1
+                finally:
+                    connections.close_all()
+                with lock:
+                    timings.extend(local)
+                    errors.append(failures)
+
+            workers = [
+                threading.Thread(target=worker, args=(targets[index::threads],))
+                for index in range(threads)
+            ]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            connections.close_all()
+
+        return elapsed, timings, sum(errors)
+
+    def restore(self, enrollments, progresses):
+        """Desfaz as conclusões feitas pelo benchmark."""
+        Enrollment.objects.bulk_update(enrollments, ENROLLMENT_FIELDS, batch_size=500)
+        LessonProgress.objects.bulk_update(progresses, PROGRESS_FIELDS, batch_size=500)
+        invalidate_enrolled_course_ids(*{enrollment.student_id for enrollment in enrollments})
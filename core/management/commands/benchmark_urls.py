@@ -0,0 +1,226 @@
+import json
+import logging
+import time
+import warnings
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from core.instrumentation import QueryRecorder
+from core.seeding import LoadDataSpec, seed_load_data
+from courses.models import Course, Lesson, Enrollment
+
+# Namespaces percorridos (None = rotas de config/urls.py) e o usuário de cada um
+NAMESPACE_USERS = {
+    None: 'student',
+    'users': 'admin',
+    'courses': 'professor',
+    'courses:student': 'student',
+}
+
+# Rotas que alteram a sessão ou dependem de fluxo externo
+SKIPPED_ROUTES = {'logout'}
+
+# Parâmetros de rota que o benchmark sabe preencher com os objetos de amostra
+KNOWN_PARAMS = {'pk', 'course_id', 'lesson_id'}
+
+
+class Rollback(Exception):
+    """Desfaz o conjunto de dados sintético ao final de cada tamanho."""
+
+
+def percentile(values, fraction):
+    """Percentil pelo método do posto mais próximo sobre valores ordenados."""
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def named_routes(patterns=None, namespace=None):
+    """Percorre as rotas nomeadas, retornando (nome completo, namespace, parâmetros, view)."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace:
+                child = f'{namespace}:{pattern.namespace}' if namespace else pattern.namespace
+            else:
+                child = namespace
+            yield from named_routes(pattern.url_patterns, child)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            params = list(pattern.pattern.converters)
+            yield name, namespace, params, pattern.callback
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência (p50/p95/p99) e o número de consultas de cada rota nomeada '
+        'em conjuntos de dados sintéticos de tamanhos diferentes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,4',
+                            help='Fatores de escala do conjunto de dados, separados por vírgula (padrão: 1,4)')
+        parser.add_argument('--repeat', type=int, default=20, help='Requisições por rota (padrão: 20)')
+        parser.add_argument('--seed', type=int, default=55, help='Semente do gerador aleatório')
+        parser.add_argument('--baseline', help='Arquivo JSON com a linha de base para comparação')
+        parser.add_argument('--save-baseline', help='Grava os resultados neste arquivo JSON')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Piora relativa do p95 tolerada em relação à linha de base (padrão: 0.25)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Termina com erro se houver regressões em relação à linha de base')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        results = {}
+
+        # Cache isolado: os dados sintéticos são desfeitos e os IDs podem ser reutilizados
+        isolated = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'LOCATION': 'benchmark-urls'}},
+            SQL_INSTRUMENTATION=False,
+        )
+        # Respostas 403/404 esperadas não devem poluir a saída com tracebacks
+        logging.disable(logging.CRITICAL)
+        try:
+            with isolated, warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                for size in sizes:
+                    results[str(size)] = self.run_size(size, options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Linha de base gravada em {options['save_baseline']}")
+
+        if options['baseline']:
+            regressions = self.compare(results, options['baseline'], options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} regressão(ões) em relação à linha de base.')
+
+    def run_size(self, size, options):
+        spec = LoadDataSpec(seed=options['seed']).scaled(size)
+        measurements = {}
+        # Cada tamanho começa com o cache frio, como a linha de base
+        cache.clear()
+        try:
+            with transaction.atomic():
+                data = seed_load_data(spec)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'Tamanho {size}: {data.courses} cursos, {data.enrollments} matrículas, '
+                    f'{data.progresses} registros de progresso'
+                ))
+                clients, context = self.build_clients(data)
+                for name, namespace, params, callback in named_routes():
+                    if namespace not in NAMESPACE_USERS or name in SKIPPED_ROUTES or name in measurements:
+                        continue
+                    if not set(params) <= KNOWN_PARAMS:
+                        continue
+                    view_class = getattr(callback, 'view_class', None)
+                    if view_class is not None and not hasattr(view_class, 'get'):
+                        continue
+                    url = reverse(name, kwargs=self.route_kwargs(name, params, context))
+                    measurements[name] = self.measure(clients[NAMESPACE_USERS[namespace]], url, options['repeat'])
+                    self.report(name, measurements[name])
+                raise Rollback
+        except Rollback:
+            pass
+        return measurements
+
+    def build_clients(self, data):
+        User = get_user_model()
+        admin = User.objects.create_user(
+            email='benchmark-admin@example.com',
+            user_type=User.Types.ADMIN,
+            is_staff=True
+        )
+        # Amostra: um curso publicado do primeiro professor com um aluno matriculado
+        enrollment = Enrollment.objects.filter(
+            course__professor=data.professors[0],
+            status=Enrollment.Status.ACTIVE
+        ).select_related('course', 'student').order_by('pk').first()
+        course = enrollment.course if enrollment else Course.objects.filter(professor=data.professors[0]).first()
+        student = enrollment.student if enrollment else data.students[0]
+
+        clients = {}
+        for role, user in (('admin', admin), ('professor', course.professor), ('student', student)):
+            clients[role] = Client()
+            clients[role].force_login(user)
+        context = {
+            'course': course,
+            'lesson': Lesson.objects.filter(course=course).order_by('order').first(),
+            'user': student,
+        }
+        return clients, context
+
+    def route_kwargs(self, name, params, context):
+        kwargs = {}
+        for param in params:
+            if param == 'pk' and name.startswith('users:'):
+                kwargs[param] = context['user'].pk
+            elif param == 'lesson_id' or (param == 'pk' and ':lesson_' in name):
+                kwargs[param] = context['lesson'].pk
+            else:
+                kwargs[param] = context['course'].pk
+        return kwargs
+
+    def measure(self, client, url, repeat):
+        timings = []
+        queries = 0
+        status = None
+        for _ in range(repeat):
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, recorder.count)
+            status = response.status_code
+        timings.sort()
+        return {
+            'url': url,
+            'status': status,
+            'p50': round(percentile(timings, 0.50), 2),
+            'p95': round(percentile(timings, 0.95), 2),
+            'p99': round(percentile(timings, 0.99), 2),
+            'queries': queries,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"  {name:<40} {result['status']:>3}  p50 {result['p50']:>7.1f} ms  "
+            f"p95 {result['p95']:>7.1f} ms  p99 {result['p99']:>7.1f} ms  {result['queries']:>3} consultas"
+        )
+
+    def compare(self, results, path, tolerance):
+        try:
+            with open(path) as source:
+                baseline = json.load(source)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Não foi possível ler a linha de base: {error}')
+
+        regressions = 0
+        for size, routes in results.items():
+            for name, result in routes.items():
+                reference = baseline.get(size, {}).get(name)
+                if not reference:
+                    continue
+                problems = []
+                if result['p95'] > reference['p95'] * (1 + tolerance):
+                    problems.append(f"p95 {reference['p95']:.1f} -> {result['p95']:.1f} ms")
+                if result['queries'] > reference['queries']:
+                    problems.append(f"consultas {reference['queries']} -> {result['queries']}")
+                if problems:
+                    regressions += 1
+                    self.stdout.write(self.style.WARNING(f"Tamanho {size}, {name}: {'; '.join(problems)}"))
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação à linha de base.'))
+        return regressions
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.images import apply_manifest, build_job, get_specs, manifest_field, setup_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as derivadas responsivas (larguras de IMAGE_DERIVATIVES, com WebP) das '
+        'imagens já enviadas, em um pool de processos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos de geração (padrão: número de CPUs)')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Imagens enviadas ao pool por vez (padrão: 200)')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Campo a processar, como em IMAGE_DERIVATIVES (ex.: courses.Course.image)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regrava as derivadas mesmo das imagens já processadas')
+
+    def handle(self, *args, **options):
+        specs = get_specs()
+        if options['only']:
+            specs = [spec for spec in specs if f'{spec[0]._meta.label}.{spec[1]}' in options['only']]
+            if not specs:
+                raise CommandError('Nenhum campo de IMAGE_DERIVATIVES corresponde a --only.')
+
+        started = time.perf_counter()
+        generated = skipped = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=setup_worker) as pool:
+            for model, field, _ in specs:
+                label = f'{model._meta.label}.{field}'
+                for batch in self.pending(model, field, options['batch_size'], options['force']):
+                    jobs = [(model._meta.label, field, pk, source, options['force']) for pk, source, _ in batch]
+                    previous = {pk: manifest for pk, _, manifest in batch}
+                    for pk, source, manifest, error in pool.map(build_job, *zip(*jobs)):
+                        if error:
+                            failed += 1
+                            self.stderr.write(f'{label} {pk} ({source}): {error}')
+                        elif apply_manifest(model, pk, field, source, manifest, previous[pk]):
+                            generated += 1
+                        else:
+                            # A imagem mudou durante a geração; o post_save cuida da nova
+                            skipped += 1
+                self.stdout.write(f'{label}: concluído.')
+
+        elapsed = time.perf_counter() - started
+        rate = generated / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} imagem(ns) processada(s), {skipped} ignorada(s), {failed} com erro '
+            f'em {elapsed:.2f}s ({rate:.1f} imagens/s)'
+        ))
+
+    def pending(self, model, field, batch_size, force):
+        """Lotes de (pk, arquivo, manifesto) das imagens sem derivadas atuais."""
+        queryset = model._default_manager.exclude(Q(**{field: ''}) | Q(**{f'{field}__isnull': True}))
+        last_pk = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', field, manifest_field(field))[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            batch = [row for row in rows if force or (row[2] or {}).get('source') != row[1]]
+            if batch:
+                yield batch
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.seeding import LoadDataSpec, seed_load_data
+
+
+class Command(BaseCommand):
+    help = 'Gera um conjunto de dados sintético (professores, cursos, aulas, alunos, matrículas e progresso)'
+
+    def add_arguments(self, parser):
+        defaults = LoadDataSpec()
+        parser.add_argument('--professors', type=int, default=defaults.professors,
+                            help=f'Número de professores (padrão: {defaults.professors})')
+        parser.add_argument('--courses-per-professor', type=int, default=defaults.courses_per_professor,
+                            help=f'Cursos por professor (padrão: {defaults.courses_per_professor})')
+        parser.add_argument('--lessons-per-course', type=int, default=defaults.lessons_per_course,
+                            help=f'Aulas por curso (padrão: {defaults.lessons_per_course})')
+        parser.add_argument('--students', type=int, default=defaults.students,
+                            help=f'Número de alunos (padrão: {defaults.students})')
+        parser.add_argument('--enrollments-per-student', type=int, default=defaults.enrollments_per_student,
+                            help=f'Matrículas por aluno (padrão: {defaults.enrollments_per_student})')
+        parser.add_argument('--completion-ratio', type=float, default=defaults.completion_ratio,
+                            help=f'Fração das aulas concluídas (padrão: {defaults.completion_ratio})')
+        parser.add_argument('--password', default=defaults.password,
+                            help='Senha dos usuários gerados')
+        parser.add_argument('--seed', type=int, default=defaults.seed,
+                            help=f'Semente do gerador aleatório (padrão: {defaults.seed})')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Registros por INSERT em lote (padrão: 2000)')
+
+    def handle(self, *args, **options):
+        spec = LoadDataSpec(
+            professors=options['professors'],
+            courses_per_professor=options['courses_per_professor'],
+            lessons_per_course=options['lessons_per_course'],
+            students=options['students'],
+            enrollments_per_student=options['enrollments_per_student'],
+            completion_ratio=options['completion_ratio'],
+            password=options['password'],
+            seed=options['seed'],
+        )
+
+        started = time.perf_counter()
+        result = seed_load_data(spec, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result.professors)} professor(es), {result.courses} curso(s), {result.lessons} aula(s), '
+            f'{len(result.students)} aluno(s), {result.enrollments} matrícula(s) e '
+            f'{result.progresses} registro(s) de progresso criados em {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import get_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco SQLite primário para as réplicas configuradas em DB_REPLICAS, '
+        'simulando a replicação em desenvolvimento'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Este comando só se aplica a bancos SQLite; use a replicação do servidor.')
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('Nenhuma réplica configurada (variável DB_REPLICAS).')
+
+        primary.ensure_connection()
+        for alias in replicas:
+            connections[alias].close()
+            path = connections[alias].settings_dict['NAME']
+            # API de backup do SQLite: cópia consistente mesmo com o primário em uso
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: {path} atualizado.'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='derivadas da imagem de perfil'),
+        ),
+    ]
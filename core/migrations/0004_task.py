@@ -0,0 +1,45 @@
+# Generated by Django 4.2.10 on 2026-10-17 02:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_user_profile_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='tarefa')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='argumentos')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='argumentos nomeados')),
+                ('queue', models.CharField(default='default', max_length=50, verbose_name='fila')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='prioridade')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='executar a partir de')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('RUNNING', 'Em execução'), ('DONE', 'Concluída'), ('FAILED', 'Falhou')], default='PENDING', max_length=10, verbose_name='status')),
+                ('dedup_key', models.CharField(blank=True, max_length=200, null=True, verbose_name='chave de deduplicação')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='tentativas')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='máximo de tentativas')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='reivindicada em')),
+                ('last_error', models.TextField(blank=True, verbose_name='último erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='criada em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finalizada em')),
+            ],
+            options={
+                'verbose_name': 'tarefa',
+                'verbose_name_plural': 'tarefas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['queue', '-priority', 'run_at'], name='task_pending_idx'), models.Index(condition=models.Q(('status', 'RUNNING')), fields=['locked_at'], name='task_running_idx'), models.Index(fields=['status', 'finished_at'], name='task_finished_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'PENDING')), fields=('dedup_key',), name='task_pending_dedup_key_uniq'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
-import uuid
+
+from .slugs import save_with_unique_value
 
 class UserManager(BaseUserManager):
     """
@@ -17,14 +19,7 @@ class UserManager(BaseUserManager):
             raise ValueError(_('O email deve ser fornecido'))
         email = self.normalize_email(email)
         
-        # Gera um username único baseado no email
-        username = slugify(email.split('@')[0])
-        if 'username' not in extra_fields:
-            # Verifica se o username já existe e adiciona um código se necessário
-            if self.model.objects.filter(username=username).exists():
-                username = f"{username}-{uuid.uuid4().hex[:8]}"
-            extra_fields['username'] = username
-            
+        # Sem username, User.save() gera um único a partir do email
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
@@ -76,6 +71,13 @@ class User(AbstractUser):
         blank=True,
         null=True
     )
+    # Versões redimensionadas da foto, geradas fora da requisição (core.images)
+    profile_image_derivatives = models.JSONField(
+        _('derivadas da imagem de perfil'),
+        default=dict,
+        blank=True,
+        editable=False
+    )
     date_joined = models.DateTimeField(_('data de cadastro'), auto_now_add=True)
     
     # Define o email como campo de login
@@ -87,21 +89,21 @@ class User(AbstractUser):
     objects = UserManager()
     
     def save(self, *args, **kwargs):
-        # Garante que o username seja único se não for fornecido
+        # Garante que o username seja único se não for fornecido: primeiro
+        # sufixo livre, em uma consulta, com nova tentativa em caso de colisão
         if not self.username:
-            base_username = slugify(self.email.split('@')[0])
-            username = base_username
-            counter = 1
-            
-            # Adiciona um contador até encontrar um username único
-            while User.objects.filter(username=username).exclude(pk=self.pk).exists():
-                username = f"{base_username}-{counter}"
-                counter += 1
-                
-            self.username = username
+            return save_with_unique_value(
+                self, 'username', self.username_base(self.email),
+                lambda: super(User, self).save(*args, **kwargs)
+            )
             
         super().save(*args, **kwargs)
     
+    @staticmethod
+    def username_base(email):
+        """Valor base do username gerado a partir do email."""
+        return slugify(email.split('@')[0]) or 'usuario'
+    
     class Meta:
         verbose_name = _('usuário')
         verbose_name_plural = _('usuários')
@@ -125,3 +127,74 @@ class User(AbstractUser):
     # Método para verificar se um usuário é de um tipo específico
     def is_of_type(self, user_type):
         return self.user_type == user_type
+
+
+class Task(models.Model):
+    """
+    Tarefa em segundo plano da fila no banco de dados (ver core.taskqueue),
+    executada pelo comando run_worker.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pendente')
+        RUNNING = 'RUNNING', _('Em execução')
+        DONE = 'DONE', _('Concluída')
+        FAILED = 'FAILED', _('Falhou')
+    
+    # Tarefa registrada (caminho pontuado da função) e seus argumentos, em JSON
+    name = models.CharField(_('tarefa'), max_length=200)
+    args = models.JSONField(_('argumentos'), default=list, blank=True)
+    kwargs = models.JSONField(_('argumentos nomeados'), default=dict, blank=True)
+    
+    # Agendamento: maior prioridade primeiro e, entre iguais, a mais antiga
+    queue = models.CharField(_('fila'), max_length=50, default='default')
+    priority = models.SmallIntegerField(_('prioridade'), default=0)
+    run_at = models.DateTimeField(_('executar a partir de'), default=timezone.now)
+    status = models.CharField(
+        _('status'),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    # Tarefas pendentes com a mesma chave não são enfileiradas duas vezes
+    dedup_key = models.CharField(_('chave de deduplicação'), max_length=200, null=True, blank=True)
+    
+    # Tentativas e execução
+    attempts = models.PositiveSmallIntegerField(_('tentativas'), default=0)
+    max_attempts = models.PositiveSmallIntegerField(_('máximo de tentativas'), default=3)
+    locked_by = models.CharField(_('worker'), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_('reivindicada em'), null=True, blank=True)
+    last_error = models.TextField(_('último erro'), blank=True)
+    
+    created_at = models.DateTimeField(_('criada em'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('finalizada em'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('tarefa')
+        verbose_name_plural = _('tarefas')
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='PENDING'),
+                name='task_pending_dedup_key_uniq',
+            ),
+        ]
+        indexes = [
+            # Próximas tarefas prontas de cada fila (reivindicação pelo worker)
+            models.Index(
+                fields=['queue', '-priority', 'run_at'],
+                condition=models.Q(status='PENDING'),
+                name='task_pending_idx',
+            ),
+            # Tarefas em execução há mais tempo que TASK_LOCK_TIMEOUT
+            models.Index(
+                fields=['locked_at'],
+                condition=models.Q(status='RUNNING'),
+                name='task_running_idx',
+            ),
+            # Limpeza das tarefas concluídas (TASK_RETENTION)
+            models.Index(fields=['status', 'finished_at'], name='task_finished_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
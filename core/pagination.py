@@ -0,0 +1,210 @@
+"""
+Paginação por chave (keyset/cursor) para ListViews.
+
+Em vez de OFFSET, cada página é buscada a partir dos valores de ordenação do
+último (ou primeiro) registro da página anterior, com um filtro do tipo
+`(created_at, id) < (x, y)`. O custo por página é constante independentemente
+da profundidade, e a contagem total é opcional.
+
+Requisito: a ordenação deve ser estável, terminando em um campo único (`id`),
+e usar apenas campos não nulos do próprio modelo.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+
+class InvalidCursor(Exception):
+    """Cursor malformado ou incompatível com a ordenação atual."""
+
+
+class KeysetPage:
+    """Página de resultados com cursores opacos para a próxima página e a anterior."""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage ({len(self.object_list)} itens)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginador por chave sobre um queryset e uma ordenação estável."""
+
+    def __init__(self, queryset, per_page, ordering, count_total=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.count_total = count_total
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    @cached_property
+    def count(self):
+        """Total de registros; só é calculado se `count_total` estiver ativo."""
+        return self.queryset.count() if self.count_total else None
+
+    def encode_cursor(self, direction, obj):
+        # value_to_string preserva a precisão total (o DjangoJSONEncoder trunca
+        # datetimes em milissegundos, o que quebraria a comparação de empates)
+        values = [self._field(name).value_to_string(obj) for name, _descending in self.fields]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursor(cursor)
+
+        if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        try:
+            values = [
+                self._field(name).to_python(value)
+                for (name, _descending), value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _field(self, name):
+        model = self.queryset.model
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def _after(self, values, backwards):
+        """
+        Monta o filtro "linhas depois de `values`" na ordenação, expandido como
+        (a > x) OR (a = x AND b > y) OR ..., que funciona em qualquer banco.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _prepare(self, cursor):
+        """Retorna o queryset da página (com um registro a mais), os valores do cursor e a direção."""
+        direction, values = ('n', None)
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        backwards = direction == 'p'
+
+        ordering = self.ordering
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+
+        # Busca um registro a mais para saber se existe outra página nessa direção
+        return queryset[:self.per_page + 1], values, backwards
+
+    def _build_page(self, rows, values, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more if not backwards else True:
+                next_cursor = self.encode_cursor('n', rows[-1])
+            if (values is not None) if not backwards else has_more:
+                previous_cursor = self.encode_cursor('p', rows[0])
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def page_queryset(self, cursor=None):
+        """Queryset (não avaliado) da página de `cursor`, com um registro a mais."""
+        return self._prepare(cursor)[0]
+
+    def page(self, cursor=None):
+        queryset, values, backwards = self._prepare(cursor)
+        return self._build_page(list(queryset), values, backwards)
+
+    async def apage(self, cursor=None):
+        """Versão assíncrona de `page()`, para views async (iteração assíncrona do ORM)."""
+        queryset, values, backwards = self._prepare(cursor)
+        return self._build_page([obj async for obj in queryset], values, backwards)
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView que substitui a paginação por OFFSET pela paginação
+    por chave quando `get_keyset_ordering()` retorna uma ordenação.
+
+    Disponibiliza no contexto `keyset_pagination`, `next_page_query` e
+    `previous_page_query` (query strings prontas, preservando os demais
+    parâmetros GET) e, se `count_total` estiver ativo, `total_count`.
+    """
+    keyset_ordering = None
+    cursor_kwarg = 'cursor'
+    count_total = False
+
+    def get_keyset_ordering(self, queryset):
+        """Ordenação estável para `queryset`, ou None para usar a paginação padrão."""
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset_ordering(queryset)
+        if not ordering:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, ordering, count_total=self.count_total)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404(_('Cursor de paginação inválido.'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def _page_query(self, cursor):
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params[self.cursor_kwarg] = cursor
+        return params.urlencode()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if isinstance(page, KeysetPage):
+            context['keyset_pagination'] = True
+            if page.has_next():
+                context['next_page_query'] = self._page_query(page.next_cursor)
+            if page.has_previous():
+                context['previous_page_query'] = self._page_query(page.previous_cursor)
+            if self.count_total:
+                context['total_count'] = page.paginator.count
+        return context
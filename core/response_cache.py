@@ -0,0 +1,161 @@
+"""
+Cache de respostas completas das páginas públicas para visitantes anônimos.
+
+As views com o AnonymousResponseCacheMixin guardam a resposta renderizada no
+cache, com a chave formada pelo caminho e pelos parâmetros da URL que a view
+declara em `response_cache_params` (normalizados: ordenados, sem valores
+vazios e com espaços colapsados; parâmetros de campanha como `utm_*` não
+geram entradas novas). Usuários autenticados e requisições com mensagens
+pendentes passam direto pela view.
+
+Invalidação por etiquetas: cada entrada guarda as versões das etiquetas da
+view (`get_response_cache_tags()`, como "catalog" ou "course:12") no momento
+da renderização. `purge_response_cache(*tags)` incrementa as versões, o que
+invalida apenas as entradas daquelas etiquetas, em todas as variações de
+parâmetros, sem precisar enumerá-las.
+
+Proteção contra estouro (stampede): quando uma entrada falta ou ficou
+desatualizada, somente a requisição que obtiver o lock (cache.add) renderiza a
+página. As concorrentes recebem a cópia desatualizada, se existir, ou aguardam
+a nova entrada por até RESPONSE_CACHE_LOCK_WAIT segundos antes de renderizar
+por conta própria.
+
+Configurações: RESPONSE_CACHE_TIMEOUT (segundos; 0 desativa),
+RESPONSE_CACHE_LOCK_WAIT e RESPONSE_CACHE_LOCK_TIMEOUT.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+ENTRY_KEY = 'responsecache:page:{digest}'
+LOCK_KEY = 'responsecache:lock:{digest}'
+TAG_KEY = 'responsecache:tag:{tag}'
+
+# Intervalo entre verificações enquanto outra requisição renderiza a página
+LOCK_POLL_INTERVAL = 0.05
+
+# Cabeçalhos da resposta guardados com a entrada
+STORED_HEADERS = ('Content-Type', 'Content-Language', 'Cache-Control', 'ETag', 'Vary')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _initial_version():
+    # Baseada no relógio: se a chave da etiqueta for despejada do cache, a nova
+    # versão não coincide com a guardada em entradas antigas
+    return int(time.time() * 1000)
+
+
+def get_tag_versions(tags):
+    """Versões atuais das etiquetas, em uma leitura do cache (get_many)."""
+    keys = [TAG_KEY.format(tag=tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def purge_response_cache(*tags):
+    """Invalida as respostas em cache das etiquetas informadas."""
+    for tag in tags:
+        key = TAG_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def is_anonymous_request(request):
+    """
+    Indica se a requisição pode usar o cache: visitante anônimo, sem mensagens
+    pendentes. Sem cookie de sessão, nenhuma consulta é feita.
+    """
+    if request.COOKIES.get(settings.SESSION_COOKIE_NAME) and request.user.is_authenticated:
+        return False
+    return not len(get_messages(request))
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Guarda a resposta completa da view para visitantes anônimos. A view define
+    `response_cache_params` (parâmetros da URL que alteram a página) e
+    `get_response_cache_tags()`.
+    """
+    response_cache_params = ()
+
+    def get_response_cache_tags(self):
+        return ()
+
+    def get_response_cache_key(self):
+        params = []
+        for name in sorted(self.response_cache_params):
+            for value in self.request.GET.getlist(name):
+                value = ' '.join(value.split())
+                if value:
+                    params.append((name, value))
+        return hashlib.md5(repr((self.request.path, params)).encode(), usedforsecurity=False).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        timeout = _setting('RESPONSE_CACHE_TIMEOUT', 300)
+        # Views assíncronas (ver courses.async_views) não passam pelo cache
+        if (not timeout or self.view_is_async or request.method not in ('GET', 'HEAD')
+                or not is_anonymous_request(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+        digest = self.get_response_cache_key()
+        entry_key = ENTRY_KEY.format(digest=digest)
+        lock_key = LOCK_KEY.format(digest=digest)
+        versions = get_tag_versions(self.get_response_cache_tags())
+
+        entry = cache.get(entry_key)
+        if entry is not None and entry['versions'] == versions:
+            return self.cached_response(request, entry, 'HIT')
+
+        if not cache.add(lock_key, 1, _setting('RESPONSE_CACHE_LOCK_TIMEOUT', 30)):
+            # Outra requisição está renderizando: usa a cópia anterior ou aguarda a nova
+            if entry is not None:
+                return self.cached_response(request, entry, 'STALE')
+            deadline = time.monotonic() + _setting('RESPONSE_CACHE_LOCK_WAIT', 5)
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = cache.get(entry_key)
+                if entry is not None and entry['versions'] == versions:
+                    return self.cached_response(request, entry, 'HIT')
+                if not cache.get(lock_key):
+                    break
+            return super().dispatch(request, *args, **kwargs)
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            if response.status_code == 200 and not response.cookies and not response.streaming:
+                cache.set(entry_key, {
+                    'versions': versions,
+                    'content': response.content,
+                    'headers': [(name, response[name]) for name in STORED_HEADERS if response.has_header(name)],
+                }, timeout)
+        finally:
+            cache.delete(lock_key)
+        response['X-Response-Cache'] = 'MISS'
+        return response
+
+    def cached_response(self, request, entry, status):
+        headers = dict(entry['headers'])
+        etag = headers.get('ETag')
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+        response = HttpResponse(entry['content'], headers=headers)
+        response['X-Response-Cache'] = status
+        return response
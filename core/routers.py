@@ -0,0 +1,167 @@
+"""
+Roteamento de leituras para réplicas do banco de dados.
+
+Com réplicas configuradas (DATABASE_REPLICAS, preenchida em config/settings.py
+a partir de DB_REPLICAS), as consultas de leitura das views somente leitura
+(as que herdam de ReadReplicaMixin) em requisições GET/HEAD vão para uma das
+réplicas, escolhida ao acaso. Todo o resto usa o banco primário (`default`):
+escritas, views sem o mixin, comandos de gerenciamento e tarefas fora de
+requisições.
+
+Depois de uma escrita, o ReplicaRoutingMiddleware grava um cookie que mantém as
+leituras do usuário no primário por DATABASE_REPLICA_STICKY_SECONDS segundos,
+para que ele veja a própria matrícula ou aula concluída mesmo com atraso de
+replicação. Dentro da mesma requisição, as leituras também voltam para o
+primário assim que ocorre a primeira escrita.
+
+Dados que vão para o cache compartilhado devem ser lidos do primário (ver
+`use_primary()`), para não guardar por muito tempo um valor atrasado da réplica.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Apps cujas leituras nunca vão para réplicas: uma sessão recém-criada que
+# ainda não chegou à réplica deslogaria o usuário
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_routing = ContextVar('db_routing', default=None)
+_force_primary = ContextVar('db_force_primary', default=False)
+
+
+class RoutingState:
+    """Estado de roteamento de uma requisição."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """Força as leituras do bloco para o banco primário."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class ReadReplicaMixin:
+    """
+    Marca uma view como somente leitura: em GET/HEAD, suas consultas podem ser
+    atendidas por uma réplica.
+    """
+    read_replica = True
+
+
+class ReplicaRouter:
+    """Envia as leituras marcadas pelo middleware para réplicas e as escritas para o primário."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.replica or state.wrote or _force_primary.get():
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o esquema pela replicação (ou, com SQLite, pelo
+        # comando sync_sqlite_replicas)
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Escolhe a réplica das views somente leitura e mantém as leituras do usuário
+    no primário por um curto período depois de uma escrita. Síncrono e
+    assíncrono: o estado fica em uma ContextVar, copiada para as threads do
+    sync_to_async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.process_state(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.process_state(response, state)
+
+    def process_state(self, response, state):
+        """Após uma escrita, mantém o usuário no primário (cookie)."""
+        if state.wrote:
+            window = getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time() + window)),
+                max_age=window,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        if request.method not in SAFE_METHODS or not getattr(view, 'read_replica', False):
+            return None
+        if self.is_sticky(request):
+            return None
+        state = _routing.get()
+        if state is not None:
+            state.replica = random.choice(get_replicas())
+        return None
+
+    def is_sticky(self, request):
+        try:
+            return int(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,199 @@
+"""
+Geração de dados sintéticos para testes de carga (comandos seed_load_data e
+benchmark_urls).
+
+Todos os registros são criados com bulk_create, de forma determinística a
+partir da semente: a mesma semente e os mesmos volumes produzem o mesmo
+conjunto de dados. Como bulk_create não chama save() nem dispara sinais, os
+campos que o modelo preencheria (slug, contadores, progresso) são calculados
+aqui (os slugs com core.slugs.assign_unique_values, como Course.save() faria)
+e o índice de busca é reconstruído ao final.
+"""
+import random
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from courses.models import Course, Lesson, Enrollment, LessonProgress
+from courses.search import get_search_backend
+
+from .slugs import assign_unique_values
+
+WORDS = [
+    'introdução', 'música', 'violão', 'harmonia', 'percussão', 'teoria', 'prática',
+    'canção', 'improvisação', 'ritmo', 'técnica', 'composição', 'produção', 'áudio',
+    'gravação', 'mixagem', 'piano', 'guitarra', 'baixo', 'bateria', 'canto', 'coral',
+    'jazz', 'samba', 'choro', 'forró', 'bossa', 'nova', 'avançado', 'iniciante',
+]
+
+VIDEO_IDS = ['dQw4w9WgXcQ', 'M7lc1UVf-VE', 'ScMzIvxBSi4', 'aqz-KE-bpKQ', 'jNQXAC9IVRw']
+
+
+@dataclass
+class LoadDataSpec:
+    """Volumes do conjunto de dados sintético."""
+    professors: int = 5
+    courses_per_professor: int = 10
+    lessons_per_course: int = 10
+    students: int = 200
+    enrollments_per_student: int = 5
+    completion_ratio: float = 0.4
+    draft_ratio: float = 0.1
+    password: str = 'load123'
+    seed: int = 55
+
+    def scaled(self, factor):
+        """Mesmo perfil com `factor` vezes mais professores e alunos."""
+        return LoadDataSpec(**{
+            **self.__dict__,
+            'professors': self.professors * factor,
+            'students': self.students * factor,
+        })
+
+
+@dataclass
+class LoadDataResult:
+    professors: list = field(default_factory=list)
+    students: list = field(default_factory=list)
+    courses: int = 0
+    lessons: int = 0
+    enrollments: int = 0
+    progresses: int = 0
+
+
+def seed_load_data(spec, batch_size=2000):
+    """Cria o conjunto de dados descrito por `spec` e retorna os totais criados."""
+    rng = random.Random(spec.seed)
+    User = get_user_model()
+    now = timezone.now()
+    # Hash calculado uma única vez: todos os usuários sintéticos usam a mesma senha
+    password = make_password(spec.password)
+    prefix = f'load-{spec.seed}'
+    result = LoadDataResult()
+
+    def text(size):
+        return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+    with transaction.atomic():
+        # Continua a numeração de execuções anteriores com a mesma semente
+        offset = User.objects.filter(email__startswith=f'{prefix}-').count()
+
+        users = [
+            User(
+                email=f'{prefix}-{kind}-{offset + index}@example.com',
+                username=f'{prefix}-{kind}-{offset + index}',
+                first_name=kind.capitalize(),
+                last_name=str(offset + index),
+                user_type=user_type,
+                password=password,
+            )
+            for kind, user_type, total in (
+                ('professor', User.Types.PROFESSOR, spec.professors),
+                ('aluno', User.Types.STUDENT, spec.students),
+            )
+            for index in range(total)
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        users = list(User.objects.filter(email__startswith=f'{prefix}-').order_by('pk')[offset:])
+        result.professors = [user for user in users if user.user_type == User.Types.PROFESSOR]
+        result.students = [user for user in users if user.user_type == User.Types.STUDENT]
+
+        courses = []
+        for professor in result.professors:
+            for _ in range(spec.courses_per_professor):
+                courses.append(Course(
+                    professor=professor,
+                    title=text(4).capitalize(),
+                    short_description=text(10),
+                    description=text(60),
+                    price=rng.choice([0, 49, 99, 199]),
+                    status=Course.Status.DRAFT if rng.random() < spec.draft_ratio else Course.Status.PUBLISHED,
+                ))
+        assign_unique_values(courses, 'slug', lambda course: slugify(course.title))
+        Course.objects.bulk_create(courses, batch_size=batch_size)
+        courses = list(Course.objects.filter(professor__in=result.professors).order_by('pk'))
+        result.courses = len(courses)
+
+        lessons = []
+        for course in courses:
+            published = 0
+            for order in range(1, spec.lessons_per_course + 1):
+                video_id = rng.choice(VIDEO_IDS)
+                is_draft = order > 1 and rng.random() < spec.draft_ratio
+                published += not is_draft
+                lessons.append(Lesson(
+                    course=course,
+                    title=text(5).capitalize(),
+                    description=text(30),
+                    video_url=f'https://www.youtube.com/watch?v={video_id}',
+                    youtube_id=video_id,
+                    order=order,
+                    status=Lesson.Status.DRAFT if is_draft else Lesson.Status.PUBLISHED,
+                ))
+            course.published_lessons_count = published
+        Lesson.objects.bulk_create(lessons, batch_size=batch_size)
+        Course.objects.bulk_update(courses, ['published_lessons_count'], batch_size=batch_size)
+        result.lessons = len(lessons)
+
+        published_courses = [course for course in courses if course.status == Course.Status.PUBLISHED]
+        enrollments = []
+        for student in result.students:
+            sample = rng.sample(published_courses, min(spec.enrollments_per_student, len(published_courses)))
+            for course in sample:
+                enrollments.append(Enrollment(
+                    student=student,
+                    course=course,
+                    # Mapa de conclusão reconstruído no primeiro acesso
+                    completion_bitmap=None,
+                ))
+        Enrollment.objects.bulk_create(enrollments, batch_size=batch_size)
+        enrollments = list(Enrollment.objects.filter(
+            student__in=result.students
+        ).select_related('course').order_by('pk'))
+        result.enrollments = len(enrollments)
+
+        lessons_by_course = {}
+        for lesson in Lesson.objects.filter(course__in=courses).order_by('order').only('pk', 'course_id', 'status'):
+            lessons_by_course.setdefault(lesson.course_id, []).append(lesson)
+
+        progresses = []
+        for enrollment in enrollments:
+            completed = 0
+            for lesson in lessons_by_course.get(enrollment.course_id, []):
+                is_completed = rng.random() < spec.completion_ratio
+                if is_completed and lesson.status == Lesson.Status.PUBLISHED:
+                    completed += 1
+                progresses.append(LessonProgress(
+                    enrollment_id=enrollment.pk,
+                    lesson_id=lesson.pk,
+                    is_completed=is_completed,
+                    completed_at=now if is_completed else None,
+                ))
+
+            total = enrollment.course.published_lessons_count
+            enrollment.completed_lessons_count = completed
+            enrollment.progress = Enrollment.calculate_progress(completed, total)
+            if total and completed >= total:
+                enrollment.status = Enrollment.Status.COMPLETED
+                enrollment.completed_at = now
+
+            if len(progresses) >= batch_size:
+                LessonProgress.objects.bulk_create(progresses, batch_size=batch_size)
+                result.progresses += len(progresses)
+                progresses = []
+        LessonProgress.objects.bulk_create(progresses, batch_size=batch_size)
+        result.progresses += len(progresses)
+
+        Enrollment.objects.bulk_update(
+            enrollments,
+            ['completed_lessons_count', 'progress', 'status', 'completed_at'],
+            batch_size=batch_size
+        )
+
+        get_search_backend().rebuild()
+
+    return result
@@ -0,0 +1,138 @@
+"""
+Alocação de valores únicos com sufixo numérico (slugs de cursos e usernames).
+
+Um valor base ("introducao") recebe o primeiro sufixo livre da sequência
+`base`, `base-1`, `base-2`... Em vez de um exists() por candidato, todos os
+valores já usados da forma `base` ou `base-N` são lidos em uma única consulta
+e o sufixo é escolhido em memória.
+
+Entre a leitura e o INSERT, outro processo pode ocupar o mesmo valor: por isso
+`save_with_unique_value()` grava dentro de um savepoint e, se a restrição
+unique do campo falhar, aloca de novo e repete.
+
+Para importações em lote, `assign_unique_values()` preenche o campo de uma
+lista inteira de objetos novos antes do bulk_create, com uma consulta por lote
+de valores base (e sem repetir valores dentro da própria lista).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+# Espaço reservado no fim do campo para o sufixo ("-" + até 10 dígitos)
+SUFFIX_RESERVE = 11
+
+# Valores base por consulta: cada base gera uma condição LIKE na cláusula OR
+BASES_PER_QUERY = 300
+
+
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+def _fit(base, max_length):
+    """Encurta o valor base para que o sufixo sempre caiba no campo."""
+    if max_length and len(base) + SUFFIX_RESERVE > max_length:
+        base = base[:max_length - SUFFIX_RESERVE].rstrip('-')
+    return base
+
+
+def _suffix(base, value):
+    """Sufixo numérico de `value` em relação a `base` (0 = a própria base) ou None."""
+    if value == base:
+        return 0
+    rest = value[len(base) + 1:]
+    if value.startswith(f'{base}-') and rest.isdigit() and not rest.startswith('0'):
+        return int(rest)
+    return None
+
+
+def _reserve(taken, value):
+    """
+    Marca `value` como usado nas bases de que ele pode derivar: o próprio valor
+    e o prefixo antes do último '-' ("violao-1" ocupa "violao" e "violao-1").
+    """
+    for base in (value, value.rpartition('-')[0]):
+        suffix = _suffix(base, value) if base in taken else None
+        if suffix is not None:
+            taken[base].add(suffix)
+
+
+def _first_free(base, taken):
+    suffix = 0
+    while suffix in taken:
+        suffix += 1
+    return base if suffix == 0 else f'{base}-{suffix}'
+
+
+def taken_suffixes(model, field, bases, exclude_pk=None):
+    """Retorna {base: conjunto de sufixos já usados} para os valores base informados."""
+    bases = list(dict.fromkeys(bases))
+    taken = {base: set() for base in bases}
+    manager = model._default_manager
+
+    for start in range(0, len(bases), BASES_PER_QUERY):
+        chunk = bases[start:start + BASES_PER_QUERY]
+        condition = Q(**{f'{field}__in': chunk})
+        for base in chunk:
+            condition |= Q(**{f'{field}__startswith': f'{base}-'})
+        queryset = manager.filter(condition)
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+
+        for value in queryset.values_list(field, flat=True):
+            _reserve(taken, value)
+    return taken
+
+
+def allocate_unique_value(model, field, base, exclude_pk=None):
+    """Primeiro valor livre de `base`, `base-1`, `base-2`... do campo, em uma consulta."""
+    base = _fit(base, _max_length(model, field))
+    return _first_free(base, taken_suffixes(model, field, [base], exclude_pk)[base])
+
+
+def assign_unique_values(objects, field, get_base):
+    """
+    Atribui valores únicos a objetos ainda não gravados (antes de um
+    bulk_create). `get_base(obj)` retorna o valor base de cada objeto; objetos
+    com o campo já preenchido são mantidos e reservam o próprio valor.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+
+    model = type(objects[0])
+    max_length = _max_length(model, field)
+    pending = [obj for obj in objects if not getattr(obj, field)]
+    bases = {id(obj): _fit(get_base(obj), max_length) for obj in pending}
+    taken = taken_suffixes(model, field, bases.values())
+
+    # Valores definidos explicitamente na própria lista também ficam indisponíveis
+    for obj in objects:
+        if id(obj) not in bases and getattr(obj, field):
+            _reserve(taken, getattr(obj, field))
+
+    for obj in pending:
+        value = _first_free(bases[id(obj)], taken[bases[id(obj)]])
+        _reserve(taken, value)
+        setattr(obj, field, value)
+    return objects
+
+
+def save_with_unique_value(instance, field, base, save, attempts=3):
+    """
+    Aloca o valor único de `field` a partir de `base` e chama `save()`. Se outro
+    processo gravar o mesmo valor antes, a violação da restrição unique é
+    desfeita no savepoint e a alocação é repetida (até `attempts` vezes).
+    """
+    model = type(instance)
+    for attempt in range(attempts):
+        setattr(instance, field, allocate_unique_value(model, field, base, exclude_pk=instance.pk))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            # Repete somente se a colisão foi no próprio campo
+            taken = model._default_manager.filter(**{field: getattr(instance, field)})
+            if instance.pk is not None:
+                taken = taken.exclude(pk=instance.pk)
+            if attempt == attempts - 1 or not taken.exists():
+                raise
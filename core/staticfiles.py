@@ -0,0 +1,276 @@
+"""
+Arquivos estáticos com hash no nome, pré-comprimidos e servidos pela aplicação.
+
+Coleta (`collectstatic`):
+
+O CompressedManifestStaticFilesStorage é o ManifestStaticFilesStorage do
+Django (nomes com o hash do conteúdo, como `css/main.3f2a1b9c0d12.css`, e
+referências reescritas nos CSS) acrescido da compressão: cada arquivo de texto
+ganha as versões `.gz` (gzip nível 9) e `.br` (brotli, se o pacote `Brotli`
+estiver instalado), geradas uma única vez e só mantidas quando menores que o
+original.
+
+Entrega (StaticFilesMiddleware):
+
+O middleware indexa STATIC_ROOT ao iniciar o processo e responde às URLs de
+STATIC_URL antes das views, sem consultas nem templates:
+
+- escolhe a variante pelo Accept-Encoding (br, gzip ou identidade), com
+  `Content-Encoding` e `Vary: Accept-Encoding`;
+- arquivos com hash (listados no manifesto) recebem
+  `Cache-Control: public, max-age=31536000, immutable`; os demais,
+  STATIC_MAX_AGE segundos;
+- responde 304 a If-None-Match/If-Modified-Since e usa o sendfile do servidor
+  WSGI (FileResponse) quando disponível.
+
+Ativo quando STATIC_SERVE (padrão: fora do DEBUG) e STATIC_ROOT existe; após um
+novo collectstatic, os processos devem ser reiniciados para reindexar.
+"""
+import gzip
+import json
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Tipos de arquivo que se beneficiam de compressão (imagens e fontes woff já são comprimidas)
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf', '.eot',
+}
+# Arquivos menores que isso não compensam o cabeçalho da compressão
+MIN_COMPRESS_SIZE = 256
+# A variante comprimida só é mantida se reduzir o arquivo a menos desta fração
+MAX_COMPRESS_RATIO = 0.95
+
+# Extensões das variantes, na ordem de preferência da negociação
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def compress_file(path, skip_existing=False):
+    """
+    Gera as variantes gzip e brotli de `path`. Com `skip_existing`, variantes já
+    geradas são mantidas (arquivos com hash no nome nunca mudam de conteúdo).
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS or not os.path.isfile(path):
+        return
+    if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+        return
+
+    with open(path, 'rb') as source:
+        content = source.read()
+    compressors = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors['br'] = lambda data: brotli.compress(data, quality=11)
+
+    for encoding, extension in ENCODINGS:
+        target = path + extension
+        if encoding not in compressors or (skip_existing and os.path.exists(target)):
+            continue
+        compressed = compressors[encoding](content)
+        if len(compressed) < len(content) * MAX_COMPRESS_RATIO:
+            with open(target, 'wb') as output:
+                output.write(compressed)
+        elif os.path.exists(target):
+            os.remove(target)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que também gera as variantes .gz e .br."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        results = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            results.append((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+
+        if brotli is None:
+            logger.warning('Pacote Brotli não instalado: somente as variantes gzip serão geradas.')
+        jobs = {}
+        for name, hashed_name in results:
+            jobs[self.path(name)] = False
+            if isinstance(hashed_name, str) and hashed_name != name:
+                jobs[self.path(hashed_name)] = True
+        # zlib e brotli liberam o GIL durante a compressão
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(compress_file, jobs, jobs.values()))
+
+    def stored_name(self, name):
+        # Sem collectstatic (desenvolvimento e testes), o arquivo não está no
+        # manifesto: usa o nome original em vez de falhar ao renderizar
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+@dataclass
+class StaticFile:
+    """Arquivo estático indexado e suas variantes comprimidas."""
+    path: str
+    size: int
+    mtime: int
+    content_type: str
+    immutable: bool
+    variants: dict = field(default_factory=dict)
+
+    @property
+    def etag(self):
+        return f'{self.mtime:x}-{self.size:x}'
+
+
+def _content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _accepted_encodings(header):
+    """Codificações aceitas (q > 0) do cabeçalho Accept-Encoding."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Serve os arquivos de STATIC_ROOT com cache de longa duração e compressão.
+    Síncrono e assíncrono: sob ASGI não força a cadeia de middlewares para o
+    modo síncrono.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if not getattr(settings, 'STATIC_SERVE', False) or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+        self.files = self.scan(root)
+
+    def scan(self, root):
+        """Indexa os arquivos de `root` por URL, com as variantes existentes."""
+        immutable = set()
+        manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        if os.path.exists(manifest):
+            with open(manifest) as source:
+                immutable = set(json.load(source).get('paths', {}).values())
+
+        files = {}
+        suffixes = tuple(extension for _, extension in ENCODINGS)
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                stat = os.stat(path)
+                static_file = StaticFile(
+                    path=path,
+                    size=stat.st_size,
+                    mtime=int(stat.st_mtime),
+                    content_type=_content_type(name),
+                    immutable=relative in immutable,
+                )
+                for encoding, extension in ENCODINGS:
+                    if os.path.exists(path + extension):
+                        static_file.variants[encoding] = (path + extension, os.path.getsize(path + extension))
+                files[self.prefix + relative] = static_file
+        return files
+
+    def match(self, request):
+        """Arquivo indexado da URL da requisição, ou None."""
+        if not request.path_info.startswith(self.prefix):
+            return None
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.match(request)
+        if static_file is None:
+            return self.get_response(request)
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        return self.serve(request, static_file)
+
+    async def __acall__(self, request):
+        static_file = self.match(request)
+        if static_file is None:
+            return await self.get_response(request)
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        # O handler ASGI consumiria o FileResponse de forma síncrona (com aviso):
+        # o conteúdo é lido de uma vez, fora do loop de eventos
+        return await sync_to_async(self.serve, thread_sensitive=False)(request, static_file, stream=False)
+
+    def serve(self, request, static_file, stream=True):
+        path, size, encoding = static_file.path, static_file.size, None
+        if static_file.variants:
+            accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            for candidate, _ in ENCODINGS:
+                if candidate in accepted and candidate in static_file.variants:
+                    encoding = candidate
+                    path, size = static_file.variants[candidate]
+                    break
+
+        etag = f'"{static_file.etag}-{encoding}"' if encoding else f'"{static_file.etag}"'
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if static_file.immutable else f'public, max-age={self.max_age}',
+            'ETag': etag,
+            'Last-Modified': http_date(static_file.mtime),
+        }
+        if static_file.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if (if_none_match and etag in if_none_match) or (
+            not if_none_match and if_modified_since and static_file.mtime <= if_modified_since
+        ):
+            return HttpResponseNotModified(headers=headers)
+
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=static_file.content_type, headers=headers)
+        elif stream:
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type, headers=headers)
+        else:
+            with open(path, 'rb') as source:
+                response = HttpResponse(source.read(), content_type=static_file.content_type, headers=headers)
+        response['Content-Length'] = size
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
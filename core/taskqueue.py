@@ -0,0 +1,436 @@
+"""
+Fila de tarefas em segundo plano no próprio banco de dados.
+
+As funções marcadas com @task (nos módulos `tasks.py` dos apps) são
+enfileiradas com `enqueue()`, que grava um registro de Task na transação
+corrente: se a transação for desfeita, a tarefa também é.
+
+    @task(priority=10)
+    def seed_enrollment_progress(enrollment_id):
+        ...
+
+    enqueue('courses.tasks.seed_enrollment_progress', args=[enrollment.pk])
+
+O comando `run_worker` reivindica as tarefas prontas (status pendente e
+`run_at` vencido, maior prioridade primeiro) e as executa em um pool de
+threads ou de processos. A reivindicação é atômica: no PostgreSQL, com
+SELECT ... FOR UPDATE SKIP LOCKED, para que vários workers não disputem as
+mesmas linhas; no SQLite, que serializa as escritas, com um único UPDATE
+condicionado ao status pendente.
+
+Tarefas que falham voltam para a fila com espera exponencial
+(TASK_RETRY_BACKOFF, limitada a TASK_RETRY_MAX_DELAY) até `max_attempts`.
+Tarefas em execução há mais de TASK_LOCK_TIMEOUT segundos (worker
+interrompido) são devolvidas à fila, e as concluídas são removidas após
+TASK_RETENTION segundos. As tarefas devem, portanto, ser idempotentes.
+
+Com TASKS_EAGER (padrão no DEBUG), a tarefa é executada no próprio processo
+logo após o commit, sem worker.
+
+Tarefas processadas, com falha e repetidas ficam em contadores no cache; a
+profundidade da fila e o atraso da tarefa pronta mais antiga, em
+`get_queue_metrics()`.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, connection, connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+from .transactions import retry_on_lock
+
+logger = logging.getLogger(__name__)
+
+METRIC_KEY = 'core:tasks:{name}'
+COUNTERS = ('processed', 'failed', 'retried')
+
+_registry = {}
+_discovered = False
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _incr(name, delta=1):
+    key = METRIC_KEY.format(name=name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def task(func=None, *, name=None, queue='default', priority=0, max_attempts=3):
+    """
+    Registra a função como tarefa. `queue`, `priority` e `max_attempts` são os
+    padrões de enqueue() para ela.
+    """
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__qualname__}'
+        func.task_options = {'queue': queue, 'priority': priority, 'max_attempts': max_attempts}
+        _registry[func.task_name] = func
+        return func
+
+    return register(func) if func is not None else register
+
+
+def autodiscover_tasks():
+    """Importa os módulos `tasks` dos apps instalados, registrando suas tarefas."""
+    global _discovered
+    if not _discovered:
+        autodiscover_modules('tasks')
+        _discovered = True
+
+
+def get_task(name):
+    """Função registrada com o nome informado, ou None."""
+    if name not in _registry:
+        autodiscover_tasks()
+    return _registry.get(name)
+
+
+def enqueue(func, args=(), kwargs=None, *, queue=None, priority=None, run_at=None, delay=None,
+            dedup_key=None, max_attempts=None):
+    """
+    Enfileira a tarefa `func` (a função registrada ou o seu nome) e retorna o
+    registro de Task. Os argumentos devem ser serializáveis em JSON.
+
+    `run_at` (ou `delay`, em segundos) agenda a execução. Se já houver uma
+    tarefa pendente com a mesma `dedup_key`, ela é retornada no lugar de uma nova.
+    """
+    func = get_task(func) if isinstance(func, str) else func
+    if func is None or getattr(func, 'task_name', None) not in _registry:
+        raise ValueError('A função não está registrada como tarefa (@task).')
+
+    options = func.task_options
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    fields = {
+        'name': func.task_name,
+        'args': list(args),
+        'kwargs': kwargs or {},
+        'queue': queue or options['queue'],
+        'priority': options['priority'] if priority is None else priority,
+        'max_attempts': max_attempts or options['max_attempts'],
+        'run_at': run_at,
+        'dedup_key': dedup_key,
+    }
+
+    if dedup_key is None:
+        created = Task.objects.create(**fields)
+    else:
+        created = Task.objects.filter(dedup_key=dedup_key, status=Task.Status.PENDING).first()
+    if created is None:
+        try:
+            with transaction.atomic():
+                created = Task.objects.create(**fields)
+        except IntegrityError:
+            # Outra transação enfileirou a mesma chave ao mesmo tempo
+            created = Task.objects.filter(dedup_key=dedup_key, status=Task.Status.PENDING).first()
+            if created is None:
+                raise
+
+    if _setting('TASKS_EAGER', False):
+        # Também para a tarefa pendente reaproveitada, que executa com os dados atuais
+        transaction.on_commit(partial(_run_eager, created.pk))
+    return created
+
+
+def _run_eager(task_id):
+    worker_id = f'eager:{os.getpid()}'
+    claimed = Task.objects.filter(pk=task_id, status=Task.Status.PENDING).update(
+        status=Task.Status.RUNNING, locked_by=worker_id, locked_at=timezone.now(),
+        attempts=F('attempts') + 1
+    )
+    if claimed:
+        run_task(task_id, worker_id)
+
+
+@retry_on_lock
+def claim_tasks(worker_id, limit, queues=None):
+    """
+    Reivindica até `limit` tarefas prontas para o worker e retorna seus IDs, na
+    ordem de execução.
+    """
+    now = timezone.now()
+    ready = Task.objects.filter(status=Task.Status.PENDING, run_at__lte=now)
+    if queues:
+        ready = ready.filter(queue__in=queues)
+    ready = ready.order_by('-priority', 'run_at', 'pk')
+    changes = {
+        'status': Task.Status.RUNNING,
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Linhas bloqueadas por outro worker são puladas, sem espera
+            ids = list(ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Task.objects.filter(pk__in=ids).update(**changes)
+        else:
+            # SQLite: o UPDATE ... WHERE pk IN (SELECT ... LIMIT n) é atômico, e as
+            # linhas reivindicadas são identificadas pelo worker e pelo instante
+            Task.objects.filter(
+                pk__in=ready.values('pk')[:limit],
+                status=Task.Status.PENDING
+            ).update(**changes)
+            ids = list(Task.objects.filter(
+                status=Task.Status.RUNNING,
+                locked_by=worker_id,
+                locked_at=now
+            ).order_by('-priority', 'run_at', 'pk').values_list('pk', flat=True))
+    return ids
+
+
+def retry_delay(attempts):
+    """Espera (segundos) antes da próxima tentativa, dobrada a cada falha."""
+    delay = _setting('TASK_RETRY_BACKOFF', 10) * 2 ** max(0, attempts - 1)
+    return min(delay, _setting('TASK_RETRY_MAX_DELAY', 60 * 60))
+
+
+def run_task(task_id, worker_id):
+    """
+    Executa uma tarefa reivindicada por `worker_id` e registra o resultado.
+    Retorna o status final: DONE, PENDING (nova tentativa) ou FAILED.
+
+    Roda nas threads ou processos do pool; a conexão com o banco é reciclada
+    conforme CONN_MAX_AGE, como ao fim de uma requisição.
+    """
+    close_old_connections()
+    try:
+        current = Task.objects.filter(pk=task_id, status=Task.Status.RUNNING, locked_by=worker_id)
+        task_record = current.first()
+        if task_record is None:
+            # Devolvida à fila por exceder TASK_LOCK_TIMEOUT e reivindicada por outro worker
+            return None
+
+        try:
+            func = get_task(task_record.name)
+            if func is None:
+                raise LookupError(f'Tarefa não registrada: {task_record.name}')
+            func(*task_record.args, **task_record.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Falha na tarefa %s (%s)', task_record.pk, task_record.name)
+            _incr('failed')
+            return _schedule_retry(current, task_record, error)
+
+        _update(current, status=Task.Status.DONE, finished_at=timezone.now(), last_error='')
+        _incr('processed')
+        return Task.Status.DONE
+    finally:
+        close_old_connections()
+
+
+@retry_on_lock
+def _update(queryset, **changes):
+    return queryset.update(**changes)
+
+
+@retry_on_lock
+def _schedule_retry(current, task_record, error):
+    now = timezone.now()
+    if task_record.attempts < task_record.max_attempts:
+        try:
+            with transaction.atomic():
+                current.update(
+                    status=Task.Status.PENDING,
+                    run_at=now + timedelta(seconds=retry_delay(task_record.attempts)),
+                    locked_by='',
+                    locked_at=None,
+                    last_error=error
+                )
+            _incr('retried')
+            return Task.Status.PENDING
+        except IntegrityError:
+            # Já há uma tarefa pendente com a mesma chave, que fará o mesmo trabalho
+            error += '\nNova tentativa dispensada: há uma tarefa pendente com a mesma chave.'
+    current.update(status=Task.Status.FAILED, finished_at=now, last_error=error)
+    return Task.Status.FAILED
+
+
+def requeue_stale_tasks():
+    """
+    Devolve à fila as tarefas em execução há mais de TASK_LOCK_TIMEOUT segundos
+    (worker encerrado no meio da execução); as que esgotaram as tentativas são
+    marcadas como falhas. Retorna o número de tarefas devolvidas.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=_setting('TASK_LOCK_TIMEOUT', 60 * 10))
+    )
+    error = 'Tempo de execução excedido (TASK_LOCK_TIMEOUT).'
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.Status.FAILED, finished_at=now, last_error=error
+    )
+    requeued = 0
+    for pk in stale.values_list('pk', flat=True):
+        try:
+            with transaction.atomic():
+                requeued += Task.objects.filter(pk=pk, status=Task.Status.RUNNING).update(
+                    status=Task.Status.PENDING, run_at=now, locked_by='', locked_at=None, last_error=error
+                )
+        except IntegrityError:
+            Task.objects.filter(pk=pk).update(status=Task.Status.FAILED, finished_at=now, last_error=error)
+    return requeued
+
+
+def purge_finished_tasks():
+    """Remove as tarefas concluídas há mais de TASK_RETENTION segundos."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('TASK_RETENTION', 60 * 60 * 24 * 7))
+    deleted, _ = Task.objects.filter(status=Task.Status.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def get_queue_depth(queues=None):
+    """
+    Tarefas prontas, agendadas, em execução e com falha, e o atraso (segundos)
+    da tarefa pronta mais antiga, em uma única consulta de agregação.
+    """
+    now = timezone.now()
+    tasks = Task.objects.exclude(status=Task.Status.DONE)
+    if queues:
+        tasks = tasks.filter(queue__in=queues)
+    ready = Q(status=Task.Status.PENDING, run_at__lte=now)
+    depth = tasks.aggregate(
+        ready=Count('pk', filter=ready),
+        scheduled=Count('pk', filter=Q(status=Task.Status.PENDING, run_at__gt=now)),
+        running=Count('pk', filter=Q(status=Task.Status.RUNNING)),
+        failed=Count('pk', filter=Q(status=Task.Status.FAILED)),
+        oldest=Min('run_at', filter=ready),
+    )
+    oldest = depth.pop('oldest')
+    depth['lag'] = round((now - oldest).total_seconds(), 3) if oldest else 0.0
+    return depth
+
+
+def get_queue_metrics(queues=None):
+    """Contadores de todos os workers (cache) e a profundidade atual da fila."""
+    values = cache.get_many([METRIC_KEY.format(name=name) for name in COUNTERS])
+    metrics = {name: values.get(METRIC_KEY.format(name=name), 0) for name in COUNTERS}
+    metrics['queue'] = get_queue_depth(queues)
+    return metrics
+
+
+def _setup_worker():
+    """Inicializa o Django nos processos do pool quando não herdado (spawn)."""
+    if not apps.ready:
+        import django
+        django.setup()
+    autodiscover_tasks()
+
+
+class Worker:
+    """
+    Laço do comando run_worker: reivindica tarefas conforme há vagas no pool,
+    coleta os resultados e executa a manutenção periódica (tarefas travadas e
+    limpeza das concluídas).
+    """
+
+    def __init__(self, concurrency=4, pool='thread', queues=None, poll_interval=1.0, stats_interval=30,
+                 on_stats=None):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.queues = queues or None
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.on_stats = on_stats
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stopping = threading.Event()
+        self.processed = self.failed = 0
+
+    def stop(self, *args):
+        """Deixa de reivindicar tarefas; as em execução são concluídas."""
+        self.stopping.set()
+
+    def create_executor(self):
+        if self.pool == 'process':
+            executor = ProcessPoolExecutor(max_workers=self.concurrency, initializer=_setup_worker)
+            # Os processos são criados (fork) no primeiro envio: fecha antes as
+            # conexões do worker, para que não sejam compartilhadas com eles
+            connections.close_all()
+            executor.submit(autodiscover_tasks).result()
+            return executor
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='task-worker')
+
+    def run(self, burst=False, max_tasks=None):
+        """
+        Processa tarefas até stop(). Com `burst`, encerra quando não houver
+        tarefas prontas; com `max_tasks`, após reivindicar esse número de tarefas.
+        """
+        autodiscover_tasks()
+        started = time.monotonic()
+        last_maintenance = None
+        claimed = 0
+        in_flight = set()
+
+        with self.create_executor() as executor:
+            while True:
+                now = time.monotonic()
+                if last_maintenance is None or now - last_maintenance >= self.stats_interval:
+                    requeue_stale_tasks()
+                    purge_finished_tasks()
+                    if self.on_stats and last_maintenance is not None:
+                        self.on_stats(self.stats(started))
+                    last_maintenance = now
+
+                free = self.concurrency - len(in_flight)
+                if max_tasks is not None:
+                    free = min(free, max_tasks - claimed)
+                if free > 0 and not self.stopping.is_set():
+                    for task_id in claim_tasks(self.worker_id, free, self.queues):
+                        in_flight.add(executor.submit(run_task, task_id, self.worker_id))
+                        claimed += 1
+
+                if not in_flight:
+                    if burst or self.stopping.is_set() or (max_tasks is not None and claimed >= max_tasks):
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        status = future.result()
+                    except Exception:
+                        # Falha fora da tarefa (processo do pool encerrado, banco indisponível)
+                        logger.exception('Falha no worker ao executar uma tarefa')
+                        status = Task.Status.FAILED
+                    if status == Task.Status.DONE:
+                        self.processed += 1
+                    elif status is not None:
+                        self.failed += 1
+
+        stats = self.stats(started)
+        if self.on_stats:
+            self.on_stats(stats)
+        return stats
+
+    def stats(self, started):
+        """Tarefas deste worker, vazão (tarefas/s) e profundidade da fila."""
+        elapsed = time.monotonic() - started
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'elapsed': elapsed,
+            'throughput': (self.processed + self.failed) / elapsed if elapsed else 0.0,
+            'queue': get_queue_depth(self.queues),
+        }
@@ -0,0 +1,12 @@
+"""
+Tarefas em segundo plano do app core (ver core.taskqueue).
+"""
+from django.core.mail import send_mail
+
+from .taskqueue import task
+
+
+@task(queue='email', priority=20, max_attempts=5)
+def send_email(subject, body, from_email, recipient_list, html_message=None):
+    """Envia um email já renderizado (o envio SMTP sai do ciclo da requisição)."""
+    send_mail(subject, body, from_email, recipient_list, html_message=html_message)
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core.images import ImageDerivatives
+
+register = template.Library()
+
+@register.filter
+def derivatives(image):
+    """
+    Retorna as derivadas responsivas de uma imagem (ex.: course.image), com
+    `srcset`, `webp_srcset` e `url(largura)`.
+    """
+    return ImageDerivatives(image)
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', src_width=None, **attrs):
+    """
+    Renderiza um <picture> com as derivadas WebP e JPEG/PNG da imagem. `sizes`
+    descreve a largura exibida (ex.: "(max-width: 768px) 100vw, 33vw"), `src_width`
+    escolhe o `src` de fallback e os demais argumentos viram atributos do <img>
+    (loading="lazy" por padrão; use loading="eager" nas imagens do topo).
+    Enquanto as derivadas não foram geradas, usa a imagem original.
+    """
+    image = ImageDerivatives(image)
+    if not image:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    attributes = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    if not image.is_ready:
+        return format_html('<img src="{}" {}>', image.url(), attributes)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        image.webp_srcset, sizes, image.url(src_width), image.srcset, sizes, attributes
+    )
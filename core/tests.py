@@ -1,3 +1,796 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import warnings
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from config.database import configure_sqlite_connection
+from courses.models import Course, Enrollment, Lesson, LessonProgress
+
+from .images import ImageDerivatives, build_derivatives
+from .instrumentation import QueryRecorder, SQLBudgetExceeded, SQLBudgetWarning, fingerprint
+from .models import Task, User
+from .pagination import InvalidCursor, KeysetPaginator
+from .routers import STICKY_COOKIE, ReplicaRouter, RoutingState, _routing, use_primary
+from .seeding import LoadDataSpec, seed_load_data
+from .slugs import allocate_unique_value, assign_unique_values
+from .staticfiles import IMMUTABLE_CACHE_CONTROL, StaticFilesMiddleware, brotli, compress_file
+from .taskqueue import claim_tasks, enqueue, run_task, task
+from .transactions import is_lock_error, retry_on_lock
+
+calls = []
+
+
+@task(name='core.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='core.tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('falhou')
+
+
+@override_settings(TASKS_EAGER=False, TASK_RETRY_BACKOFF=0)
+class TaskQueueTests(TestCase):
+    """Enfileiramento, reivindicação e execução das tarefas em segundo plano."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_tasks_are_deduplicated(self):
+        first = enqueue(record, args=[1], dedup_key='record')
+        self.assertEqual(enqueue('core.tests.record', args=[2], dedup_key='record'), first)
+
+        # Depois de reivindicada, uma nova tarefa com a mesma chave é aceita
+        claim_tasks('worker', 1)
+        self.assertNotEqual(enqueue(record, args=[3], dedup_key='record').pk, first.pk)
+
+    def test_claim_respects_priority_and_schedule(self):
+        low = enqueue(record, args=['baixa'])
+        high = enqueue(record, args=['alta'], priority=10)
+        enqueue(record, args=['agendada'], run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(claim_tasks('worker', 10), [high.pk, low.pk])
+        self.assertEqual(claim_tasks('other', 10), [])
+
+    def test_run_task(self):
+        pending = enqueue(record, args=['ok'])
+        [task_id] = claim_tasks('worker', 1)
+
+        self.assertEqual(run_task(task_id, 'worker'), Task.Status.DONE)
+        self.assertEqual(calls, ['ok'])
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.attempts), (Task.Status.DONE, 1))
+        # Tarefa de outro worker não é executada
+        self.assertIsNone(run_task(task_id, 'other'))
+
+    def test_failed_task_is_retried_until_max_attempts(self):
+        failing = enqueue(explode)
+        with self.assertLogs('core.taskqueue', 'ERROR'):
+            self.assertEqual(run_task(claim_tasks('worker', 1)[0], 'worker'), Task.Status.PENDING)
+            self.assertEqual(run_task(claim_tasks('worker', 1)[0], 'worker'), Task.Status.FAILED)
+
+        failing.refresh_from_db()
+        self.assertEqual(failing.attempts, 2)
+        self.assertIn('RuntimeError', failing.last_error)
+        self.assertEqual(claim_tasks('worker', 1), [])
+
+    def test_unregistered_function_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue(lambda: None)
+
+
+class MiddlewareTests(SimpleTestCase):
+    """Middlewares compatíveis com o handler ASGI."""
+
+    def test_middleware_is_async_capable(self):
+        # Um único middleware síncrono faz o Django adaptar a cadeia inteira
+        sync_only = [
+            path for path in settings.MIDDLEWARE
+            if not getattr(import_string(path), 'async_capable', False)
+        ]
+        self.assertEqual(sync_only, [])
+
+
+class KeysetPaginatorTests(TestCase):
+    """Paginação por chave: cursores de ida e volta e desempate por id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        professor = User.objects.create_user(email='professor@example.com', password='x', user_type='PROFESSOR')
+        courses = [
+            Course.objects.create(professor=professor, title=f'Curso {index}', price=0)
+            for index in range(7)
+        ]
+        # Três cursos com o mesmo created_at e dois separados por um microssegundo
+        now = timezone.now().replace(microsecond=500)
+        Course.objects.filter(pk__in=[course.pk for course in courses[:3]]).update(created_at=now)
+        Course.objects.filter(pk=courses[3].pk).update(created_at=now + timedelta(microseconds=1))
+        Course.objects.filter(pk=courses[4].pk).update(created_at=now - timedelta(microseconds=1))
+        for hours, course in enumerate(courses[5:], start=1):
+            Course.objects.filter(pk=course.pk).update(created_at=now - timedelta(hours=hours))
+        cls.tied = sorted((course.pk for course in courses[:3]), reverse=True)
+        cls.expected = [courses[3].pk, *cls.tied, courses[4].pk, courses[5].pk, courses[6].pk]
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Course.objects.all(), 2, ('-created_at', '-id'))
+
+    def ids(self, page):
+        return [course.pk for course in page]
+
+    def test_cursors_round_trip(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(len(pages), 4)
+
+        # Voltando pelos cursores "anterior", as mesmas páginas na ordem inversa
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.paginator.page(page.previous_cursor)
+            self.assertEqual(self.ids(page), self.ids(expected))
+        self.assertFalse(page.has_previous())
+
+    def test_ties_are_broken_by_id(self):
+        tied = self.tied
+
+        # O cursor de um curso empatado não pula nem repete os demais
+        cursor = self.paginator.encode_cursor('n', Course.objects.get(pk=tied[0]))
+        self.assertEqual(self.ids(self.paginator.page(cursor)), tied[1:])
+        cursor = self.paginator.encode_cursor('p', Course.objects.get(pk=tied[2]))
+        self.assertEqual(self.ids(self.paginator.page(cursor)), tied[:2])
+
+    def test_invalid_cursor(self):
+        for cursor in ('x', 'bm90IGpzb24', self.paginator.encode_cursor('n', Course.objects.first())[:-4]):
+            with self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+
+class UniqueSlugTests(TestCase):
+    """Slugs únicos de cursos: sufixos, colisões e alocação em lote."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='professor@example.com', password='x', user_type='PROFESSOR')
+
+    def create(self, title, **kwargs):
+        return Course.objects.create(professor=self.professor, title=title, price=0, **kwargs)
+
+    def test_colliding_titles_get_the_first_free_suffix(self):
+        slugs = [self.create('Violão').slug for _index in range(3)]
+        self.assertEqual(slugs, ['violao', 'violao-1', 'violao-2'])
+
+        # Um sufixo liberado volta a ser usado
+        Course.objects.filter(slug='violao-1').delete()
+        self.assertEqual(self.create('Violão').slug, 'violao-1')
+
+    def test_similar_slugs_do_not_collide(self):
+        for slug in ('violao-acustico', 'violao-01', 'violao-2'):
+            self.create('Outro', slug=slug)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_unique_value(Course, 'slug', 'violao'), 'violao')
+        self.create('Violão')
+        self.assertEqual(allocate_unique_value(Course, 'slug', 'violao'), 'violao-1')
+
+    def test_long_titles_keep_room_for_the_suffix(self):
+        first, second = self.create('a' * 250), self.create('a' * 250)
+        max_length = Course._meta.get_field('slug').max_length
+        self.assertLessEqual(len(second.slug), max_length)
+        self.assertEqual(second.slug, f'{first.slug}-1')
+
+    def test_assign_unique_values_in_bulk(self):
+        self.create('Piano')
+        courses = [
+            Course(professor=self.professor, title='Piano', price=0),
+            Course(professor=self.professor, title='Piano', price=0, slug='piano-1'),
+            Course(professor=self.professor, title='Piano', price=0),
+        ]
+        with self.assertNumQueries(1):
+            assign_unique_values(courses, 'slug', lambda course: slugify(course.title))
+        self.assertEqual([course.slug for course in courses], ['piano-2', 'piano-1', 'piano-3'])
+
+    def test_concurrent_collision_is_retried(self):
+        self.create('Bateria')
+        # Simula outro processo ocupando "bateria" entre a leitura e o INSERT
+        with mock.patch('core.slugs.allocate_unique_value', side_effect=['bateria', 'bateria-1']):
+            self.assertEqual(self.create('Bateria').slug, 'bateria-1')
+
+
+@override_settings(SQL_INSTRUMENTATION=True, SQL_BUDGET_STRICT=False, SQL_QUERY_BUDGETS={})
+class QueryInstrumentationTests(TestCase):
+    """QueryRecorder e orçamentos de consultas do QueryInstrumentationMiddleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(
+            email='professor@example.com', password='senha', user_type='PROFESSOR'
+        )
+        Course.objects.create(professor=cls.professor, title='Violão', price=0, status='PUBLISHED')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('courses:student:course_list')
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'a''b' AND x IN (%s, %s,%s)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)'
+        )
+
+    def test_recorder_detects_repeated_shapes(self):
+        with QueryRecorder() as recorder:
+            for pk in range(4):
+                list(Course.objects.filter(pk=pk))
+            User.objects.count()
+        self.assertEqual(recorder.count, 5)
+        self.assertGreaterEqual(recorder.duration, 0)
+        self.assertEqual(recorder.repeated(4), {})
+        (shape, count), = recorder.repeated(3).items()
+        self.assertIn('courses_course', shape)
+        self.assertEqual(count, 4)
+
+    def test_within_budget(self):
+        with self.settings(SQL_QUERY_BUDGETS={'courses:student:course_list': 8}):
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', SQLBudgetWarning)
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(int(response['X-SQL-Queries']), 8)
+
+    def test_over_budget_warns(self):
+        with self.settings(SQL_QUERY_BUDGETS={'courses:student:course_list': 0}):
+            with self.assertWarnsRegex(SQLBudgetWarning, 'courses:student:course_list'), \
+                    self.assertLogs('core.instrumentation', 'WARNING'):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_strict_budget_fails_the_request(self):
+        with self.settings(SQL_BUDGET_STRICT=True, SQL_QUERY_BUDGETS={'courses:student:course_list': 0}):
+            with self.assertRaisesRegex(SQLBudgetExceeded, r'orçamento: 0'), \
+                    self.assertLogs('core.instrumentation', 'WARNING'):
+                self.client.get(self.url)
+
+    def test_strict_repeated_shape_fails_the_request(self):
+        with self.settings(SQL_BUDGET_STRICT=True, SQL_REPEATED_QUERY_THRESHOLD=0):
+            with self.assertRaisesRegex(SQLBudgetExceeded, 'repetida'), \
+                    self.assertLogs('core.instrumentation', 'WARNING'):
+                self.client.get(self.url)
+
+
+REPLICA = settings.TEST_REPLICA_ALIAS
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Roteamento com a réplica de teste, que espelha o primário. TransactionTestCase
+    porque a conexão da réplica só enxerga dados já gravados.
+    """
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.professor = User.objects.create_user(
+            email='professor@example.com', password='senha', user_type='PROFESSOR'
+        )
+        self.student = User.objects.create_user(
+            email='aluno@example.com', password='senha', user_type='STUDENT'
+        )
+        self.course = Course.objects.create(
+            professor=self.professor, title='Violão', price=0, status='PUBLISHED'
+        )
+
+    def routed_reads(self):
+        """Registra o banco escolhido pelo roteador para cada leitura, em qualquer thread."""
+        reads = []
+        original = ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            reads.append(original(router, model, **hints))
+            return reads[-1]
+
+        return mock.patch.object(ReplicaRouter, 'db_for_read', db_for_read), reads
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Course))
+
+        state = RoutingState()
+        state.replica = REPLICA
+        token = _routing.set(state)
+        try:
+            self.assertEqual(router.db_for_read(Course), REPLICA)
+            self.assertIsNone(router.db_for_read(Session))
+            with use_primary():
+                self.assertIsNone(router.db_for_read(Course))
+            self.assertEqual(router.db_for_read(Course), REPLICA)
+
+            self.assertEqual(router.db_for_write(Course), 'default')
+            self.assertIsNone(router.db_for_read(Course))
+        finally:
+            _routing.reset(token)
+        self.assertFalse(router.allow_migrate(REPLICA, 'courses'))
+
+    def test_read_only_view_reads_from_the_replica(self):
+        replica = CaptureQueriesContext(connections[REPLICA])
+        with replica:
+            response = self.client.get(reverse('courses:student:course_list'))
+        self.assertContains(response, 'Violão')
+        self.assertTrue(any('courses_course' in query['sql'] for query in replica.captured_queries))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertIsNone(_routing.get())
+
+    def test_write_pins_reads_to_the_primary(self):
+        self.client.force_login(self.student)
+        patch, reads = self.routed_reads()
+        with patch:
+            response = self.client.post(
+                reverse('courses:student:course_enroll', kwargs={'pk': self.course.pk}),
+                {'confirm': True}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertNotIn(REPLICA, reads)
+
+        # O cookie mantém as leituras seguintes do aluno no primário
+        reads.clear()
+        replica = CaptureQueriesContext(connections[REPLICA])
+        with patch, replica:
+            response = self.client.get(reverse('courses:student:dashboard'))
+        self.assertContains(response, 'Violão')
+        self.assertTrue(reads)
+        self.assertNotIn(REPLICA, reads)
+        self.assertEqual(replica.captured_queries, [])
+
+        # Sem o cookie, a escrita da requisição anterior não vaza para a próxima
+        del self.client.cookies[STICKY_COOKIE]
+        reads.clear()
+        with patch:
+            self.client.get(reverse('courses:student:dashboard'))
+        self.assertIn(REPLICA, reads)
+        self.assertIsNone(_routing.get())
+
+    async def test_async_requests_reset_the_state(self):
+        patch, reads = self.routed_reads()
+        with patch:
+            response = await self.async_client.get(reverse('courses:student:async_course_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(REPLICA, reads)
+        self.assertIsNone(_routing.get())
+
+        # Uma escrita em uma requisição não afeta a seguinte
+        state = RoutingState()
+        state.wrote = True
+        token = _routing.set(state)
+        try:
+            await cache.aclear()
+            reads.clear()
+            with patch:
+                await self.async_client.get(reverse('courses:student:async_course_list'))
+            self.assertIn(REPLICA, reads)
+        finally:
+            _routing.reset(token)
+
+
+SMALL_SPEC = dict(
+    professors=2, courses_per_professor=3, lessons_per_course=3,
+    students=6, enrollments_per_student=2, draft_ratio=0.3,
+)
+
+
+class SeedLoadDataTests(TestCase):
+    """Conjunto de dados sintético: determinístico e coerente com o que save() gravaria."""
+
+    def snapshot(self, spec):
+        """Dados gerados pela `spec`, sem chaves primárias; desfaz a geração."""
+        with transaction.atomic():
+            result = seed_load_data(spec)
+            data = {
+                'courses': list(Course.objects.order_by('pk').values_list(
+                    'professor__email', 'title', 'slug', 'price', 'status', 'published_lessons_count'
+                )),
+                'lessons': list(Lesson.objects.order_by('pk').values_list('course__slug', 'order', 'status', 'youtube_id')),
+                'enrollments': list(Enrollment.objects.order_by('pk').values_list(
+                    'student__email', 'course__slug', 'status', 'progress', 'completed_lessons_count'
+                )),
+                'progresses': list(LessonProgress.objects.order_by('pk').values_list(
+                    'enrollment__student__email', 'lesson__title', 'is_completed'
+                )),
+            }
+            transaction.set_rollback(True)
+        return result, data
+
+    def test_same_seed_same_data(self):
+        result, data = self.snapshot(LoadDataSpec(**SMALL_SPEC))
+        self.assertEqual(
+            (len(result.professors), result.courses, result.lessons, len(result.students), result.enrollments),
+            (2, 6, 18, 6, 12)
+        )
+        self.assertEqual(result.progresses, len(data['progresses']))
+        self.assertEqual(self.snapshot(LoadDataSpec(**SMALL_SPEC))[1], data)
+        self.assertNotEqual(self.snapshot(LoadDataSpec(**SMALL_SPEC, seed=7))[1], data)
+
+    def test_denormalized_fields_match(self):
+        seed_load_data(LoadDataSpec(**SMALL_SPEC))
+        for course in Course.objects.all():
+            self.assertEqual(course.published_lessons_count, course.lessons.filter(status='PUBLISHED').count())
+        for enrollment in Enrollment.objects.all():
+            completed = enrollment.lesson_progresses.filter(is_completed=True, lesson__status='PUBLISHED').count()
+            self.assertEqual(enrollment.completed_lessons_count, completed)
+        self.assertEqual(len({course.slug for course in Course.objects.all()}), 6)
+
+        # Uma nova execução com a mesma semente continua a numeração dos usuários
+        result = seed_load_data(LoadDataSpec(**SMALL_SPEC))
+        self.assertEqual(result.students[0].email, 'load-55-aluno-8@example.com')
+        self.assertEqual(Course.objects.count(), 12)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('seed_load_data', professors=1, courses_per_professor=1, lessons_per_course=2,
+                     students=2, enrollments_per_student=1, stdout=stdout)
+        self.assertIn('1 professor(es), 1 curso(s), 2 aula(s), 2 aluno(s)', stdout.getvalue())
+
+
+@mock.patch(
+    'core.management.commands.benchmark_urls.LoadDataSpec',
+    lambda seed: LoadDataSpec(**SMALL_SPEC, seed=seed)
+)
+class BenchmarkUrlsTests(TestCase):
+    """Linha de base do benchmark_urls e a saída com erro em caso de regressão."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'baseline.json'
+
+    def benchmark(self, *args):
+        stdout = StringIO()
+        call_command('benchmark_urls', '--sizes=1', '--repeat=1', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_baseline_and_regressions(self):
+        output = self.benchmark(f'--save-baseline={self.baseline}')
+        self.assertIn('Tamanho 1: 6 cursos', output)
+        results = json.loads(self.baseline.read_text())
+        route = results['1']['courses:student:course_list']
+        self.assertEqual(route['status'], 200)
+        self.assertGreater(route['queries'], 0)
+
+        # Sem piora: tolerância alta para o tempo, mesmas consultas
+        output = self.benchmark(f'--baseline={self.baseline}', '--tolerance=1000', '--fail-on-regression')
+        self.assertIn('Nenhuma regressão', output)
+
+        route['queries'] -= 1
+        self.baseline.write_text(json.dumps(results))
+        output = self.benchmark(f'--baseline={self.baseline}', '--tolerance=1000')
+        self.assertIn(f"courses:student:course_list: consultas {route['queries']} -> {route['queries'] + 1}", output)
+        with self.assertRaisesMessage(CommandError, '1 regressão(ões)'):
+            self.benchmark(f'--baseline={self.baseline}', '--tolerance=1000', '--fail-on-regression')
+
+    def test_unreadable_baseline(self):
+        with self.assertRaisesMessage(CommandError, 'Não foi possível ler a linha de base'):
+            self.benchmark(f'--baseline={self.baseline}')
+
+
+@override_settings(DB_LOCK_RETRIES=3, DB_LOCK_RETRY_DELAY=0)
+class RetryOnLockTests(TransactionTestCase):
+    """Novas tentativas de transações de escrita quando o banco está bloqueado."""
+
+    def locked(self, times):
+        """Função que cria um usuário e falha com o banco bloqueado nas `times` primeiras chamadas."""
+        calls = []
+
+        @retry_on_lock
+        def create_user():
+            calls.append(1)
+            with transaction.atomic():
+                user = User.objects.create_user(email='aluno@example.com', password='x')
+                if len(calls) <= times:
+                    raise OperationalError('database is locked')
+            return user
+
+        return create_user, calls
+
+    def test_retried_until_it_succeeds(self):
+        create_user, calls = self.locked(2)
+        with self.assertLogs('core.transactions', 'INFO') as logs:
+            user = create_user()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(logs.output), 2)
+        # As tentativas que falharam foram desfeitas
+        self.assertEqual(list(User.objects.all()), [user])
+
+    def test_gives_up_after_the_retries(self):
+        create_user, calls = self.locked(10)
+        with self.assertRaisesMessage(OperationalError, 'database is locked'), self.assertLogs('core.transactions'):
+            create_user()
+        self.assertEqual(len(calls), 4)
+        self.assertFalse(User.objects.exists())
+
+    def test_not_retried_inside_an_outer_atomic(self):
+        create_user, calls = self.locked(1)
+        with self.assertRaises(OperationalError), transaction.atomic():
+            create_user()
+        self.assertEqual(len(calls), 1)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        @retry_on_lock
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: x')
+
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 1)
+
+    def test_is_lock_error(self):
+        self.assertTrue(is_lock_error(OperationalError('database table is locked')))
+        self.assertFalse(is_lock_error(OperationalError('disk I/O error')))
+        for attribute, code, expected in (('pgcode', '40001', True), ('sqlstate', '40P01', True), ('pgcode', '23505', False)):
+            cause = Exception()
+            setattr(cause, attribute, code)
+            error = OperationalError('erro')
+            error.__cause__ = cause
+            self.assertIs(is_lock_error(error), expected)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    """Pragmas aplicadas às novas conexões SQLite pelo receptor de connection_created."""
+
+    @override_settings(SQLITE_PRAGMAS={**settings.SQLITE_PRAGMAS, 'busy_timeout': 1234})
+    def test_new_connections_use_wal_and_busy_timeout(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Pragmas do SQLite')
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = connections['default'].__class__(
+                {**connections['default'].settings_dict, 'NAME': str(Path(directory) / 'db.sqlite3')}
+            )
+            try:
+                wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 1234)
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+            finally:
+                wrapper.close()
+
+    def test_other_databases_are_ignored(self):
+        other = mock.Mock(vendor='postgresql')
+        configure_sqlite_connection(sender=None, connection=other)
+        other.connection.execute.assert_not_called()
+
+
+def image_file(name, size=(700, 350), mode='RGB', image_format='JPEG'):
+    output = BytesIO()
+    Image.new(mode, size, (200, 80, 40, 128) if mode == 'RGBA' else (200, 80, 40)).save(output, image_format)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+@override_settings(IMAGE_DERIVATIVES_ASYNC=False)
+class ImageDerivativeTests(TestCase):
+    """Derivadas responsivas geradas após o commit e o <picture> do template."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(
+            email='professor@example.com', password='senha', user_type='PROFESSOR'
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_course(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(professor=self.professor, title='Violão', price=0, image=image)
+        course.refresh_from_db()
+        return course
+
+    def test_derivatives_sizes_and_formats(self):
+        course = self.create_course(image_file('capa.jpg'))
+        manifest = course.image_derivatives
+
+        self.assertEqual(manifest['source'], course.image.name)
+        self.assertEqual((manifest['width'], manifest['height']), (700, 350))
+        # Larguras limitadas à do original
+        self.assertEqual([width for width, name in manifest['fallback']], [320, 640, 700])
+        self.assertEqual([width for width, name in manifest['webp']], [320, 640, 700])
+        for key, image_format in (('fallback', 'JPEG'), ('webp', 'WEBP')):
+            for width, name in manifest[key]:
+                self.assertRegex(name, rf'^course_images/capa\.[0-9a-f]{{12}}\.{width}w\.(jpg|webp)$')
+                with Image.open(self.media_root / name) as derivative:
+                    self.assertEqual(derivative.format, image_format)
+                    self.assertEqual(derivative.size, (width, width // 2))
+
+    def test_transparent_images_fall_back_to_png(self):
+        course = self.create_course(image_file('logo.png', size=(400, 400), mode='RGBA', image_format='PNG'))
+        width, name = course.image_derivatives['fallback'][0]
+        self.assertTrue(name.endswith('.320w.png'))
+        with Image.open(self.media_root / name) as derivative:
+            self.assertEqual(derivative.mode, 'RGBA')
+
+    def test_existing_derivatives_are_kept(self):
+        course = self.create_course(image_file('capa.jpg'))
+        storage = course.image.storage
+        with mock.patch.object(storage, 'save') as save:
+            manifest = build_derivatives(course.image.name, (320, 640), storage)
+        save.assert_not_called()
+        self.assertEqual(manifest['fallback'], course.image_derivatives['fallback'][:2])
+
+    def test_new_image_replaces_the_derivatives(self):
+        course = self.create_course(image_file('capa.jpg'))
+        old = [name for key in ('fallback', 'webp') for width, name in course.image_derivatives[key]]
+
+        course.image = image_file('nova.jpg', size=(500, 250))
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        course.refresh_from_db()
+        self.assertEqual([width for width, name in course.image_derivatives['fallback']], [320, 500])
+        self.assertFalse(any((self.media_root / name).exists() for name in old))
+
+    def test_responsive_image(self):
+        template = Template(
+            '{% load image_tags %}{% responsive_image course.image sizes="50vw" src_width=600 alt="Capa" %}'
+        )
+        course = Course(professor=self.professor, title='Violão', price=0, image='course_images/capa.jpg')
+        # Sem derivadas, o <img> usa o original
+        self.assertHTMLEqual(
+            template.render(Context({'course': course})),
+            '<img src="/media/course_images/capa.jpg" alt="Capa" decoding="async" loading="lazy">'
+        )
+
+        course = self.create_course(image_file('capa.jpg'))
+        manifest = course.image_derivatives
+        urls = {(key, width): f'/media/{name}' for key in ('fallback', 'webp') for width, name in manifest[key]}
+        self.assertHTMLEqual(
+            template.render(Context({'course': course})),
+            '<picture><source type="image/webp" sizes="50vw" srcset="{} 320w, {} 640w, {} 700w">'
+            '<img src="{}" srcset="{} 320w, {} 640w, {} 700w" sizes="50vw" alt="Capa" decoding="async" loading="lazy">'
+            '</picture>'.format(
+                urls['webp', 320], urls['webp', 640], urls['webp', 700], urls['fallback', 640],
+                urls['fallback', 320], urls['fallback', 640], urls['fallback', 700],
+            )
+        )
+        self.assertEqual(ImageDerivatives(course.image).url(), urls['fallback', 700])
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    """Entrega de STATIC_ROOT: cache imutável dos arquivos com hash e variantes comprimidas."""
+    css = 'body { color: #333; }\n' * 100
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        base = Path(directory.name)
+        root = base / 'static'
+        (root / 'css').mkdir(parents=True)
+        for name in ('css/app.css', 'css/app.0123456789ab.css'):
+            (root / name).write_text(self.css)
+            compress_file(str(root / name))
+        (root / 'staticfiles.json').write_text(json.dumps({'paths': {'css/app.css': 'css/app.0123456789ab.css'}}))
+        (base / 'segredo.txt').write_text('segredo')
+
+        static = override_settings(STATIC_ROOT=str(root), STATIC_SERVE=True, STATIC_MAX_AGE=60)
+        static.enable()
+        self.addCleanup(static.disable)
+        self.factory = RequestFactory()
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse('view', status=404))
+
+    def get(self, path, encoding=None, **extra):
+        if encoding is not None:
+            extra['HTTP_ACCEPT_ENCODING'] = encoding
+        return self.middleware(self.factory.get(path, **extra))
+
+    def content(self, response):
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_hashed_files_are_immutable(self):
+        response = self.get('/static/css/app.0123456789ab.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(self.content(response).decode(), self.css)
+        response.close()
+
+    def test_unhashed_files_use_the_short_max_age(self):
+        response = self.get('/static/css/app.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response.close()
+
+    def test_accept_encoding(self):
+        preferred = 'br' if brotli is not None else 'gzip'
+        for header, expected in (
+            ('gzip, deflate, br', preferred),
+            ('gzip', 'gzip'),
+            ('br;q=0, gzip;q=0.5', 'gzip'),
+            ('identity', None),
+        ):
+            with self.subTest(header=header):
+                response = self.get('/static/css/app.0123456789ab.css', header)
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                content = self.content(response)
+                self.assertEqual(int(response['Content-Length']), len(content))
+                if expected == 'gzip':
+                    content = gzip.decompress(content)
+                elif expected == 'br':
+                    content = brotli.decompress(content)
+                self.assertEqual(content.decode(), self.css)
+                response.close()
+
+    def test_conditional_and_head_requests(self):
+        response = self.get('/static/css/app.0123456789ab.css', 'gzip')
+        etag = response['ETag']
+        response.close()
+        response = self.get('/static/css/app.0123456789ab.css', 'gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.middleware(self.factory.head('/static/css/app.css'))
+        self.assertEqual(response.content, b'')
+        self.assertEqual(int(response['Content-Length']), len(self.css))
+        self.assertEqual(self.middleware(self.factory.post('/static/css/app.css')).status_code, 405)
+
+    def test_missing_and_outside_files_fall_through(self):
+        for path in (
+            '/static/css/nada.css',
+            '/static/staticfiles.json.gz',
+            '/static/../segredo.txt',
+            '/static/css/../../segredo.txt',
+            '/static/%2e%2e/segredo.txt',
+            '/outra/css/app.css',
+        ):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.content, b'view')
+
+    async def test_async(self):
+        async def get_response(request):
+            return HttpResponse('view', status=404)
+
+        middleware = StaticFilesMiddleware(get_response)
+        response = await middleware(self.factory.get('/static/css/app.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(gzip.decompress(response.content).decode(), self.css)
+        response = await middleware(self.factory.get('/static/css/nada.css'))
+        self.assertEqual(response.content, b'view')
+
+    def test_disabled(self):
+        with self.settings(STATIC_SERVE=False), self.assertRaises(MiddlewareNotUsed):
+            StaticFilesMiddleware(lambda request: HttpResponse())
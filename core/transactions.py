@@ -0,0 +1,63 @@
+"""
+Novas tentativas de transações de escrita bloqueadas por outras escritas.
+
+No SQLite há um único escritor por vez: passado o busy_timeout, ou quando uma
+transação que começou lendo tenta escrever depois de outra ter feito commit, a
+escrita falha com "database is locked". No PostgreSQL, o equivalente são as
+falhas de serialização e os deadlocks. Em todos esses casos a transação
+inteira pode ser repetida com segurança.
+
+    @retry_on_lock
+    def complete_lesson(enrollment, lesson):
+        ...
+
+A função decorada deve abrir a própria transação (transaction.atomic) e ser
+idempotente em relação ao banco. Dentro de um bloco atômico externo não há
+nova tentativa: a transação externa já está comprometida e o erro é propagado.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# Mensagens do SQLite e SQLSTATEs do PostgreSQL (serialização, deadlock, lock_not_available)
+SQLITE_LOCK_MESSAGES = ('database is locked', 'database table is locked')
+POSTGRES_LOCK_CODES = {'40001', '40P01', '55P03'}
+
+
+def is_lock_error(error):
+    """Indica se o erro é uma disputa de bloqueio que justifica repetir a transação."""
+    if any(message in str(error) for message in SQLITE_LOCK_MESSAGES):
+        return True
+    # psycopg2 expõe o SQLSTATE em `pgcode`; psycopg 3, em `sqlstate`
+    cause = error.__cause__
+    code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+    return code in POSTGRES_LOCK_CODES
+
+
+def retry_on_lock(func):
+    """
+    Repete `func` até DB_LOCK_RETRIES vezes quando o banco está bloqueado,
+    esperando DB_LOCK_RETRY_DELAY segundos (dobrados a cada tentativa, com
+    variação aleatória para que as escritas concorrentes não colidam de novo).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = getattr(settings, 'DB_LOCK_RETRIES', 5)
+        delay = getattr(settings, 'DB_LOCK_RETRY_DELAY', 0.05)
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt >= retries or connection.in_atomic_block or not is_lock_error(error):
+                    raise
+                attempt += 1
+                logger.info('%s: banco bloqueado, nova tentativa %d de %d', func.__qualname__, attempt, retries)
+                time.sleep(delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    return wrapper
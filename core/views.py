@@ -1,3 +1,11 @@
-from django.shortcuts import render
+from django.views.generic import TemplateView
 
-# Create your views here.
+from .response_cache import AnonymousResponseCacheMixin
+
+
+class HomeView(AnonymousResponseCacheMixin, TemplateView):
+    """
+    Página inicial. Para visitantes anônimos, a resposta vem do cache de
+    páginas públicas (core.response_cache).
+    """
+    template_name = 'home.html'
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.translation import gettext_lazy as _
 
 from .models import Course, Lesson
@@ -34,11 +35,17 @@ class CourseAdmin(admin.ModelAdmin):
     )
     
     inlines = [LessonInline]
+    list_select_related = ('professor',)
+    
+    def get_queryset(self, request):
+        # Conta as aulas na consulta da listagem, em vez de um COUNT por linha
+        return super().get_queryset(request).annotate(lessons_count=Count('lessons'))
     
     def get_lessons_count(self, obj):
         """Retorna o número de aulas do curso."""
-        return obj.lessons.count()
+        return obj.lessons_count
     get_lessons_count.short_description = _('Aulas')
+    get_lessons_count.admin_order_field = 'lessons_count'
 
 
 @admin.register(Lesson)
@@ -47,6 +54,7 @@ class LessonAdmin(admin.ModelAdmin):
     Configuração da interface de administração para o modelo Lesson.
     """
     list_display = ('title', 'course', 'order', 'status', 'created_at')
+    list_select_related = ('course',)
     list_filter = ('status', 'course', 'created_at')
     search_fields = ('title', 'description', 'course__title')
     readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,163 @@
+"""
+Versões assíncronas dos caminhos mais acessados pelos alunos: catálogo, página
+de aprendizado e conclusão de aula.
+
+Servidas sob ASGI (config.asgi), as consultas usam a API assíncrona do ORM
+(`aget`, `aexists`, `afirst`, iteração assíncrona) e do cache, sem bloquear o
+worker enquanto aguardam o banco. As operações que dependem de transação
+(Enrollment.rebuild_completion_bitmap e LessonProgress.complete) continuam
+síncronas e são executadas com sync_to_async. Sob WSGI as views também
+funcionam, mas sem ganho: prefira as views de courses.student_views.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.mixins import AccessMixin
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.views import View
+
+from core.pagination import InvalidCursor, KeysetPaginator
+
+from .cache import aget_enrolled_course_ids, aget_published_course, aget_published_lessons
+from .models import Enrollment, Lesson, LessonProgress
+from .services import complete_lesson
+from .student_views import CourseListView, lesson_navigation, next_lesson_url
+
+
+async def aget_user(request):
+    """
+    Resolve `request.user` fora do loop de eventos: o usuário é carregado de
+    forma preguiçosa a partir da sessão, o que consulta o banco.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+class AsyncStudentRequiredMixin(AccessMixin):
+    """
+    Variante assíncrona de LoginRequiredMixin + StudentRequiredMixin: exige um
+    aluno autenticado e, em seguida, `atest_func()`.
+    """
+    async def atest_func(self, user):
+        return True
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated or not user.is_student or not await self.atest_func(user):
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncEnrollmentRequiredMixin(AsyncStudentRequiredMixin):
+    """
+    Variante assíncrona de EnrollmentRequiredMixin. A matrícula ativa carregada
+    na verificação fica em `self.enrollment`, reaproveitada pelos handlers.
+    """
+    enrollment = None
+
+    async def atest_func(self, user):
+        course_id = self.kwargs.get('course_id') or self.kwargs.get('pk')
+        if not course_id:
+            return False
+        self.enrollment = await Enrollment.objects.filter(
+            student_id=user.pk,
+            course_id=course_id,
+            status=Enrollment.Status.ACTIVE
+        ).afirst()
+        return self.enrollment is not None
+
+
+class AsyncCourseListView(CourseListView):
+    """
+    Catálogo de cursos assíncrono. Reaproveita a montagem do queryset e do
+    contexto de CourseListView; apenas a paginação e o conjunto de matrículas
+    são obtidos de forma assíncrona antes da renderização.
+    """
+    async def get(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        self.object_list = self.get_queryset()
+        self.paginated = await self.apaginate_queryset(self.object_list, self.get_paginate_by(self.object_list))
+        self.enrolled_course_ids = await aget_enrolled_course_ids(user)
+        return self.render_to_response(self.get_context_data())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset_ordering(queryset)
+        if ordering:
+            paginator = KeysetPaginator(queryset, page_size, ordering, count_total=self.count_total)
+            try:
+                page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+            except InvalidCursor:
+                raise Http404('Cursor de paginação inválido.')
+            return (paginator, page, page.object_list, page.has_other_pages())
+
+        # Ordenação por relevância: paginação por número de página, com a
+        # contagem e a página carregadas de forma assíncrona
+        paginator = Paginator(queryset, page_size)
+        paginator.count = await queryset.acount()
+        try:
+            page = paginator.page(self.request.GET.get(self.page_kwarg) or 1)
+        except InvalidPage:
+            raise Http404('Página inválida.')
+        page.object_list = [course async for course in page.object_list]
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.paginated
+
+    def get_enrolled_course_ids(self):
+        return self.enrolled_course_ids
+
+
+class AsyncCourseLearnView(AsyncEnrollmentRequiredMixin, View):
+    """Página de aprendizado assíncrona (ver student_views.CourseLearnView)."""
+    template_name = 'courses/student/course_learn.html'
+
+    async def get(self, request, *args, **kwargs):
+        course = await aget_published_course(kwargs['pk'])
+        if course is None:
+            raise Http404('Curso não encontrado.')
+
+        enrollment = self.enrollment
+        lessons = await aget_published_lessons(course.pk)
+        # Pode reconstruir o mapa de conclusão (escrita transacional)
+        completed_lessons = await sync_to_async(enrollment.get_completed_lesson_ids)(lessons)
+
+        context = {
+            'course': course,
+            'object': course,
+            'enrollment': enrollment,
+            'progress_width': f"{enrollment.progress}%",
+            'lessons': lessons,
+            'completed_lessons': completed_lessons,
+        }
+        context.update(lesson_navigation(lessons, completed_lessons, request.GET.get('lesson_id')))
+
+        if context['current_lesson']:
+            await LessonProgress.objects.aget_or_create(
+                enrollment=enrollment,
+                lesson=context['current_lesson']
+            )
+
+        return TemplateResponse(request, self.template_name, context)
+
+
+class AsyncLessonCompleteView(AsyncEnrollmentRequiredMixin, View):
+    """Conclusão de aula assíncrona (ver student_views.LessonCompleteView)."""
+    http_method_names = ['post']
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            lesson = await Lesson.objects.aget(pk=kwargs['lesson_id'], course_id=kwargs['course_id'])
+        except Lesson.DoesNotExist:
+            raise Http404('Aula não encontrada.')
+
+        # complete_lesson() usa transaction.atomic, que só existe na API síncrona
+        await sync_to_async(complete_lesson)(self.enrollment, lesson)
+
+        messages.success(request, 'Aula marcada como concluída!')
+
+        lessons = await aget_published_lessons(lesson.course_id)
+        return HttpResponseRedirect(
+            next_lesson_url(lesson.course_id, lessons, lesson, 'courses:student:async_course_learn')
+        )
@@ -0,0 +1,52 @@
+"""
+Representação compacta (um bit por aula) das aulas concluídas de uma matrícula.
+
+O bit `i` corresponde à i-ésima aula publicada do curso, na ordem do programa
+(`Lesson.order`). O mapa é apenas um cache do que está em LessonProgress: pode
+ser invalidado (gravado como NULL) a qualquer momento e reconstruído a partir
+dos registros.
+"""
+
+
+class CompletionBitmap:
+    """Conjunto de posições de aulas concluídas armazenado em um bytearray."""
+
+    __slots__ = ('_bits',)
+
+    def __init__(self, data=b''):
+        self._bits = bytearray(data or b'')
+
+    @classmethod
+    def from_positions(cls, positions):
+        bitmap = cls()
+        for position in positions:
+            bitmap.add(position)
+        return bitmap
+
+    def __contains__(self, position):
+        byte, bit = divmod(position, 8)
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << bit))
+
+    def __len__(self):
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+    def add(self, position):
+        byte, bit = divmod(position, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(b'\x00' * (byte + 1 - len(self._bits)))
+        self._bits[byte] |= 1 << bit
+
+    def positions(self, limit=None):
+        """Itera sobre as posições marcadas, opcionalmente limitadas ao tamanho do programa."""
+        for byte_index, byte in enumerate(self._bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                position = byte_index * 8 + bit
+                if limit is not None and position >= limit:
+                    return
+                if byte & (1 << bit):
+                    yield position
+
+    def to_bytes(self):
+        return bytes(self._bits)
@@ -0,0 +1,340 @@
+"""
+Caches do app courses.
+
+Dados de curso (o registro de Course e a lista ordenada de aulas publicadas)
+ficam sob chaves versionadas por curso: `courses:course:<id>:v<versão>:<nome>`.
+Os sinais de Course e Lesson (ver courses.signals) incrementam a versão após o
+commit, o que torna todas as chaves anteriores do curso inalcançáveis sem
+precisar apagá-las uma a uma; elas expiram por COURSE_CACHE_TIMEOUT.
+
+O conjunto de cursos em que um aluno está matriculado (matrículas ativas) é
+guardado de forma compacta (array de inteiros de 64 bits, ordenado) e invalidado
+pelos sinais de Enrollment ou explicitamente pelos serviços que escrevem em lote.
+
+O número de alunos matriculados em um curso fica em cache por poucos minutos,
+fora do versionamento, para que novas matrículas não invalidem os dados do curso.
+
+Os valores guardados no cache são sempre lidos do banco primário (ver
+core.routers.use_primary), mesmo nas views servidas por réplicas: um valor
+atrasado da réplica ficaria em cache até expirar.
+
+As páginas públicas em cache para visitantes anônimos (core.response_cache)
+usam as etiquetas CATALOG_CACHE_TAG e `course_page_tag(id)`, invalidadas por
+`purge_course_pages()` a partir dos sinais de Course e Lesson.
+
+Acertos e falhas são contados em memória, em cada processo, e somados aos
+contadores do cache compartilhado no máximo a cada COURSE_CACHE_STATS_FLUSH_INTERVAL
+segundos (ver `get_cache_stats()` e o comando cache_stats): um `incr` no cache
+por acesso custaria uma ida ao servidor de cache a cada consulta.
+
+As funções com prefixo `a` são as versões assíncronas usadas pelas views async
+(ver courses.async_views): mesmas chaves, com a API assíncrona do cache e do ORM.
+"""
+import threading
+import time
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.response_cache import purge_response_cache
+from core.routers import use_primary
+
+from .models import Course, Lesson, Enrollment
+
+ENROLLED_COURSES_KEY = 'courses:enrolled:{user_id}'
+ENROLLED_COURSES_TIMEOUT = 60 * 60 * 24
+
+COURSE_VERSION_KEY = 'courses:course:{course_id}:version'
+COURSE_DATA_KEY = 'courses:course:{course_id}:v{version}:{name}'
+
+ENROLLED_STUDENTS_KEY = 'courses:course:{course_id}:enrolled-students'
+ENROLLED_STUDENTS_TIMEOUT = 60 * 5
+
+# Etiquetas do cache de páginas públicas (catálogo e página de cada curso)
+CATALOG_CACHE_TAG = 'courses:catalog'
+COURSE_PAGE_TAG = 'courses:course:{course_id}'
+
+STATS_KEY = 'courses:cache-stats:{name}'
+STATS = ('hits', 'misses')
+
+
+# Contadores ainda não enviados ao cache compartilhado, deste processo
+_stats = Counter()
+_stats_lock = threading.Lock()
+_stats_flushed_at = time.monotonic()
+
+
+def _take_stats(force=False):
+    """Retira os contadores locais se o intervalo de envio passou (ou se `force`)."""
+    global _stats_flushed_at
+    with _stats_lock:
+        now = time.monotonic()
+        interval = getattr(settings, 'COURSE_CACHE_STATS_FLUSH_INTERVAL', 10)
+        if not _stats or (not force and now - _stats_flushed_at < interval):
+            return None
+        _stats_flushed_at = now
+        pending = dict(_stats)
+        _stats.clear()
+    return pending
+
+
+def _flush_stats(pending):
+    for name, delta in pending.items():
+        key = STATS_KEY.format(name=name)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, None):
+                cache.incr(key, delta)
+
+
+def _count(name):
+    """Conta um acerto ou falha; envia os contadores ao cache compartilhado periodicamente."""
+    with _stats_lock:
+        _stats[name] += 1
+    pending = _take_stats()
+    if pending:
+        _flush_stats(pending)
+
+
+def flush_cache_stats():
+    """Envia ao cache compartilhado os contadores acumulados neste processo."""
+    pending = _take_stats(force=True)
+    if pending:
+        _flush_stats(pending)
+
+
+def get_cache_stats():
+    """Retorna os contadores de acertos e falhas e a taxa de acerto."""
+    flush_cache_stats()
+    values = cache.get_many([STATS_KEY.format(name=name) for name in STATS])
+    hits, misses = (values.get(STATS_KEY.format(name=name), 0) for name in STATS)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+    cache.delete_many([STATS_KEY.format(name=name) for name in STATS])
+
+
+def _course_timeout():
+    return getattr(settings, 'COURSE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _initial_version():
+    # Versão inicial baseada no relógio: se a chave de versão for despejada do
+    # cache, a nova versão não coincide com a de dados antigos ainda armazenados
+    return int(time.time() * 1000)
+
+
+def get_course_version(course_id):
+    key = COURSE_VERSION_KEY.format(course_id=course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_course_version(course_id):
+    """Invalida todos os dados em cache do curso, passando para a próxima versão."""
+    key = COURSE_VERSION_KEY.format(course_id=course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def cached_for_course(course_id, name, producer):
+    """
+    Retorna o valor `name` do curso a partir do cache versionado, calculando-o
+    com `producer()` em caso de falha.
+    """
+    key = COURSE_DATA_KEY.format(course_id=course_id, version=get_course_version(course_id), name=name)
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    _count('misses')
+    with use_primary():
+        value = producer()
+    cache.set(key, value, _course_timeout())
+    return value
+
+
+def get_published_course(course_id):
+    """Retorna o curso publicado (com o professor) ou None se não existir/publicado."""
+    def producer():
+        course = Course.objects.select_related('professor').filter(
+            pk=course_id,
+            status=Course.Status.PUBLISHED
+        ).first()
+        # False representa "não encontrado" no cache (None significa falha)
+        return course or False
+
+    return cached_for_course(course_id, 'published', producer) or None
+
+
+def get_published_lessons(course_id):
+    """Retorna a lista das aulas publicadas do curso, em ordem."""
+    return cached_for_course(course_id, 'lessons', lambda: list(Lesson.objects.filter(
+        course_id=course_id,
+        status=Lesson.Status.PUBLISHED
+    ).order_by('order')))
+
+
+def get_enrolled_students_count(course_id):
+    """
+    Número de alunos matriculados no curso. Muda a cada matrícula, por isso não
+    usa a versão do curso: fica em cache por um período curto.
+    """
+    key = ENROLLED_STUDENTS_KEY.format(course_id=course_id)
+    count = cache.get(key)
+    if count is None:
+        _count('misses')
+        with use_primary():
+            count = Enrollment.objects.filter(course_id=course_id).count()
+        cache.set(key, count, ENROLLED_STUDENTS_TIMEOUT)
+    else:
+        _count('hits')
+    return count
+
+
+def course_page_tag(course_id):
+    return COURSE_PAGE_TAG.format(course_id=course_id)
+
+
+def purge_course_pages(course_id, catalog=False):
+    """Invalida a página pública do curso em cache e, se indicado, o catálogo."""
+    tags = [course_page_tag(course_id)]
+    if catalog:
+        tags.append(CATALOG_CACHE_TAG)
+    purge_response_cache(*tags)
+
+
+def _enrolled_key(user_id):
+    return ENROLLED_COURSES_KEY.format(user_id=user_id)
+
+
+def get_enrolled_course_ids(user):
+    """
+    Retorna o frozenset dos IDs de cursos com matrícula ativa do usuário.
+    Usuários anônimos recebem um conjunto vazio, sem acesso ao banco.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    key = _enrolled_key(user.pk)
+    packed = cache.get(key)
+    if packed is None:
+        _count('misses')
+        with use_primary():
+            course_ids = array('q', sorted(Enrollment.objects.filter(
+                student_id=user.pk,
+                status=Enrollment.Status.ACTIVE
+            ).values_list('course_id', flat=True)))
+        packed = course_ids.tobytes()
+        cache.set(key, packed, ENROLLED_COURSES_TIMEOUT)
+    else:
+        _count('hits')
+
+    course_ids = array('q')
+    course_ids.frombytes(packed)
+    return frozenset(course_ids)
+
+
+def invalidate_enrolled_course_ids(*user_ids):
+    """Descarta o conjunto em cache dos usuários informados."""
+    if user_ids:
+        cache.delete_many([_enrolled_key(user_id) for user_id in user_ids])
+
+
+async def _acount(name):
+    with _stats_lock:
+        _stats[name] += 1
+    pending = _take_stats()
+    for name, delta in (pending or {}).items():
+        key = STATS_KEY.format(name=name)
+        try:
+            await cache.aincr(key, delta)
+        except ValueError:
+            if not await cache.aadd(key, delta, None):
+                await cache.aincr(key, delta)
+
+
+async def aget_course_version(course_id):
+    key = COURSE_VERSION_KEY.format(course_id=course_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def acached_for_course(course_id, name, producer):
+    """Versão assíncrona de `cached_for_course()`; `producer` é uma corrotina."""
+    version = await aget_course_version(course_id)
+    key = COURSE_DATA_KEY.format(course_id=course_id, version=version, name=name)
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount('hits')
+        return value
+
+    await _acount('misses')
+    with use_primary():
+        value = await producer()
+    await cache.aset(key, value, _course_timeout())
+    return value
+
+
+async def aget_published_course(course_id):
+    async def producer():
+        course = await Course.objects.select_related('professor').filter(
+            pk=course_id,
+            status=Course.Status.PUBLISHED
+        ).afirst()
+        return course or False
+
+    return await acached_for_course(course_id, 'published', producer) or None
+
+
+async def aget_published_lessons(course_id):
+    async def producer():
+        return [lesson async for lesson in Lesson.objects.filter(
+            course_id=course_id,
+            status=Lesson.Status.PUBLISHED
+        ).order_by('order')]
+
+    return await acached_for_course(course_id, 'lessons', producer)
+
+
+async def aget_enrolled_course_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+
+    key = _enrolled_key(user.pk)
+    packed = await cache.aget(key)
+    if packed is None:
+        await _acount('misses')
+        with use_primary():
+            course_ids = array('q', sorted([course_id async for course_id in Enrollment.objects.filter(
+                student_id=user.pk,
+                status=Enrollment.Status.ACTIVE
+            ).values_list('course_id', flat=True)]))
+        packed = course_ids.tobytes()
+        await cache.aset(key, packed, ENROLLED_COURSES_TIMEOUT)
+    else:
+        await _acount('hits')
+
+    course_ids = array('q')
+    course_ids.frombytes(packed)
+    return frozenset(course_ids)
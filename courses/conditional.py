@@ -0,0 +1,54 @@
+"""
+Validadores do GET condicional (core.conditional) das páginas de cursos.
+
+Cada função executa uma única consulta de agregação e retorna uma tupla que
+muda sempre que a página correspondente muda: o maior `updated_at` do curso e
+das aulas, o número de aulas (exclusões não alteram o maior `updated_at`) e,
+nas páginas do aluno, o progresso da matrícula ativa.
+"""
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+
+from .cache import get_enrolled_course_ids, get_enrolled_students_count
+from .models import Course, Enrollment
+
+
+def catalog_validator(user):
+    """Validador do catálogo: cursos publicados e cursos em que o usuário está matriculado."""
+    state = Course.objects.filter(status=Course.Status.PUBLISHED).aggregate(
+        updated=Max('updated_at'),
+        courses=Count('pk'),
+        lessons=Sum('published_lessons_count'),
+    )
+    return (
+        state['updated'], state['courses'], state['lessons'],
+        tuple(sorted(get_enrolled_course_ids(user))),
+    )
+
+
+def course_validator(course_id, student=None, published_only=True):
+    """
+    Validador das páginas de um curso (e da matrícula ativa de `student`). Retorna
+    None se o curso não existir, deixando a view responder 404.
+    """
+    courses = Course.objects.filter(pk=course_id)
+    if published_only:
+        courses = courses.filter(status=Course.Status.PUBLISHED)
+    fields = ['updated_at', 'lessons_updated', 'lessons_count']
+
+    courses = courses.annotate(lessons_updated=Max('lessons__updated_at'), lessons_count=Count('lessons'))
+    if student is not None and student.is_authenticated:
+        enrollment = Enrollment.objects.filter(
+            course=OuterRef('pk'),
+            student_id=student.pk,
+            status=Enrollment.Status.ACTIVE
+        )
+        courses = courses.annotate(
+            enrollment_progress=Subquery(enrollment.values('progress')[:1]),
+            enrollment_completed=Subquery(enrollment.values('completed_lessons_count')[:1]),
+        )
+        fields += ['enrollment_progress', 'enrollment_completed']
+
+    state = courses.values_list(*fields).first()
+    if state is None:
+        return None
+    return (*state, get_enrolled_students_count(course_id) if published_only else None)
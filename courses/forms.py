@@ -1,8 +1,8 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Max
 
 from .models import Course, Lesson, Enrollment, LessonProgress
+from .ordering import next_order
 
 
 class CourseForm(forms.ModelForm):
@@ -57,10 +57,10 @@ class LessonForm(forms.ModelForm):
         if self.course and not instance.pk:  # Somente em criação, não em edição
             instance.course = self.course
             
-            # Se a ordem não foi especificada, define como a última aula + 1
-            if not instance.order and hasattr(self.course, 'lessons'):
-                last_order = self.course.lessons.aggregate(Max('order'))['order__max'] or 0
-                instance.order = last_order + 1
+            # Se a ordem não foi especificada, coloca a aula no fim, com espaço
+            # para reordenações (ver courses.ordering)
+            if not instance.order:
+                instance.order = next_order(self.course)
                 
         if commit:
             instance.save()
@@ -106,12 +106,13 @@ class CourseSearchForm(forms.Form):
         label=_('Ordenar por'),
         required=False,
         choices=[
+            ('relevance', _('Relevância')),
             ('title', _('Título (A-Z)')),
             ('-title', _('Título (Z-A)')),
             ('-created_at', _('Mais recentes')),
             ('price', _('Menor preço')),
             ('-price', _('Maior preço')),
         ],
-        initial='-created_at',
+        initial='relevance',
         widget=forms.Select(attrs={'class': 'form-select'})
     )
@@ -0,0 +1,290 @@
+"""
+Heartbeats do player: tempo assistido e último acesso por aula sem uma escrita
+no banco a cada batida.
+
+A view de heartbeat apenas acrescenta o evento (aluno, curso, aula, segundos,
+instante) a um buffer. Periodicamente os eventos são drenados, agregados por
+(aluno, aula) e aplicados aos registros de LessonProgress com um único
+bulk_update dentro de uma transação.
+
+Buffers (configuração HEARTBEAT_BUFFER):
+
+- 'local': fila em memória do processo, descarregada por uma thread do próprio
+  processo a cada HEARTBEAT_FLUSH_INTERVAL segundos (e ao encerrar);
+- 'cache': fila no cache compartilhado (chaves numeradas sequencialmente),
+  descarregada pelo comando `flush_heartbeats --interval N`. Deve haver um
+  único processo descarregando a fila.
+
+Quando o buffer está cheio (HEARTBEAT_BUFFER_MAX_EVENTS) o evento é descartado.
+Eventos recebidos, descartados e aplicados, o atraso da última descarga (idade
+do evento mais antigo) e os eventos pendentes ficam disponíveis em
+`get_heartbeat_metrics()`.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Enrollment, LessonProgress
+
+logger = logging.getLogger(__name__)
+
+METRIC_KEY = 'courses:heartbeats:{name}'
+COUNTERS = ('received', 'dropped', 'flushed_events', 'flushed_rows', 'flushes')
+QUEUE_HEAD_KEY = 'courses:heartbeats:queue:head'
+QUEUE_TAIL_KEY = 'courses:heartbeats:queue:tail'
+QUEUE_EVENT_KEY = 'courses:heartbeats:queue:{index}'
+QUEUE_GAP_KEY = 'courses:heartbeats:queue:gap'
+QUEUE_EVENT_TIMEOUT = 60 * 60 * 24
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _incr(name, delta=1):
+    key = METRIC_KEY.format(name=name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+class LocalHeartbeatBuffer:
+    """Fila limitada em memória, protegida por lock."""
+
+    def __init__(self, max_events):
+        self.max_events = max_events
+        self.events = deque()
+        self.lock = threading.Lock()
+
+    def append(self, event):
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                return False
+            self.events.append(event)
+            return True
+
+    def drain(self):
+        """Retorna (eventos, número de eventos perdidos)."""
+        with self.lock:
+            events, self.events = list(self.events), deque()
+        return events, 0
+
+    def pending(self):
+        return len(self.events)
+
+
+class CacheHeartbeatBuffer:
+    """
+    Fila no cache compartilhado: cada evento recebe um número sequencial
+    (incr em `head`) e a descarga lê de `tail` até `head`.
+
+    Entre o incr e a gravação do evento, o número já aparece em `head` sem que
+    a chave exista. A descarga para na primeira chave ausente e a espera por
+    até HEARTBEAT_QUEUE_GRACE segundos; os eventos seguintes ficam no cache
+    para a próxima descarga. Somente chaves ausentes por mais tempo (despejadas
+    pelo cache ou nunca gravadas) são contadas como perdidas.
+    """
+
+    def __init__(self, max_events):
+        self.max_events = max_events
+
+    def _position(self, key):
+        return cache.get(key) or 0
+
+    def append(self, event):
+        if self.pending() >= self.max_events:
+            return False
+        cache.add(QUEUE_HEAD_KEY, 0, None)
+        index = cache.incr(QUEUE_HEAD_KEY)
+        cache.set(QUEUE_EVENT_KEY.format(index=index), event, QUEUE_EVENT_TIMEOUT)
+        return True
+
+    def drain(self):
+        tail = self._position(QUEUE_TAIL_KEY)
+        head = self._position(QUEUE_HEAD_KEY)
+        keys = {index: QUEUE_EVENT_KEY.format(index=index) for index in range(tail + 1, head + 1)}
+        if not keys:
+            return [], 0
+
+        values = cache.get_many(list(keys.values()))
+        # (número, instante em que foi vista ausente pela primeira vez)
+        gap = cache.get(QUEUE_GAP_KEY)
+        grace = _setting('HEARTBEAT_QUEUE_GRACE', 5)
+        now = time.time()
+        end, lost = head, 0
+        for index, key in keys.items():
+            if key in values:
+                continue
+            since = gap[1] if gap and gap[0] == index else now
+            if now - since < grace:
+                # Provavelmente ainda sendo gravada: a descarga para aqui
+                end = index - 1
+                cache.set(QUEUE_GAP_KEY, (index, since), None)
+                break
+            lost += 1
+        else:
+            cache.delete(QUEUE_GAP_KEY)
+
+        drained = [key for index, key in keys.items() if index <= end]
+        cache.delete_many(drained)
+        cache.set(QUEUE_TAIL_KEY, end, None)
+        return [values[key] for key in drained if key in values], lost
+
+    def pending(self):
+        return max(0, self._position(QUEUE_HEAD_KEY) - self._position(QUEUE_TAIL_KEY))
+
+
+BUFFERS = {
+    'local': LocalHeartbeatBuffer,
+    'cache': CacheHeartbeatBuffer,
+}
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flusher_pid = None
+
+
+def get_heartbeat_buffer():
+    """Retorna o buffer (único por processo) configurado em HEARTBEAT_BUFFER."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer_class = BUFFERS[_setting('HEARTBEAT_BUFFER', 'local')]
+                _buffer = buffer_class(_setting('HEARTBEAT_BUFFER_MAX_EVENTS', 10000))
+    return _buffer
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush_heartbeats()
+        except Exception:
+            logger.exception('Falha ao descarregar os heartbeats')
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    """Inicia a thread de descarga do buffer local (uma por processo, inclusive após fork)."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _buffer_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        interval = _setting('HEARTBEAT_FLUSH_INTERVAL', 10)
+        threading.Thread(target=_flush_loop, args=(interval,), name='heartbeat-flusher', daemon=True).start()
+        atexit.register(flush_heartbeats)
+
+
+def record_heartbeat(student_id, course_id, lesson_id, seconds):
+    """
+    Acrescenta um heartbeat ao buffer, limitando os segundos a
+    HEARTBEAT_MAX_SECONDS. Retorna False se o evento foi descartado.
+    """
+    seconds = max(0, min(int(seconds), _setting('HEARTBEAT_MAX_SECONDS', 60)))
+    buffer = get_heartbeat_buffer()
+    accepted = buffer.append((student_id, course_id, lesson_id, seconds, time.time()))
+    _incr('received' if accepted else 'dropped')
+    if isinstance(buffer, LocalHeartbeatBuffer):
+        _ensure_flusher()
+    return accepted
+
+
+def flush_heartbeats():
+    """
+    Drena o buffer, agrega os eventos por (aluno, aula) e aplica o tempo
+    assistido e o último acesso em uma transação. Retorna o número de
+    registros de progresso atualizados ou criados.
+    """
+    events, lost = get_heartbeat_buffer().drain()
+    if lost:
+        _incr('dropped', lost)
+    if not events:
+        return 0
+
+    # (aluno, aula) -> [curso, segundos, último instante]
+    totals = {}
+    for student_id, course_id, lesson_id, seconds, timestamp in events:
+        total = totals.setdefault((student_id, lesson_id), [course_id, 0, timestamp])
+        total[1] += seconds
+        total[2] = max(total[2], timestamp)
+    oldest = min(event[4] for event in events)
+
+    def as_datetime(timestamp):
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+    with transaction.atomic():
+        progresses = LessonProgress.objects.select_for_update(of=('self',)).filter(
+            enrollment__student_id__in={student_id for student_id, lesson_id in totals},
+            lesson_id__in={lesson_id for student_id, lesson_id in totals},
+            enrollment__status=Enrollment.Status.ACTIVE
+        ).annotate(student_id=F('enrollment__student_id')).only(
+            'pk', 'lesson_id', 'enrollment_id', 'watched_seconds', 'last_accessed_at'
+        )
+
+        updated = []
+        for progress in progresses:
+            total = totals.pop((progress.student_id, progress.lesson_id), None)
+            if total is None:
+                continue
+            progress.watched_seconds += total[1]
+            progress.last_accessed_at = max(progress.last_accessed_at, as_datetime(total[2]))
+            updated.append(progress)
+        LessonProgress.objects.bulk_update(updated, ['watched_seconds', 'last_accessed_at'], batch_size=500)
+
+        # Aulas sem registro de progresso (por exemplo, publicadas após a matrícula)
+        created = []
+        if totals:
+            enrollments = dict(
+                ((student_id, course_id), pk)
+                for pk, student_id, course_id in Enrollment.objects.filter(
+                    student_id__in={student_id for student_id, lesson_id in totals},
+                    course_id__in={total[0] for total in totals.values()},
+                    status=Enrollment.Status.ACTIVE
+                ).values_list('pk', 'student_id', 'course_id')
+            )
+            for (student_id, lesson_id), (course_id, seconds, timestamp) in totals.items():
+                enrollment_id = enrollments.get((student_id, course_id))
+                if enrollment_id:
+                    created.append(LessonProgress(
+                        enrollment_id=enrollment_id,
+                        lesson_id=lesson_id,
+                        watched_seconds=seconds
+                    ))
+            LessonProgress.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+
+    rows = len(updated) + len(created)
+    _incr('flushes')
+    _incr('flushed_events', len(events))
+    _incr('flushed_rows', rows)
+    cache.set_many({
+        METRIC_KEY.format(name='last_flush_at'): time.time(),
+        METRIC_KEY.format(name='last_flush_lag'): round(time.time() - oldest, 3),
+    }, None)
+    return rows
+
+
+def get_heartbeat_metrics():
+    """Contadores, atraso da última descarga (segundos) e eventos pendentes."""
+    names = (*COUNTERS, 'last_flush_at', 'last_flush_lag')
+    values = cache.get_many([METRIC_KEY.format(name=name) for name in names])
+    metrics = {name: values.get(METRIC_KEY.format(name=name), 0) for name in COUNTERS}
+    metrics['last_flush_at'] = values.get(METRIC_KEY.format(name='last_flush_at'))
+    metrics['last_flush_lag'] = values.get(METRIC_KEY.format(name='last_flush_lag'))
+    metrics['pending'] = get_heartbeat_buffer().pending()
+    return metrics
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Lesson
+from courses.video import resolve_youtube_id
+
+
+class Command(BaseCommand):
+    help = 'Preenche o ID do YouTube das aulas existentes a partir da URL do vídeo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Número de aulas processadas por lote (padrão: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Lesson.objects.filter(youtube_id='').exclude(video_url='').only('pk', 'video_url')
+
+        scanned = updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            resolved = []
+            for lesson in batch:
+                youtube_id = resolve_youtube_id(lesson.video_url)
+                if youtube_id:
+                    lesson.youtube_id = youtube_id
+                    resolved.append(lesson)
+
+            if resolved:
+                with transaction.atomic():
+                    Lesson.objects.bulk_update(resolved, ['youtube_id'])
+                updated += len(resolved)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} de {scanned} aula(s) com vídeo tiveram o ID do YouTube preenchido.'
+        ))
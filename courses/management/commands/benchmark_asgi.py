@@ -0,0 +1,158 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from courses.models import Course, Enrollment
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de requisições concorrentes das views do aluno síncronas (WSGI) '
+        'e assíncronas (ASGI), com os middlewares de produção (DEBUG=False, STATIC_SERVE). '
+        'Usa os dados existentes: execute seed_load_data antes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requisições por nível de concorrência (padrão: 200)')
+        parser.add_argument('--concurrency', default='1,10,50',
+                            help='Níveis de concorrência, separados por vírgula (padrão: 1,10,50)')
+
+    def handle(self, *args, **options):
+        enrollment = Enrollment.objects.filter(
+            status=Enrollment.Status.ACTIVE,
+            course__status=Course.Status.PUBLISHED
+        ).select_related('student').order_by('pk').first()
+        if enrollment is None:
+            raise CommandError('Nenhuma matrícula ativa encontrada. Execute seed_load_data antes.')
+
+        paths = {
+            'wsgi': [
+                reverse('courses:student:course_list'),
+                reverse('courses:student:course_learn', kwargs={'pk': enrollment.course_id}),
+            ],
+            'asgi': [
+                reverse('courses:student:async_course_list'),
+                reverse('courses:student:async_course_learn', kwargs={'pk': enrollment.course_id}),
+            ],
+        }
+
+        with ExitStack() as stack:
+            stack.enter_context(self.production_settings(stack))
+            self.check_middleware()
+            for concurrency in [int(level) for level in options['concurrency'].split(',') if level.strip()]:
+                total = options['requests']
+                wsgi = self.run_wsgi(enrollment.student, paths['wsgi'], total, concurrency)
+                asgi = self.run_asgi(enrollment.student, paths['asgi'], total, concurrency)
+                self.stdout.write(self.style.MIGRATE_HEADING(f'Concorrência {concurrency}:'))
+                for name, (elapsed, timings) in (('WSGI (síncrona)', wsgi), ('ASGI (assíncrona)', asgi)):
+                    self.stdout.write(
+                        f'  {name:<18} {len(timings) / elapsed:>8.1f} req/s  '
+                        f'mediana {statistics.median(timings):>7.1f} ms  p95 {percentile(timings, 0.95):>7.1f} ms'
+                    )
+
+    def production_settings(self, stack):
+        """
+        Configuração de produção: sem DEBUG nem instrumentação de SQL e com o
+        StaticFilesMiddleware ativo (em um STATIC_ROOT vazio, se ainda não houver
+        collectstatic).
+        """
+        static_root = settings.STATIC_ROOT
+        if not static_root or not os.path.isdir(static_root):
+            static_root = stack.enter_context(tempfile.TemporaryDirectory())
+        return override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            DEBUG=False,
+            SQL_INSTRUMENTATION=False,
+            STATIC_SERVE=True,
+            STATIC_ROOT=static_root,
+        )
+
+    def check_middleware(self):
+        """Avisa sobre middlewares somente síncronos, que anulam o ganho do ASGI."""
+        sync_only = [
+            path for path in settings.MIDDLEWARE
+            if not getattr(import_string(path), 'async_capable', False)
+        ]
+        if sync_only:
+            self.stdout.write(self.style.WARNING(
+                f'Middlewares somente síncronos (adaptados com sync_to_async): {", ".join(sync_only)}'
+            ))
+
+    def run_wsgi(self, user, paths, total, concurrency):
+        """Cada thread simula um worker síncrono com seu próprio cliente."""
+        timings = []
+        lock = threading.Lock()
+
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            local = []
+            try:
+                for index in range(count):
+                    started = time.perf_counter()
+                    client.get(paths[index % len(paths)])
+                    local.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                timings.extend(local)
+
+        threads = [
+            threading.Thread(target=worker, args=(self.share(total, concurrency, index),))
+            for index in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, timings
+
+    def run_asgi(self, user, paths, total, concurrency):
+        """Corrotinas concorrentes no mesmo loop de eventos, pelo handler ASGI."""
+        clients = []
+        for index in range(concurrency):
+            client = AsyncClient()
+            client.force_login(user)
+            clients.append(client)
+
+        async def worker(client, count):
+            local = []
+            for index in range(count):
+                started = time.perf_counter()
+                await client.get(paths[index % len(paths)])
+                local.append((time.perf_counter() - started) * 1000)
+            return local
+
+        async def main():
+            results = await asyncio.gather(*(
+                worker(client, self.share(total, concurrency, index))
+                for index, client in enumerate(clients)
+            ))
+            return [timing for local in results for timing in local]
+
+        started = time.perf_counter()
+        timings = asyncio.run(main())
+        return time.perf_counter() - started, timings
+
+    @staticmethod
+    def share(total, concurrency, index):
+        """Divide `total` requisições entre os workers."""
+        return total // concurrency + (1 if index < total % concurrency else 0)
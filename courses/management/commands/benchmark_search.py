@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Course
+from courses.search import IcontainsSearchBackend, get_search_backend
+
+WORDS = [
+    'introdução', 'música', 'violão', 'harmonia', 'percussão', 'teoria', 'prática',
+    'canção', 'improvisação', 'ritmo', 'técnica', 'composição', 'produção', 'áudio',
+    'gravação', 'mixagem', 'piano', 'guitarra', 'baixo', 'bateria', 'canto', 'coral',
+    'jazz', 'samba', 'choro', 'forró', 'bossa', 'nova', 'avançado', 'iniciante',
+]
+
+QUERIES = ['introducao', 'música', 'violão avançado', 'samba', 'harmonia jazz', 'produção áudio']
+
+
+class Rollback(Exception):
+    """Desfaz o catálogo sintético ao final do benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Compara a busca indexada do catálogo com a busca por icontains em um catálogo sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=20000, help='Cursos sintéticos (padrão: 20000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Execuções por termo (padrão: 20)')
+        parser.add_argument('--seed', type=int, default=55, help='Semente do gerador aleatório')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed_catalog(options['courses'], random.Random(options['seed']))
+                for backend in (IcontainsSearchBackend(), get_search_backend()):
+                    self.run(backend, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed_catalog(self, total, rng):
+        User = get_user_model()
+        professor = User.objects.create_user(
+            email='benchmark-search@example.com',
+            user_type=User.Types.PROFESSOR
+        )
+
+        def text(size):
+            return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+        Course.objects.bulk_create([
+            Course(
+                professor=professor,
+                title=text(4).capitalize(),
+                slug=f'benchmark-search-{index}',
+                short_description=text(10),
+                description=text(60),
+                status=Course.Status.PUBLISHED,
+            )
+            for index in range(total)
+        ], batch_size=1000)
+        get_search_backend().rebuild()
+        self.stdout.write(f'Catálogo sintético: {total} cursos')
+
+    def run(self, backend, repeat):
+        base = Course.objects.filter(status=Course.Status.PUBLISHED).select_related('professor')
+
+        timings = []
+        for query in QUERIES:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                queryset = backend.search(base, query)
+                if not queryset.query.order_by:
+                    queryset = queryset.order_by('-created_at')
+                queryset.count()
+                list(queryset[:12])
+                timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f'{backend.__class__.__name__}: média {statistics.mean(timings):.1f} ms, '
+            f'mediana {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms'
+        ))
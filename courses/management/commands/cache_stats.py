@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from courses.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Exibe os acertos, as falhas e a taxa de acerto do cache de cursos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Zera os contadores depois de exibi-los',
+        )
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+        self.stdout.write(f"Acertos: {stats['hits']}")
+        self.stdout.write(f"Falhas: {stats['misses']}")
+        self.stdout.write(self.style.SUCCESS(f"Taxa de acerto: {stats['hit_ratio']:.1%}"))
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write('Contadores zerados.')
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.seeding import LoadDataSpec, seed_load_data
+from courses.query_plans import HOT_QUERIES, explain_hot_queries, hot_query_sample, prepare_planner
+
+
+class Rollback(Exception):
+    """Desfaz o conjunto de dados sintético ao final da verificação."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um conjunto de dados sintético, obtém o plano de execução das consultas quentes '
+        'e falha se alguma delas fizer varredura completa de tabela'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Fator de escala do conjunto de dados sintético (padrão: 1)')
+        parser.add_argument('--query', action='append', choices=sorted(HOT_QUERIES),
+                            help='Verifica apenas a consulta informada (pode ser repetido)')
+        parser.add_argument('--allow-scan', action='append', default=[],
+                            help='Tabela em que a varredura completa é aceita (pode ser repetido)')
+        parser.add_argument('--show-plans', action='store_true',
+                            help='Exibe o plano completo de cada consulta')
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                seed_load_data(LoadDataSpec().scaled(options['scale']))
+                prepare_planner()
+                sample = hot_query_sample()
+
+                for name, (plan, scans) in explain_hot_queries(sample, options['query']).items():
+                    scans = [table for table in scans if table not in options['allow_scan']]
+                    if scans:
+                        failures.append(name)
+                        self.stdout.write(self.style.ERROR(
+                            f"{name}: varredura completa em {', '.join(scans)}"
+                        ))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+                    if options['show_plans'] or scans:
+                        self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'{len(failures)} consulta(s) com varredura completa de tabela.')
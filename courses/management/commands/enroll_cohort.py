@@ -0,0 +1,69 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+from courses.services import enroll_cohort
+
+
+def read_emails(path):
+    """
+    Lê os emails da turma de um arquivo CSV (coluna `email`) ou JSONL
+    (objetos com a chave `email`), linha a linha, sem carregar o arquivo inteiro.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if Path(path).suffix.lower() in ('.jsonl', '.ndjson'):
+            for line_number, line in enumerate(handle, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)['email']
+                except (ValueError, KeyError, TypeError):
+                    raise CommandError(f'Linha {line_number} inválida no arquivo JSONL: {line[:80]}')
+        else:
+            reader = csv.DictReader(handle)
+            if 'email' not in (reader.fieldnames or []):
+                raise CommandError('O arquivo CSV deve possuir uma coluna "email".')
+            for row in reader:
+                yield row['email'] or ''
+
+
+class Command(BaseCommand):
+    help = 'Matricula uma turma de alunos (arquivo CSV ou JSONL) em um curso'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', help='ID ou slug do curso')
+        parser.add_argument('path', help='Arquivo .csv (coluna "email") ou .jsonl ({"email": ...})')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Número de alunos matriculados por transação (padrão: 500)',
+        )
+
+    def handle(self, *args, **options):
+        course_ref = options['course']
+        lookup = {'pk': course_ref} if course_ref.isdigit() else {'slug': course_ref}
+        try:
+            course = Course.objects.get(**lookup)
+        except Course.DoesNotExist:
+            raise CommandError(f'Curso não encontrado: {course_ref}')
+
+        if not Path(options['path']).exists():
+            raise CommandError(f'Arquivo não encontrado: {options["path"]}')
+
+        result = enroll_cohort(course, read_emails(options['path']), chunk_size=options['chunk_size'])
+
+        for email in result.not_found:
+            self.stdout.write(self.style.WARNING(f'Usuário não encontrado: {email}'))
+        for email in result.not_students:
+            self.stdout.write(self.style.WARNING(f'Usuário não é aluno: {email}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Curso "{course.title}": {result.created} matrícula(s) criada(s), '
+            f'{result.reactivated} reativada(s), {result.existing} já existente(s) '
+            f'em {result.elapsed:.2f}s ({result.throughput:.0f} alunos/s)'
+        ))
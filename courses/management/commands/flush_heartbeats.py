@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from courses.heartbeats import flush_heartbeats, get_heartbeat_metrics
+
+
+class Command(BaseCommand):
+    help = 'Aplica os heartbeats do player acumulados no buffer e exibe as métricas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Repete a descarga a cada N segundos (padrão: executa uma vez)',
+        )
+        parser.add_argument(
+            '--metrics',
+            action='store_true',
+            help='Apenas exibe as métricas, sem descarregar o buffer',
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            self.write_metrics()
+            return
+
+        while True:
+            rows = flush_heartbeats()
+            self.stdout.write(f'{rows} registro(s) de progresso atualizados.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+        self.write_metrics()
+
+    def write_metrics(self):
+        metrics = get_heartbeat_metrics()
+        last_flush_at = metrics['last_flush_at']
+        self.stdout.write(
+            f"Recebidos: {metrics['received']}  Descartados: {metrics['dropped']}  "
+            f"Pendentes: {metrics['pending']}"
+        )
+        self.stdout.write(
+            f"Descargas: {metrics['flushes']}  Eventos aplicados: {metrics['flushed_events']}  "
+            f"Registros atualizados: {metrics['flushed_rows']}"
+        )
+        if last_flush_at:
+            self.stdout.write(
+                f"Última descarga: {datetime.fromtimestamp(last_flush_at):%d/%m/%Y %H:%M:%S} "
+                f"(atraso de {metrics['last_flush_lag']}s)"
+            )
@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from courses.cache import invalidate_enrolled_course_ids
+from courses.models import Course, Lesson, Enrollment
+
+
+class Command(BaseCommand):
+    help = 'Detecta e corrige divergências nos contadores de aulas publicadas e de progresso das matrículas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Número de registros processados por lote (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas relata as divergências, sem gravar correções',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        courses_fixed = self.reconcile_courses(batch_size, dry_run)
+        enrollments_fixed = self.reconcile_enrollments(batch_size, dry_run)
+
+        verb = 'encontradas' if dry_run else 'corrigidas'
+        self.stdout.write(self.style.SUCCESS(
+            f'Divergências {verb}: {courses_fixed} curso(s), {enrollments_fixed} matrícula(s)'
+        ))
+
+    def _batches(self, queryset, batch_size):
+        """Percorre o queryset em lotes ordenados por chave primária (keyset)."""
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1].pk
+
+    def reconcile_courses(self, batch_size, dry_run):
+        queryset = Course.objects.only('pk', 'published_lessons_count').annotate(
+            actual_published=Count('lessons', filter=Q(lessons__status=Lesson.Status.PUBLISHED))
+        )
+
+        fixed = 0
+        for batch in self._batches(queryset, batch_size):
+            drifted = []
+            for course in batch:
+                if course.published_lessons_count != course.actual_published:
+                    course.published_lessons_count = course.actual_published
+                    drifted.append(course)
+
+            fixed += len(drifted)
+            if drifted and not dry_run:
+                Course.objects.bulk_update(drifted, ['published_lessons_count'])
+
+        return fixed
+
+    def reconcile_enrollments(self, batch_size, dry_run):
+        queryset = Enrollment.objects.only(
+            'pk', 'student_id', 'status', 'progress', 'completed_lessons_count', 'completed_at',
+            'course__published_lessons_count'
+        ).select_related('course').annotate(
+            actual_completed=Count(
+                'lesson_progresses',
+                filter=Q(
+                    lesson_progresses__is_completed=True,
+                    lesson_progresses__lesson__status=Lesson.Status.PUBLISHED,
+                )
+            )
+        )
+
+        fixed = 0
+        for batch in self._batches(queryset, batch_size):
+            drifted = []
+            completed = []
+            for enrollment in batch:
+                total = enrollment.course.published_lessons_count
+                progress = Enrollment.calculate_progress(enrollment.actual_completed, total)
+                # Matrículas concluídas mantêm 100% mesmo se o curso ganhar aulas novas
+                if enrollment.is_completed:
+                    progress = 100
+
+                # Matrículas ativas que chegam a 100% são concluídas, como em update_progress()
+                completes = progress == 100 and enrollment.is_active
+                if (enrollment.completed_lessons_count != enrollment.actual_completed
+                        or enrollment.progress != progress or completes):
+                    enrollment.completed_lessons_count = enrollment.actual_completed
+                    enrollment.progress = progress
+                    if completes:
+                        enrollment._mark_completed()
+                        completed.append(enrollment.student_id)
+                    # O mapa de conclusão é reconstruído sob demanda a partir dos registros
+                    enrollment.completion_bitmap = None
+                    drifted.append(enrollment)
+
+            fixed += len(drifted)
+            if drifted and not dry_run:
+                with transaction.atomic():
+                    Enrollment.objects.bulk_update(
+                        drifted,
+                        ['completed_lessons_count', 'progress', 'status', 'completed_at', 'completion_bitmap']
+                    )
+                # bulk_update não dispara sinais: invalida o cache explicitamente
+                invalidate_enrolled_course_ids(*completed)
+
+        return fixed
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+
+    published = Lesson.objects.filter(
+        course=OuterRef('pk'), status='PUBLISHED'
+    ).order_by().values('course').annotate(c=Count('pk')).values('c')
+    Course.objects.update(published_lessons_count=Coalesce(Subquery(published), 0))
+
+    completed = LessonProgress.objects.filter(
+        enrollment=OuterRef('pk'), is_completed=True, lesson__status='PUBLISHED'
+    ).order_by().values('enrollment').annotate(c=Count('pk')).values('c')
+    Enrollment.objects.update(completed_lessons_count=Coalesce(Subquery(completed), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_enrollment_lessonprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='published_lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='aulas publicadas'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='aulas concluídas'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_progress_counters'),
+    ]
+
+    # Matrículas existentes ficam com NULL e têm o mapa reconstruído sob demanda;
+    # somente as novas matrículas começam com o mapa vazio (default=bytes).
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completion_bitmap',
+            field=models.BinaryField(blank=True, null=True, verbose_name='mapa de aulas concluídas'),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='completion_bitmap',
+            field=models.BinaryField(blank=True, default=bytes, null=True, verbose_name='mapa de aulas concluídas'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:52
+
+import unicodedata
+
+from django.db import migrations
+
+# Cópia congelada do que courses.search fazia quando esta migração foi criada:
+# a migração não depende do módulo atual, que pode mudar
+FIELDS = ('title', 'short_description', 'description')
+
+
+def fold_accents(text):
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS courses_course_fts USING fts5("
+            "title, short_description, description, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS courses_course_search ('
+            'course_id bigint PRIMARY KEY REFERENCES courses_course (id) ON DELETE CASCADE '
+            'DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS courses_course_search_document_gin '
+            'ON courses_course_search USING GIN (document)'
+        )
+    else:
+        return
+
+    # Popula o índice com os cursos existentes
+    if vendor == 'sqlite':
+        insert = (
+            'INSERT INTO courses_course_fts (rowid, title, short_description, description) '
+            'VALUES (%s, %s, %s, %s)'
+        )
+    else:
+        insert = (
+            'INSERT INTO courses_course_search (course_id, document) VALUES (%s, '
+            "setweight(to_tsvector('portuguese', %s), 'A') || "
+            "setweight(to_tsvector('portuguese', %s), 'B') || "
+            "setweight(to_tsvector('portuguese', %s), 'C'))"
+        )
+    Course = apps.get_model('courses', 'Course')
+    courses = Course._default_manager.using(schema_editor.connection.alias).only('pk', *FIELDS).order_by('pk')
+    with schema_editor.connection.cursor() as cursor:
+        rows = []
+        for course in courses.iterator(chunk_size=500):
+            rows.append([course.pk, *(fold_accents(getattr(course, field)) for field in FIELDS)])
+            if len(rows) == 500:
+                cursor.executemany(insert, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS courses_course_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS courses_course_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_enrollment_completion_bitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_course_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='watched_seconds',
+            field=models.PositiveIntegerField(default=0, verbose_name='segundos assistidos'),
+        ),
+    ]
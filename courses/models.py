@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.utils.text import slugify
 
+from core.slugs import save_with_unique_value
+from core.taskqueue import enqueue
+
+from .bitmaps import CompletionBitmap
+from .video import resolve_youtube_id
+
 class Course(models.Model):
     """
     Modelo para representar um curso oferecido por um professor.
@@ -37,6 +44,12 @@ class Course(models.Model):
         default=Status.DRAFT
     )
     image = models.ImageField(_('imagem'), upload_to='course_images/', blank=True, null=True)
+    # Versões redimensionadas da imagem, geradas fora da requisição (core.images)
+    image_derivatives = models.JSONField(_('derivadas da imagem'), default=dict, blank=True, editable=False)
+    
+    # Contadores desnormalizados (mantidos por Lesson.save/delete; ver reconcile_progress)
+    published_lessons_count = models.PositiveIntegerField(_('aulas publicadas'), default=0, editable=False)
+    
     created_at = models.DateTimeField(_('data de criação'), auto_now_add=True)
     updated_at = models.DateTimeField(_('última atualização'), auto_now=True)
     
@@ -44,22 +57,36 @@ class Course(models.Model):
         verbose_name = _('curso')
         verbose_name_plural = _('cursos')
         ordering = ['-created_at']
+        indexes = [
+            # Catálogo: somente cursos publicados, dos mais recentes para os mais antigos
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='PUBLISHED'),
+                name='course_published_recent_idx',
+            ),
+            # Listagem e dashboard do professor
+            models.Index(fields=['professor', '-created_at'], name='course_professor_recent_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status lido do banco: ao salvar, indica se o curso saiu do catálogo público
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
-        # Gerar slug automaticamente se não existir
+        # Gerar slug automaticamente se não existir, com o primeiro sufixo livre
+        # (uma consulta, nova tentativa se outro curso ocupar o slug antes)
         if not self.slug:
-            self.slug = slugify(self.title)
+            return save_with_unique_value(
+                self, 'slug', slugify(self.title) or 'curso',
+                lambda: super(Course, self).save(*args, **kwargs)
+            )
             
-            # Garantir que o slug seja único
-            original_slug = self.slug
-            count = 1
-            while Course.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{count}"
-                count += 1
-                
         super().save(*args, **kwargs)
     
     @property
@@ -81,6 +108,10 @@ class Course(models.Model):
         """Retorna o número total de aulas do curso."""
         return self.lessons.count()
     
+    def get_published_lessons_count(self):
+        """Retorna o número de aulas publicadas a partir do contador desnormalizado."""
+        return self.published_lessons_count
+    
     def publish(self):
         """Publica o curso."""
         self.status = self.Status.PUBLISHED
@@ -134,10 +165,21 @@ class Lesson(models.Model):
         verbose_name_plural = _('aulas')
         ordering = ['order', 'created_at']
         unique_together = [['course', 'order']]
+        indexes = [
+            # Programa publicado do curso, em ordem
+            models.Index(fields=['course', 'status', 'order'], name='lesson_course_status_order_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status lido do banco: ao salvar, indica se o número de aulas publicadas mudou
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     @property
     def is_published(self):
         """Verifica se a aula está publicada."""
@@ -154,19 +196,90 @@ class Lesson(models.Model):
         self.save()
     
     def save(self, *args, **kwargs):
-        # Se o campo youtube_id estiver vazio, mas o video_url for do youtube,
-        # tenta extrair o ID do YouTube da URL
-        if not self.youtube_id and 'youtube.com' in self.video_url:
-            try:
-                from urllib.parse import urlparse, parse_qs
-                parsed_url = urlparse(self.video_url)
-                if parsed_url.hostname in ('www.youtube.com', 'youtube.com'):
-                    if 'v' in parse_qs(parsed_url.query):
-                        self.youtube_id = parse_qs(parsed_url.query)['v'][0]
-            except:
-                pass
-                
-        super().save(*args, **kwargs)
+        # Estado anterior (curso, status, ordem, vídeo) para ajustar o contador de
+        # aulas publicadas e invalidar os mapas de conclusão quando o programa muda
+        previous = None
+        if self.pk:
+            previous = Lesson.objects.filter(pk=self.pk).values_list(
+                'course_id', 'status', 'order', 'video_url'
+            ).first()
+        
+        # Resolve o ID do vídeo uma única vez, na escrita: quando o campo está vazio
+        # ou quando a URL do vídeo foi alterada
+        if not self.youtube_id or (previous is not None and previous[3] != self.video_url):
+            self.youtube_id = resolve_youtube_id(self.video_url) or ''
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            if previous is None:
+                if self.is_published:
+                    self._outline_changed(self.course_id, delta=1)
+                return
+            
+            previous_course_id, previous_status, previous_order, _ = previous
+            was_published = previous_status == self.Status.PUBLISHED
+            moved = previous_course_id != self.course_id
+            
+            if was_published and (not self.is_published or moved):
+                self._outline_changed(previous_course_id, delta=-1, lesson_id=self.pk)
+            if self.is_published and (not was_published or moved):
+                self._outline_changed(self.course_id, delta=1, lesson_id=self.pk)
+            elif self.is_published and previous_order != self.order:
+                self._outline_changed(self.course_id)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # Antes da exclusão, que remove em cascata os registros de progresso
+            if self.is_published:
+                self._outline_changed(self.course_id, delta=-1, lesson_id=self.pk)
+            return super().delete(*args, **kwargs)
+    
+    @staticmethod
+    def _outline_changed(course_id, delta=0, lesson_id=None):
+        """
+        Ajusta o contador de aulas publicadas do curso e invalida os mapas de
+        conclusão das matrículas, cujas posições dependem do programa publicado.
+        
+        Se `lesson_id` for informado (aula publicada ou despublicada), o contador
+        de aulas concluídas das matrículas que já concluíram a aula é ajustado no
+        mesmo UPDATE. O percentual de progresso é recalculado em segundo plano.
+        """
+        changes = {'completion_bitmap': None}
+        if delta and lesson_id is not None:
+            completed = LessonProgress.objects.filter(
+                enrollment=OuterRef('pk'),
+                lesson_id=lesson_id,
+                is_completed=True
+            )
+            condition = Q(Exists(completed))
+            if delta < 0:
+                condition &= Q(completed_lessons_count__gte=-delta)
+            changes['completed_lessons_count'] = Case(
+                When(condition, then=F('completed_lessons_count') + delta),
+                default=F('completed_lessons_count'),
+                output_field=models.PositiveIntegerField()
+            )
+        
+        if delta:
+            Course.objects.filter(pk=course_id).update(
+                published_lessons_count=F('published_lessons_count') + delta
+            )
+            # Uma única tarefa pendente por curso, mesmo com várias aulas alteradas
+            enqueue(
+                'courses.tasks.recompute_course_progress',
+                args=[course_id],
+                dedup_key=f'courses:progress:{course_id}'
+            )
+        Enrollment.objects.filter(course_id=course_id).update(**changes)
+    
+    def get_outline_position(self):
+        """Retorna a posição (base 0) da aula no programa publicado do curso."""
+        return Lesson.objects.filter(
+            course_id=self.course_id,
+            status=self.Status.PUBLISHED,
+            order__lt=self.order
+        ).count()
 
 
 class Enrollment(models.Model):
@@ -200,6 +313,16 @@ class Enrollment(models.Model):
         default=Status.ACTIVE
     )
     progress = models.IntegerField(_('progresso'), default=0, help_text=_('Progresso em porcentagem (0-100)'))
+    completed_lessons_count = models.PositiveIntegerField(_('aulas concluídas'), default=0, editable=False)
+    # Um bit por aula publicada, na ordem do programa (ver courses.bitmaps).
+    # NULL indica que o mapa precisa ser reconstruído a partir de LessonProgress.
+    completion_bitmap = models.BinaryField(
+        _('mapa de aulas concluídas'),
+        null=True,
+        blank=True,
+        default=bytes,
+        editable=False
+    )
     enrolled_at = models.DateTimeField(_('matriculado em'), auto_now_add=True)
     completed_at = models.DateTimeField(_('concluído em'), null=True, blank=True)
     
@@ -209,6 +332,16 @@ class Enrollment(models.Model):
         # Garante que um aluno só possa se matricular uma vez em cada curso
         unique_together = ['student', 'course']
         ordering = ['-enrolled_at']
+        indexes = [
+            # Matrículas do aluno por status (dashboard e estatísticas)
+            models.Index(fields=['student', 'status', '-enrolled_at'], name='enrollment_student_status_idx'),
+            # Matrículas ativas do aluno (dashboard e conjunto de cursos em cache)
+            models.Index(
+                fields=['student', '-enrolled_at'],
+                condition=models.Q(status='ACTIVE'),
+                name='enrollment_active_student_idx',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.student.email} - {self.course.title}"
@@ -228,28 +361,110 @@ class Enrollment(models.Model):
         """Verifica se a matrícula foi cancelada."""
         return self.status == self.Status.CANCELLED
     
-    def complete(self):
-        """Marca o curso como concluído pelo aluno."""
+    def _mark_completed(self):
+        """Preenche os campos de conclusão e retorna os nomes dos campos alterados."""
         self.status = self.Status.COMPLETED
         self.completed_at = timezone.now()
         self.progress = 100
-        self.save()
+        return ['status', 'completed_at', 'progress']
+    
+    def complete(self):
+        """Marca o curso como concluído pelo aluno."""
+        self.save(update_fields=self._mark_completed())
     
     def cancel(self):
         """Cancela a matrícula do aluno no curso."""
         self.status = self.Status.CANCELLED
-        self.save()
-    
-    def update_progress(self, completed_lessons_count):
-        """Atualiza o progresso do aluno com base no número de aulas concluídas."""
-        total_lessons = self.course.get_total_lessons()
+        self.save(update_fields=['status'])
+    
+    @staticmethod
+    def calculate_progress(completed_lessons_count, total_lessons):
+        """Calcula o percentual de progresso (0-100) a partir dos contadores."""
+        if total_lessons <= 0:
+            return 0
+        return min(100, int((completed_lessons_count / total_lessons) * 100))
+    
+    def update_progress(self, completed_lessons_count=None, completed_position=None):
+        """
+        Atualiza o progresso do aluno com base no número de aulas concluídas.
+        
+        Sem argumento, utiliza os contadores desnormalizados da matrícula e do curso,
+        lidos em uma única consulta. Se `completed_position` for informado, a aula
+        nessa posição do programa também é marcada no mapa de conclusão, na mesma
+        escrita do progresso.
+        """
+        if completed_lessons_count is None:
+            completed_lessons_count, total_lessons, self.completion_bitmap = Enrollment.objects.filter(
+                pk=self.pk
+            ).values_list(
+                'completed_lessons_count', 'course__published_lessons_count', 'completion_bitmap'
+            ).get()
+        else:
+            total_lessons = self.course.published_lessons_count
+        
+        self.completed_lessons_count = completed_lessons_count
+        update_fields = []
+        
+        if completed_position is not None and self.completion_bitmap is not None:
+            bitmap = CompletionBitmap(self.completion_bitmap)
+            bitmap.add(completed_position)
+            self.completion_bitmap = bitmap.to_bytes()
+            update_fields.append('completion_bitmap')
+        
         if total_lessons > 0:
-            self.progress = int((completed_lessons_count / total_lessons) * 100)
-            self.save()
+            progress = self.calculate_progress(completed_lessons_count, total_lessons)
             
             # Se o progresso for 100%, marca o curso como concluído
-            if self.progress == 100:
-                self.complete()
+            if progress == 100:
+                update_fields += self._mark_completed()
+            elif progress != self.progress:
+                self.progress = progress
+                update_fields.append('progress')
+        
+        if update_fields:
+            self.save(update_fields=update_fields)
+    
+    def rebuild_completion_bitmap(self, lessons=None):
+        """
+        Reconstrói o mapa de conclusão a partir dos registros de LessonProgress.
+        
+        `lessons` é o programa publicado do curso, em ordem; se omitido, é consultado.
+        """
+        if lessons is None:
+            lessons = Lesson.objects.filter(
+                course_id=self.course_id,
+                status=Lesson.Status.PUBLISHED
+            ).order_by('order')
+        positions = {lesson.pk: index for index, lesson in enumerate(lessons)}
+        
+        completed = self.lesson_progresses.filter(
+            is_completed=True,
+            lesson_id__in=list(positions)
+        ).values_list('lesson_id', flat=True)
+        
+        self.completion_bitmap = CompletionBitmap.from_positions(
+            positions[lesson_id] for lesson_id in completed
+        ).to_bytes()
+        # Não sobrescreve um mapa gravado por outra requisição nesse meio tempo
+        Enrollment.objects.filter(
+            pk=self.pk,
+            completion_bitmap__isnull=True
+        ).update(completion_bitmap=self.completion_bitmap)
+        return self.completion_bitmap
+    
+    def get_completed_lesson_ids(self, lessons):
+        """
+        Retorna o conjunto de IDs das aulas concluídas, decodificado do mapa de
+        conclusão (reconstruído se necessário).
+        
+        `lessons` deve ser a lista das aulas publicadas do curso, em ordem.
+        """
+        lessons = list(lessons)
+        if self.completion_bitmap is None:
+            self.rebuild_completion_bitmap(lessons)
+        
+        bitmap = CompletionBitmap(self.completion_bitmap)
+        return {lessons[position].pk for position in bitmap.positions(limit=len(lessons))}
 
 
 class LessonProgress(models.Model):
@@ -275,27 +490,102 @@ class LessonProgress(models.Model):
     completed_at = models.DateTimeField(_('concluída em'), null=True, blank=True)
     last_accessed_at = models.DateTimeField(_('último acesso em'), auto_now=True)
     
+    # Tempo assistido, acumulado a partir dos heartbeats do player (ver courses.heartbeats)
+    watched_seconds = models.PositiveIntegerField(_('segundos assistidos'), default=0)
+    
     class Meta:
         verbose_name = _('progresso de aula')
         verbose_name_plural = _('progressos de aulas')
         # Garante que cada aula só tenha um registro de progresso por matrícula
         unique_together = ['enrollment', 'lesson']
         ordering = ['lesson__order']
+        indexes = [
+            # Aulas concluídas da matrícula (mapa de conclusão e reconciliação)
+            models.Index(fields=['enrollment', 'is_completed'], name='progress_enrollment_done_idx'),
+            # Aulas acessadas recentemente (dashboard do aluno)
+            models.Index(fields=['enrollment', '-last_accessed_at'], name='progress_enrollment_access_idx'),
+        ]
         
     def __str__(self):
         return f"{self.enrollment.student.email} - {self.lesson.title}"
     
     def complete(self):
-        """Marca a aula como concluída pelo aluno."""
-        if not self.is_completed:
+        """
+        Marca a aula como concluída pelo aluno.
+        
+        São dois UPDATEs condicionais na mesma transação: a marcação do registro
+        e, na matrícula, o contador de aulas concluídas, o progresso, a conclusão
+        do curso e o mapa de conclusão. A posição da aula e o total de aulas vêm
+        da lista de aulas publicadas em cache (courses.cache), sem consultas.
+        A matrícula e a aula já carregadas na requisição devem estar atribuídas
+        ao registro (ver services.complete_lesson).
+        """
+        if self.is_completed:
+            return
+        
+        from .cache import get_published_lessons, invalidate_enrolled_course_ids
+        
+        lesson = self.lesson
+        enrollment = self.enrollment
+        lessons = get_published_lessons(lesson.course_id)
+        # Somente aulas publicadas contam para o progresso
+        position = next((index for index, published in enumerate(lessons) if published.pk == lesson.pk), None)
+        
+        now = timezone.now()
+        with transaction.atomic():
+            updated = LessonProgress.objects.filter(
+                pk=self.pk,
+                is_completed=False
+            ).update(is_completed=True, completed_at=now, last_accessed_at=now)
+            
             self.is_completed = True
-            self.completed_at = timezone.now()
-            self.save()
+            self.completed_at = now
+            self.last_accessed_at = now
             
-            # Atualiza o progresso geral do aluno no curso
-            completed_lessons = LessonProgress.objects.filter(
-                enrollment=self.enrollment,
-                is_completed=True
-            ).count()
+            # Outra requisição já concluiu esta aula: nada a contabilizar
+            if not updated or position is None:
+                return
+            
+            total = len(lessons)
+            completed_count = F('completed_lessons_count') + 1
+            finishes = Q(completed_lessons_count__gte=total - 1)
+            changes = {
+                'completed_lessons_count': completed_count,
+                'progress': Case(
+                    When(finishes, then=Value(100)),
+                    default=completed_count * 100 / total,
+                    output_field=models.IntegerField()
+                ),
+                'status': Case(
+                    When(finishes, then=Value(Enrollment.Status.COMPLETED)),
+                    default=F('status'),
+                    output_field=models.CharField()
+                ),
+                'completed_at': Case(
+                    When(finishes, then=Value(now)),
+                    default=F('completed_at'),
+                    output_field=models.DateTimeField()
+                ),
+            }
+            if enrollment.completion_bitmap is not None:
+                # Marca a posição no mapa lido com a matrícula; se outra requisição o
+                # alterou nesse meio tempo, o mapa é invalidado e reconstruído depois
+                bitmap = CompletionBitmap(enrollment.completion_bitmap)
+                bitmap.add(position)
+                changes['completion_bitmap'] = Case(
+                    When(completion_bitmap=enrollment.completion_bitmap, then=Value(bitmap.to_bytes())),
+                    default=Value(None),
+                    output_field=models.BinaryField()
+                )
+                enrollment.completion_bitmap = bitmap.to_bytes()
+            Enrollment.objects.filter(pk=enrollment.pk).update(**changes)
             
-            self.enrollment.update_progress(completed_lessons)
+            # Valores em memória, a partir dos contadores lidos com a matrícula
+            enrollment.completed_lessons_count += 1
+            if enrollment.completed_lessons_count >= total:
+                enrollment._mark_completed()
+                # update() não dispara sinais: o curso sai das matrículas ativas do aluno
+                student_id = enrollment.student_id
+                transaction.on_commit(lambda: invalidate_enrolled_course_ids(student_id))
+            else:
+                enrollment.progress = Enrollment.calculate_progress(enrollment.completed_lessons_count, total)
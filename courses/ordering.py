@@ -0,0 +1,180 @@
+"""
+Reordenação das aulas de um curso com ordem espaçada.
+
+As aulas novas recebem `order` em múltiplos de ORDER_GAP, deixando espaço
+entre aulas vizinhas. Para aplicar uma nova ordem, as aulas que já estão na
+ordem relativa certa (a maior subsequência crescente dos valores atuais)
+mantêm seu valor e somente as demais recebem valores livres no intervalo entre
+as vizinhas: mover uma aula altera uma única linha.
+
+Quando falta espaço em algum intervalo, todas as aulas são renumeradas em
+múltiplos de ORDER_GAP. Como a restrição unique (course, order) é verificada
+linha a linha durante o UPDATE, a renumeração passa primeiro por uma faixa
+temporária acima de todos os valores em uso.
+
+Os valores escolhidos nunca coincidem com o valor atual de outra aula, de modo
+que o bulk_update não viola a restrição em nenhum momento.
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import bump_course_version, purge_course_pages
+from .models import Course, Lesson
+
+ORDER_GAP = 1024
+
+
+class ReorderError(ValueError):
+    """A nova ordem não corresponde às aulas do curso."""
+
+
+def next_order(course):
+    """Valor de `order` para uma aula acrescentada ao fim do curso."""
+    last_order = Lesson.objects.filter(course=course).aggregate(Max('order'))['order__max'] or 0
+    return (last_order // ORDER_GAP + 1) * ORDER_GAP
+
+
+def _kept_positions(orders):
+    """Posições da maior subsequência estritamente crescente de `orders`."""
+    tails, tail_positions, previous = [], [], [None] * len(orders)
+    for position, value in enumerate(orders):
+        index = bisect_left(tails, value)
+        if index == len(tails):
+            tails.append(value)
+            tail_positions.append(position)
+        else:
+            tails[index] = value
+            tail_positions[index] = position
+        previous[position] = tail_positions[index - 1] if index else None
+
+    kept = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        kept.add(position)
+        position = previous[position]
+    return kept
+
+
+def plan_orders(current):
+    """
+    Recebe a lista [(id, order atual)] na nova sequência e retorna {id: novo
+    order} apenas das aulas que precisam mudar, ou None se não houver espaço.
+    """
+    orders = [order for lesson_id, order in current]
+    used = set(orders)
+    kept = _kept_positions(orders)
+    changes = {}
+
+    position = 0
+    while position < len(current):
+        if position in kept:
+            position += 1
+            continue
+
+        # Sequência de aulas a reposicionar entre duas aulas mantidas
+        end = position
+        while end < len(current) and end not in kept:
+            end += 1
+        low = orders[position - 1] if position > 0 else -1
+        high = orders[end] if end < len(current) else None
+        count = end - position
+
+        if high is None:
+            # Após a última aula mantida: sempre há espaço no fim
+            candidates = []
+            value = (max(low, max(used)) // ORDER_GAP + 1) * ORDER_GAP
+            while len(candidates) < count:
+                candidates.append(value)
+                value += ORDER_GAP
+        else:
+            step = (high - low) / (count + 1)
+            candidates = []
+            for index in range(1, count + 1):
+                value = int(low + step * index)
+                if value <= low or value in used or (candidates and value <= candidates[-1]):
+                    # Procura o próximo inteiro livre ainda abaixo de `high`
+                    value = max(value, candidates[-1] if candidates else low) + 1
+                    while value in used and value < high:
+                        value += 1
+                if value >= high:
+                    return None
+                candidates.append(value)
+
+        for offset, value in enumerate(candidates):
+            lesson_id = current[position + offset][0]
+            changes[lesson_id] = value
+            orders[position + offset] = value
+            used.add(value)
+        position = end
+
+    return changes
+
+
+@transaction.atomic
+def reorder_lessons(course, lesson_ids):
+    """
+    Aplica a nova sequência `lesson_ids` (todas as aulas do curso) em uma
+    transação. Retorna o número de aulas alteradas.
+    """
+    # Serializa reordenações concorrentes do mesmo curso
+    Course.objects.select_for_update().filter(pk=course.pk).first()
+    current = dict(Lesson.objects.filter(course=course).values_list('pk', 'order'))
+
+    lesson_ids = [int(lesson_id) for lesson_id in lesson_ids]
+    if len(lesson_ids) != len(set(lesson_ids)) or set(lesson_ids) != set(current):
+        raise ReorderError('A nova ordem deve conter cada aula do curso exatamente uma vez.')
+
+    changes = plan_orders([(lesson_id, current[lesson_id]) for lesson_id in lesson_ids])
+    # bulk_update não aplica o auto_now: updated_at é definido explicitamente
+    now = timezone.now()
+    if changes is None:
+        # Sem espaço: renumera tudo, passando por uma faixa temporária livre
+        changes = {lesson_id: (index + 1) * ORDER_GAP for index, lesson_id in enumerate(lesson_ids)}
+        offset = max(max(current.values()), len(lesson_ids) * ORDER_GAP) + 1
+        Lesson.objects.bulk_update(
+            [Lesson(pk=lesson_id, order=offset + index, updated_at=now) for index, lesson_id in enumerate(lesson_ids)],
+            ['order', 'updated_at']
+        )
+    if not changes:
+        return 0
+
+    Lesson.objects.bulk_update(
+        [Lesson(pk=lesson_id, order=order, updated_at=now) for lesson_id, order in changes.items()],
+        ['order', 'updated_at'],
+        batch_size=500
+    )
+
+    # bulk_update não chama Lesson.save() nem dispara sinais: invalida os mapas
+    # de conclusão (posições do programa), a lista de aulas em cache e a página
+    # pública do curso
+    Lesson._outline_changed(course.pk)
+    transaction.on_commit(lambda: bump_course_version(course.pk))
+    transaction.on_commit(lambda: purge_course_pages(course.pk))
+    return len(changes)
+
+
+def move_lesson(course, lesson_id, before=None, after=None):
+    """
+    Move a aula para antes de `before` ou depois de `after` (IDs de aulas do
+    curso); sem nenhum dos dois, para o fim. Retorna o número de aulas alteradas.
+    """
+    lesson_ids = list(Lesson.objects.filter(course=course).order_by('order').values_list('pk', flat=True))
+    lesson_id = int(lesson_id)
+    if lesson_id not in lesson_ids:
+        raise ReorderError('Aula não encontrada no curso.')
+    lesson_ids.remove(lesson_id)
+
+    anchor = before if before is not None else after
+    if anchor is None:
+        lesson_ids.append(lesson_id)
+    else:
+        try:
+            index = lesson_ids.index(int(anchor))
+        except ValueError:
+            raise ReorderError('Aula de referência não encontrada no curso.')
+        lesson_ids.insert(index if before is not None else index + 1, lesson_id)
+
+    return reorder_lessons(course, lesson_ids)
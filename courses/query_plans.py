@@ -0,0 +1,164 @@
+"""
+Consultas quentes das views de alunos e professores e verificação dos seus
+planos de execução (comando check_query_plans).
+
+Cada consulta é montada a partir de objetos de amostra (as das ListViews pelo
+get_queryset() e pela paginação da própria view) e o plano retornado por
+`QuerySet.explain()` é analisado à procura de varreduras completas de tabela:
+`SCAN <tabela>` sem índice no SQLite e `Seq Scan on <tabela>` no PostgreSQL.
+"""
+import re
+
+from django.db import connection
+from django.test import RequestFactory
+
+from core.pagination import KeysetPaginator
+
+from . import student_views, views
+from .models import Lesson, Enrollment, LessonProgress
+
+SQLITE_SCAN_REGEX = re.compile(r'\bSCAN (?:TABLE )?(\w+)(.*)')
+POSTGRES_SCAN_REGEX = re.compile(r'Seq Scan on (\w+)')
+# Tabela virtual (FTS5) consultada com restrição: "VIRTUAL TABLE INDEX 0:M3"
+SQLITE_VIRTUAL_INDEX_REGEX = re.compile(r'VIRTUAL TABLE INDEX \d+:\S')
+
+
+def setup_view(view_class, user, **params):
+    """Instância de `view_class` preparada para um GET de `user` com `params`."""
+    request = RequestFactory().get('/', params)
+    request.user = user
+    view = view_class()
+    view.setup(request)
+    return view
+
+
+def view_page(view_class, user, after=None, **params):
+    """
+    Queryset de uma página da ListView `view_class`, como a view a pagina: por
+    chave (depois do objeto `after`) ou, sem ordenação estável, por OFFSET.
+    """
+    view = setup_view(view_class, user, **params)
+    queryset = view.get_queryset()
+    page_size = view.get_paginate_by(queryset)
+    ordering = view.get_keyset_ordering(queryset)
+    if not ordering:
+        return queryset[:page_size]
+
+    paginator = KeysetPaginator(queryset, page_size, ordering)
+    return paginator.page_queryset(paginator.encode_cursor('n', after) if after else None)
+
+
+# Nome -> função que recebe o contexto de amostra e retorna o queryset. As
+# consultas das views são montadas pelo próprio get_queryset() da view
+HOT_QUERIES = {
+    'student_dashboard_enrollments': lambda sample: setup_view(
+        student_views.StudentDashboardView, sample['student']
+    ).get_queryset(),
+
+    'student_dashboard_stats': lambda sample: Enrollment.objects.filter(
+        student=sample['student']
+    ).values('status'),
+
+    'student_recent_lessons': lambda sample: LessonProgress.objects.filter(
+        enrollment__student=sample['student']
+    ).select_related('lesson', 'enrollment', 'enrollment__course').order_by('-last_accessed_at')[:5],
+
+    'student_enrolled_course_ids': lambda sample: Enrollment.objects.filter(
+        student_id=sample['student'].pk,
+        status=Enrollment.Status.ACTIVE
+    ).values_list('course_id', flat=True),
+
+    'catalog_first_page': lambda sample: view_page(
+        student_views.CourseListView, sample['student']
+    ),
+
+    'catalog_next_page': lambda sample: view_page(
+        student_views.CourseListView, sample['student'], after=sample['course']
+    ),
+
+    'catalog_search': lambda sample: view_page(
+        student_views.CourseListView, sample['student'], query=sample['course'].title.split()[0]
+    ),
+
+    'course_published_lessons': lambda sample: Lesson.objects.filter(
+        course_id=sample['course'].pk,
+        status=Lesson.Status.PUBLISHED
+    ).order_by('order'),
+
+    'enrollment_completed_lessons': lambda sample: LessonProgress.objects.filter(
+        enrollment=sample['enrollment'],
+        is_completed=True
+    ).order_by('lesson__order'),
+
+    'course_enrolled_students_count': lambda sample: Enrollment.objects.filter(
+        course_id=sample['course'].pk
+    ).values('pk'),
+
+    'professor_dashboard_courses': lambda sample: setup_view(
+        views.DashboardView, sample['course'].professor
+    ).get_queryset(),
+
+    'professor_courses': lambda sample: view_page(
+        views.CourseListView, sample['course'].professor
+    ),
+}
+
+
+def full_scans(plan, vendor=None):
+    """Tabelas lidas por varredura completa no plano `plan` (texto de explain())."""
+    vendor = vendor or connection.vendor
+    if vendor == 'postgresql':
+        return sorted(set(POSTGRES_SCAN_REGEX.findall(plan)))
+
+    tables = set()
+    for line in plan.splitlines():
+        match = SQLITE_SCAN_REGEX.search(line)
+        if not match or match.group(1) == 'CONSTANT':
+            continue
+        if 'USING' not in match.group(2) and not SQLITE_VIRTUAL_INDEX_REGEX.search(match.group(2)):
+            tables.add(match.group(1))
+    return sorted(tables)
+
+
+def hot_query_sample():
+    """Contexto de amostra: a primeira matrícula ativa, com o aluno e o curso."""
+    enrollment = Enrollment.objects.filter(
+        status=Enrollment.Status.ACTIVE
+    ).select_related('student', 'course', 'course__professor').order_by('pk').first()
+    return {
+        'student': enrollment.student,
+        'course': enrollment.course,
+        'enrollment': enrollment,
+    }
+
+
+def prepare_planner():
+    """
+    Prepara o planejador para verificar se existe um índice utilizável, e não
+    qual plano é o mais barato no conjunto de dados pequeno da verificação: em
+    tabelas pequenas a varredura completa é preferida mesmo havendo índice.
+
+    No PostgreSQL, atualiza as estatísticas e desabilita a varredura sequencial
+    na transação atual. No SQLite, descarta as estatísticas do ANALYZE (se
+    houver) e recarrega o esquema: sem elas o planejador estima tabelas grandes.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('ANALYZE')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute('DELETE FROM sqlite_stat1')
+                cursor.execute('ANALYZE sqlite_master')
+
+
+def explain_hot_queries(sample, names=None):
+    """Retorna {nome: (plano, tabelas com varredura completa)} das consultas quentes."""
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        if names and name not in names:
+            continue
+        plan = build(sample).explain()
+        results[name] = (plan, full_scans(plan))
+    return results
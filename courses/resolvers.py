@@ -0,0 +1,126 @@
+"""
+Resolução, uma única vez por requisição, dos objetos das rotas de cursos e aulas.
+
+As rotas de cursos recebem o curso em `course_id` (ou `pk`) e, nas rotas de
+aulas, a aula em `lesson_id` (ou `pk`, nas views de edição de aulas). Sem um
+ponto comum, o mixin de permissão, a view e o formulário consultavam o mesmo
+curso e a mesma matrícula várias vezes na mesma requisição.
+
+O CourseResolver fica guardado na requisição e carrega sob demanda, no máximo
+uma vez cada:
+
+- `course`: o curso da URL, com o professor (select_related);
+- `lesson`: a aula da URL, com o curso e o professor;
+- `enrollment`: a matrícula ativa do usuário no curso, ligada ao curso já carregado.
+
+As views obtêm esses objetos pelo CourseResolverMixin (`get_course()`,
+`get_lesson()` e `get_enrollment()`, que levantam Http404 quando o objeto não
+existe) e os repassam aos formulários e ao contexto.
+"""
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from .cache import get_enrolled_course_ids
+from .models import Course, Lesson, Enrollment
+
+
+class CourseResolver:
+    """Curso, aula e matrícula ativa da requisição, carregados sob demanda."""
+
+    def __init__(self, request, course_id=None, lesson_id=None):
+        self.request = request
+        self._course_id = course_id
+        self._lesson_id = lesson_id
+
+    @property
+    def course_id(self):
+        if self._course_id is None and self._lesson_id is not None:
+            return self.lesson.course_id if self.lesson else None
+        return int(self._course_id) if self._course_id is not None else None
+
+    @cached_property
+    def lesson(self):
+        if self._lesson_id is None:
+            return None
+        lessons = Lesson.objects.select_related('course__professor').filter(pk=self._lesson_id)
+        if self._course_id is not None:
+            lessons = lessons.filter(course_id=self._course_id)
+        return lessons.first()
+
+    @cached_property
+    def course(self):
+        # Nas rotas de aula sem o curso na URL, o curso vem junto com a aula
+        if self._course_id is None:
+            return self.lesson.course if self.lesson else None
+        if 'lesson' in self.__dict__ and self.lesson is not None:
+            return self.lesson.course
+        return Course.objects.select_related('professor').filter(pk=self._course_id).first()
+
+    @cached_property
+    def enrollment(self):
+        user = self.request.user
+        course_id = self.course_id
+        if not user.is_authenticated or course_id is None:
+            return None
+        enrollment = Enrollment.objects.filter(
+            student_id=user.pk,
+            course_id=course_id,
+            status=Enrollment.Status.ACTIVE
+        ).first()
+        # Liga a matrícula ao curso já carregado (diretamente ou com a aula)
+        course = self.__dict__.get('course') or getattr(self.__dict__.get('lesson'), 'course', None)
+        if enrollment is not None and course is not None:
+            enrollment.course = course
+        return enrollment
+
+    def is_enrolled(self):
+        """
+        Indica se o usuário tem matrícula ativa no curso: usa a matrícula, se
+        já carregada, ou o conjunto em cache dos cursos do aluno.
+        """
+        if 'enrollment' in self.__dict__:
+            return self.enrollment is not None
+        course_id = self.course_id
+        return course_id is not None and course_id in get_enrolled_course_ids(self.request.user)
+
+
+def get_course_resolver(request, course_id=None, lesson_id=None):
+    """Retorna o CourseResolver da requisição, criando-o na primeira chamada."""
+    resolver = getattr(request, '_course_resolver', None)
+    if resolver is None:
+        resolver = request._course_resolver = CourseResolver(request, course_id, lesson_id)
+    return resolver
+
+
+class CourseResolverMixin:
+    """
+    Dá às views (e aos mixins de permissão) acesso ao CourseResolver da
+    requisição. `course_url_kwargs` lista, em ordem, os parâmetros da URL que
+    podem conter o curso e `lesson_url_kwarg`, o da aula (None desativa).
+    """
+    course_url_kwargs = ('course_id', 'pk')
+    lesson_url_kwarg = 'lesson_id'
+
+    @property
+    def course_resolver(self):
+        course_id = next((self.kwargs[name] for name in self.course_url_kwargs if name in self.kwargs), None)
+        lesson_id = self.kwargs.get(self.lesson_url_kwarg) if self.lesson_url_kwarg else None
+        return get_course_resolver(self.request, course_id, lesson_id)
+
+    def get_course(self):
+        course = self.course_resolver.course
+        if course is None:
+            raise Http404('Curso não encontrado.')
+        return course
+
+    def get_lesson(self):
+        lesson = self.course_resolver.lesson
+        if lesson is None:
+            raise Http404('Aula não encontrada.')
+        return lesson
+
+    def get_enrollment(self):
+        enrollment = self.course_resolver.enrollment
+        if enrollment is None:
+            raise Http404('Matrícula não encontrada.')
+        return enrollment
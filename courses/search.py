@@ -0,0 +1,225 @@
+"""
+Busca textual do catálogo de cursos.
+
+Os backends expõem a mesma interface: `search()` filtra e ordena um queryset de
+Course por relevância, e `index_course()`/`remove_course()` mantêm o índice
+atualizado a partir dos sinais de Course (ver courses.signals). O backend é
+escolhido pela configuração COURSE_SEARCH_BACKEND ou, se ela não existir, pelo
+banco de dados em uso:
+
+- SQLite: tabela virtual FTS5 (`courses_course_fts`) com bm25;
+- PostgreSQL: tabela `courses_course_search` com tsvector, índice GIN e ts_rank_cd;
+- demais bancos: `icontains` nos campos de texto, sem ranking.
+
+Nos backends indexados (SQLite e PostgreSQL), os acentos são removidos em
+Python tanto no conteúdo indexado quanto na busca, de modo que "introducao"
+encontra "Introdução". O backend `icontains` compara o texto como está, sem
+diferenciar maiúsculas de minúsculas, mas sensível a acentos.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Course
+
+WORD_REGEX = re.compile(r'\w+')
+
+
+def fold_accents(text):
+    """Remove acentos e converte para minúsculas ("Introdução" -> "introducao")."""
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+
+def query_terms(query):
+    """Quebra a busca em termos sem acento, ignorando a sintaxe do mecanismo de busca."""
+    return WORD_REGEX.findall(fold_accents(query))
+
+
+class BaseSearchBackend:
+    """Interface comum dos backends de busca do catálogo."""
+
+    # Campos indexados, do mais relevante para o menos relevante
+    fields = ('title', 'short_description', 'description')
+
+    def search(self, queryset, query):
+        """
+        Filtra `queryset` pelos cursos que correspondem a `query`. Backends com
+        ranking anotam `search_rank` e ordenam por relevância.
+        """
+        raise NotImplementedError
+
+    def index_course(self, course):
+        """Insere ou atualiza o curso no índice."""
+
+    def remove_course(self, course_id):
+        """Remove o curso do índice."""
+
+    def rebuild(self, batch_size=500):
+        """Reconstrói o índice inteiro; retorna o número de cursos indexados."""
+        return 0
+
+    def document(self, course):
+        return [fold_accents(getattr(course, field)) for field in self.fields]
+
+    def _iter_courses(self, batch_size):
+        queryset = Course._default_manager.only('pk', *self.fields).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1].pk
+
+
+class IcontainsSearchBackend(BaseSearchBackend):
+    """
+    Busca por `icontains`, sem índice e sem ranking (comportamento original).
+    Não remove acentos: "introducao" não encontra "Introdução".
+    """
+
+    ranked = False
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(short_description__icontains=query)
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """Índice FTS5 do SQLite, ordenado por bm25 com peso maior para o título."""
+
+    ranked = True
+    table = 'courses_course_fts'
+    weights = (10.0, 4.0, 1.0)
+
+    def _match(self, query):
+        # Cada termo vira um prefixo entre aspas, o que neutraliza operadores do FTS5
+        return ' '.join(f'"{term}"*' for term in query_terms(query))
+
+    def search(self, queryset, query):
+        match = self._match(query)
+        if not match:
+            return queryset
+
+        # O filtro é um IN sobre o MATCH (avaliado uma única vez); o bm25 de cada
+        # curso encontrado vem da busca na tabela FTS5 pelo rowid
+        course_table = Course._meta.db_table
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({self.table}, {weights}) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND {self.table}.rowid = "{course_table}"."id"',
+            [match],
+            output_field=FloatField(),
+        )).order_by('-search_rank', '-created_at')
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [course.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {", ".join(self.fields)}) VALUES (%s, %s, %s, %s)',
+                [course.pk, *self.document(course)]
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [course_id])
+
+    def rebuild(self, batch_size=500):
+        indexed = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            for batch in self._iter_courses(batch_size):
+                cursor.executemany(
+                    f'INSERT INTO {self.table} (rowid, {", ".join(self.fields)}) VALUES (%s, %s, %s, %s)',
+                    [[course.pk, *self.document(course)] for course in batch]
+                )
+                indexed += len(batch)
+        return indexed
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector (dicionário português) com índice GIN e ranking por ts_rank_cd."""
+
+    ranked = True
+    table = 'courses_course_search'
+    config = 'portuguese'
+    weights = ('A', 'B', 'C')
+
+    def _vector_sql(self):
+        return ' || '.join(
+            f"setweight(to_tsvector('{self.config}', %s), '{weight}')" for weight in self.weights
+        )
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return queryset
+
+        # Busca por prefixo de cada termo (equivalente ao "termo*" do FTS5)
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        course_table = Course._meta.db_table
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT course_id FROM {self.table} WHERE document @@ to_tsquery('{self.config}', %s)",
+            [tsquery],
+        )).annotate(search_rank=RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('{self.config}', %s)) FROM {self.table} "
+            f'WHERE {self.table}.course_id = "{course_table}"."id"',
+            [tsquery],
+            output_field=FloatField(),
+        )).order_by('-search_rank', '-created_at')
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (course_id, document) VALUES (%s, {self._vector_sql()}) '
+                f'ON CONFLICT (course_id) DO UPDATE SET document = EXCLUDED.document',
+                [course.pk, *self.document(course)]
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE course_id = %s', [course_id])
+
+    def rebuild(self, batch_size=500):
+        indexed = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            for batch in self._iter_courses(batch_size):
+                cursor.executemany(
+                    f'INSERT INTO {self.table} (course_id, document) VALUES (%s, {self._vector_sql()})',
+                    [[course.pk, *self.document(course)] for course in batch]
+                )
+                indexed += len(batch)
+        return indexed
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Retorna a instância (única por processo) do backend de busca configurado."""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'COURSE_SEARCH_BACKEND', None)
+        if backend_path:
+            backend_class = import_string(backend_path)
+        else:
+            backend_class = VENDOR_BACKENDS.get(connection.vendor, IcontainsSearchBackend)
+        _backend = backend_class()
+    return _backend
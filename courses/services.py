@@ -0,0 +1,243 @@
+"""
+Serviços de domínio do app courses que operam em lote sobre matrículas e progresso.
+"""
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.taskqueue import enqueue
+from core.transactions import retry_on_lock
+
+from .cache import invalidate_enrolled_course_ids
+from .models import Lesson, Enrollment, LessonProgress
+
+
+def seed_lesson_progress(enrollments, lessons=None, batch_size=1000):
+    """
+    Cria os registros de LessonProgress das matrículas informadas com um único
+    bulk_create (ignorando registros já existentes).
+
+    `enrollments` deve conter matrículas do mesmo curso. Se `lessons` não for
+    informado, usa as aulas publicadas do curso.
+    """
+    enrollments = list(enrollments)
+    if not enrollments:
+        return 0
+
+    if lessons is None:
+        lessons = Lesson.objects.filter(
+            course_id=enrollments[0].course_id,
+            status=Lesson.Status.PUBLISHED
+        ).values_list('pk', flat=True)
+    lesson_ids = [getattr(lesson, 'pk', lesson) for lesson in lessons]
+
+    progresses = [
+        LessonProgress(enrollment_id=enrollment.pk, lesson_id=lesson_id)
+        for enrollment in enrollments
+        for lesson_id in lesson_ids
+    ]
+    LessonProgress.objects.bulk_create(progresses, batch_size=batch_size, ignore_conflicts=True)
+    return len(progresses)
+
+
+@retry_on_lock
+def enroll_student(student, course):
+    """
+    Matricula o aluno no curso, reativando matrículas canceladas.
+
+    Retorna a tupla (enrollment, status), em que status é 'created',
+    'reactivated' ou 'existing'. Os registros de progresso das aulas de uma
+    nova matrícula são criados em segundo plano (core.taskqueue): até lá, as
+    views os criam sob demanda.
+    """
+    with transaction.atomic():
+        enrollment, created = Enrollment.objects.get_or_create(
+            student=student,
+            course=course,
+            defaults={'status': Enrollment.Status.ACTIVE}
+        )
+
+        if created:
+            enqueue('courses.tasks.seed_enrollment_progress', args=[enrollment.pk])
+            return enrollment, 'created'
+
+        if enrollment.status == Enrollment.Status.CANCELLED:
+            enrollment.status = Enrollment.Status.ACTIVE
+            enrollment.save(update_fields=['status'])
+            return enrollment, 'reactivated'
+
+    return enrollment, 'existing'
+
+
+@retry_on_lock
+def complete_lesson(enrollment, lesson):
+    """
+    Marca a aula como concluída pelo aluno matriculado, criando o registro de
+    progresso se necessário. Retorna o LessonProgress.
+    """
+    lesson_progress, created = LessonProgress.objects.get_or_create(
+        enrollment=enrollment,
+        lesson=lesson
+    )
+    # Reaproveita a matrícula e a aula já carregadas (pelo resolvedor, nas views)
+    lesson_progress.enrollment = enrollment
+    lesson_progress.lesson = lesson
+    lesson_progress.complete()
+    return lesson_progress
+
+
+def recompute_enrollment_progress(course_id, batch_size=1000):
+    """
+    Recalcula o progresso das matrículas do curso após uma mudança no programa
+    publicado, recontando as aulas publicadas concluídas em LessonProgress (não
+    confia nos contadores desnormalizados). Matrículas ativas que chegam a 100%
+    são concluídas; as já concluídas mantêm 100%. Retorna o número de
+    matrículas atualizadas.
+    """
+    total = Lesson.objects.filter(course_id=course_id, status=Lesson.Status.PUBLISHED).count()
+    completed_lessons = LessonProgress.objects.filter(
+        enrollment=OuterRef('pk'),
+        is_completed=True,
+        lesson__status=Lesson.Status.PUBLISHED
+    ).values('enrollment').annotate(count=Count('pk')).values('count')
+
+    queryset = Enrollment.objects.filter(course_id=course_id).exclude(
+        status=Enrollment.Status.COMPLETED
+    ).only(
+        'pk', 'student_id', 'status', 'progress', 'completed_lessons_count', 'completed_at'
+    ).annotate(actual_completed=Coalesce(Subquery(completed_lessons), 0))
+
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return updated
+        last_pk = batch[-1].pk
+
+        drifted = []
+        completed = []
+        for enrollment in batch:
+            progress = Enrollment.calculate_progress(enrollment.actual_completed, total)
+            if (progress == enrollment.progress
+                    and enrollment.actual_completed == enrollment.completed_lessons_count
+                    and not (progress == 100 and enrollment.is_active)):
+                continue
+            enrollment.completed_lessons_count = enrollment.actual_completed
+            enrollment.progress = progress
+            if progress == 100 and enrollment.is_active:
+                enrollment._mark_completed()
+                completed.append(enrollment.student_id)
+            drifted.append(enrollment)
+
+        with transaction.atomic():
+            Enrollment.objects.bulk_update(
+                drifted, ['completed_lessons_count', 'progress', 'status', 'completed_at']
+            )
+        # bulk_update não dispara sinais: invalida o cache explicitamente
+        invalidate_enrolled_course_ids(*completed)
+        updated += len(drifted)
+
+
+@dataclass
+class CohortEnrollmentResult:
+    """Resumo de uma matrícula em lote."""
+    created: int = 0
+    reactivated: int = 0
+    existing: int = 0
+    not_found: list = field(default_factory=list)
+    not_students: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def processed(self):
+        return (self.created + self.reactivated + self.existing
+                + len(self.not_found) + len(self.not_students))
+
+    @property
+    def throughput(self):
+        """Alunos processados por segundo."""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def enroll_cohort(course, emails, chunk_size=500):
+    """
+    Matricula uma turma de alunos (identificados por email) em um curso.
+
+    Cada lote roda em sua própria transação e custa um número constante de
+    consultas: uma para resolver os usuários, uma para as matrículas existentes,
+    e os bulk_create de matrículas e de progresso das aulas.
+    """
+    User = get_user_model()
+    result = CohortEnrollmentResult()
+    started = time.perf_counter()
+
+    lesson_ids = list(Lesson.objects.filter(
+        course=course,
+        status=Lesson.Status.PUBLISHED
+    ).values_list('pk', flat=True))
+
+    for chunk in _chunks(emails, chunk_size):
+        normalized = {User.objects.normalize_email(email.strip()) for email in chunk if email.strip()}
+
+        with transaction.atomic():
+            users = {
+                email: (pk, user_type)
+                for email, pk, user_type in User.objects.filter(
+                    email__in=normalized
+                ).values_list('email', 'pk', 'user_type')
+            }
+            student_ids = {
+                pk for pk, user_type in users.values() if user_type == User.Types.STUDENT
+            }
+
+            result.not_found.extend(sorted(normalized - set(users)))
+            result.not_students.extend(sorted(
+                email for email, (pk, user_type) in users.items() if pk not in student_ids
+            ))
+
+            existing = dict(Enrollment.objects.filter(
+                course=course,
+                student_id__in=student_ids
+            ).values_list('student_id', 'status'))
+
+            cancelled = [
+                student_id for student_id, status in existing.items()
+                if status == Enrollment.Status.CANCELLED
+            ]
+            if cancelled:
+                Enrollment.objects.filter(
+                    course=course,
+                    student_id__in=cancelled
+                ).update(status=Enrollment.Status.ACTIVE)
+
+            new_enrollments = Enrollment.objects.bulk_create([
+                Enrollment(student_id=student_id, course=course, status=Enrollment.Status.ACTIVE)
+                for student_id in sorted(student_ids - set(existing))
+            ])
+            seed_lesson_progress(new_enrollments, lesson_ids)
+
+        # bulk_create e update() não disparam sinais: invalida o cache explicitamente
+        invalidate_enrolled_course_ids(*cancelled, *(e.student_id for e in new_enrollments))
+
+        result.created += len(new_enrollments)
+        result.reactivated += len(cancelled)
+        result.existing += len(existing) - len(cancelled)
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,97 @@
+"""
+Sinais do app courses, conectados em CoursesConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.images import derivatives_generated
+
+from .cache import bump_course_version, invalidate_enrolled_course_ids, purge_course_pages
+from .models import Course, Lesson, Enrollment
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Course, dispatch_uid='courses_index_course')
+def index_course(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Atualiza o índice de busca do catálogo quando um curso é salvo."""
+    backend = get_search_backend()
+    if raw or (update_fields and not set(update_fields) & set(backend.fields)):
+        return
+    backend.index_course(instance)
+
+
+@receiver(post_delete, sender=Course, dispatch_uid='courses_unindex_course')
+def unindex_course(sender, instance, **kwargs):
+    """Remove o curso do índice de busca do catálogo."""
+    get_search_backend().remove_course(instance.pk)
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid='courses_enrollment_saved')
+@receiver(post_delete, sender=Enrollment, dispatch_uid='courses_enrollment_deleted')
+def invalidate_enrolled_courses(sender, instance, **kwargs):
+    """Invalida o conjunto de cursos matriculados do aluno (matrícula, cancelamento, exclusão)."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'status' not in update_fields:
+        return
+    invalidate_enrolled_course_ids(instance.student_id)
+
+
+@receiver(post_save, sender=Course, dispatch_uid='courses_course_cache_saved')
+@receiver(post_delete, sender=Course, dispatch_uid='courses_course_cache_deleted')
+def invalidate_course_cache(sender, instance, **kwargs):
+    """Troca a versão das chaves em cache do curso após o commit."""
+    course_id = instance.pk
+    transaction.on_commit(lambda: bump_course_version(course_id))
+
+
+@receiver(post_save, sender=Lesson, dispatch_uid='courses_lesson_cache_saved')
+@receiver(post_delete, sender=Lesson, dispatch_uid='courses_lesson_cache_deleted')
+def invalidate_lesson_course_cache(sender, instance, **kwargs):
+    """
+    Aulas alteram a lista de aulas e os contadores do curso; a troca de versão
+    ocorre após o commit, depois de Lesson.save() ajustar os contadores.
+    """
+    course_id = instance.course_id
+    transaction.on_commit(lambda: bump_course_version(course_id))
+
+
+@receiver(derivatives_generated, sender=Course, dispatch_uid='courses_course_derivatives_generated')
+def invalidate_course_image_cache(sender, pk, **kwargs):
+    """
+    O manifesto das derivadas é gravado com UPDATE: troca a versão do curso em
+    cache e invalida as páginas públicas que exibem a imagem.
+    """
+    bump_course_version(pk)
+    purge_course_pages(pk, catalog=True)
+
+
+@receiver(post_save, sender=Course, dispatch_uid='courses_course_pages_saved')
+@receiver(post_delete, sender=Course, dispatch_uid='courses_course_pages_deleted')
+def purge_course_page_cache(sender, instance, **kwargs):
+    """
+    Invalida a página pública do curso e, se ele está ou estava publicado
+    (publicação, arquivamento, edição), o catálogo.
+    """
+    was_published = getattr(instance, '_loaded_status', None) == Course.Status.PUBLISHED
+    catalog = instance.is_published or was_published
+    course_id = instance.pk
+    transaction.on_commit(lambda: purge_course_pages(course_id, catalog=catalog))
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Lesson, dispatch_uid='courses_lesson_pages_saved')
+@receiver(post_delete, sender=Lesson, dispatch_uid='courses_lesson_pages_deleted')
+def purge_lesson_page_cache(sender, instance, created=False, **kwargs):
+    """
+    Aulas aparecem na página pública do curso; o catálogo só mostra o número de
+    aulas publicadas e é invalidado quando ele muda.
+    """
+    was_published = getattr(instance, '_loaded_status', None) == Lesson.Status.PUBLISHED
+    if kwargs['signal'] is post_delete:
+        catalog = instance.is_published
+    else:
+        catalog = instance.is_published != was_published
+    course_id = instance.course_id
+    transaction.on_commit(lambda: purge_course_pages(course_id, catalog=catalog))
+    instance._loaded_status = instance.status
@@ -0,0 +1,41 @@
+"""
+Estatísticas dos dashboards calculadas com agregações condicionais.
+
+Cada função faz uma única consulta sobre a tabela envolvida, com um
+`Count(filter=Q(...))` por indicador, em vez de um COUNT separado por filtro.
+"""
+from django.db.models import Count, Q
+
+from .models import Course, Enrollment
+
+
+def professor_course_stats(professor):
+    """Totais de cursos do professor: total, publicados e rascunhos."""
+    return Course.objects.filter(professor=professor).aggregate(
+        total_courses=Count('pk'),
+        published_courses=Count('pk', filter=Q(status=Course.Status.PUBLISHED)),
+        draft_courses=Count('pk', filter=Q(status=Course.Status.DRAFT)),
+    )
+
+
+def student_enrollment_stats(student):
+    """Totais de matrículas do aluno: ativas e cursos concluídos."""
+    return Enrollment.objects.filter(student=student).aggregate(
+        total_enrollments=Count('pk', filter=Q(status=Enrollment.Status.ACTIVE)),
+        completed_courses=Count('pk', filter=Q(status=Enrollment.Status.COMPLETED)),
+    )
+
+
+def course_platform_stats():
+    """Totais de cursos e matrículas da plataforma (uma consulta por tabela)."""
+    stats = Course.objects.aggregate(
+        total_courses=Count('pk'),
+        published_courses=Count('pk', filter=Q(status=Course.Status.PUBLISHED)),
+        draft_courses=Count('pk', filter=Q(status=Course.Status.DRAFT)),
+    )
+    stats.update(Enrollment.objects.aggregate(
+        total_enrollments=Count('pk'),
+        active_enrollments=Count('pk', filter=Q(status=Enrollment.Status.ACTIVE)),
+        completed_enrollments=Count('pk', filter=Q(status=Enrollment.Status.COMPLETED)),
+    ))
+    return stats
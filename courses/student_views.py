@@ -1,14 +1,32 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, FormView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.db.models import Q, Count, Case, When, IntegerField
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.utils import timezone
 
+from core.conditional import ConditionalGetMixin
+from core.pagination import KeysetPaginationMixin
+from core.response_cache import AnonymousResponseCacheMixin
+from core.routers import ReadReplicaMixin
+
 from .models import Course, Lesson, Enrollment, LessonProgress
+from .resolvers import CourseResolverMixin
+from .conditional import catalog_validator, course_validator
+from .cache import (
+    CATALOG_CACHE_TAG, course_page_tag,
+    get_enrolled_course_ids, get_enrolled_students_count, get_published_course, get_published_lessons
+)
 from .forms import CourseEnrollForm, CourseSearchForm
+from .heartbeats import record_heartbeat
+from .search import get_search_backend
+from .services import complete_lesson, enroll_student
+from .stats import student_enrollment_stats
+from .video import resolve_youtube_id
 
 
 class StudentRequiredMixin(UserPassesTestMixin):
@@ -19,28 +37,86 @@ class StudentRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_authenticated and self.request.user.is_student
 
 
-class EnrollmentRequiredMixin(UserPassesTestMixin):
+class EnrollmentRequiredMixin(CourseResolverMixin, UserPassesTestMixin):
     """
     Mixin para verificar se o aluno está matriculado no curso.
+    
+    A matrícula ativa é carregada pelo resolvedor da requisição quando a view
+    precisa dela (`get_enrollment()`); a verificação em si usa o conjunto em
+    cache dos cursos do aluno.
     """
     def test_func(self):
         if not self.request.user.is_authenticated or not self.request.user.is_student:
             return False
             
-        # Obter o curso da URL
-        course_id = self.kwargs.get('course_id') or self.kwargs.get('pk')
-        if course_id:
-            course = get_object_or_404(Course, pk=course_id)
-            return Enrollment.objects.filter(
-                student=self.request.user, 
-                course=course,
-                status=Enrollment.Status.ACTIVE
-            ).exists()
+        return self.course_resolver.is_enrolled()
+
+
+def lesson_navigation(lessons, completed_lessons, lesson_id=None):
+    """
+    Escolhe a aula que o aluno deve assistir (a informada em `lesson_id` ou a
+    primeira não concluída) e retorna o contexto de navegação da página de
+    aprendizado: aula atual, ID do vídeo e aulas anterior e seguinte.
+    Compartilhado pelas views síncrona e assíncrona (courses.async_views).
+    """
+    context = {'current_lesson': None}
+    current_lesson = None
+    
+    if lesson_id:
+        # Se um ID de aula foi fornecido, usa essa aula
+        current_lesson = next(
+            (lesson for lesson in lessons if str(lesson.pk) == str(lesson_id)),
+            None
+        )
+        
+    if not current_lesson and lessons:
+        # Encontra a primeira aula não concluída ou a primeira aula
+        current_lesson = next(
+            (lesson for lesson in lessons if lesson.pk not in completed_lessons),
+            lessons[0]
+        )
+        
+    if current_lesson:
+        context['current_lesson'] = current_lesson
+        
+        # ID do vídeo do YouTube resolvido na gravação da aula; aulas antigas
+        # ainda não preenchidas (ver backfill_video_ids) usam o resolvedor memoizado
+        context['youtube_video_id'] = current_lesson.youtube_id or resolve_youtube_id(current_lesson.video_url)
+        
+        # Determina a aula anterior e a próxima
+        current_index = lessons.index(current_lesson)
+        
+        if current_index > 0:
+            context['prev_lesson'] = lessons[current_index - 1]
             
-        return False
+        if current_index < len(lessons) - 1:
+            context['next_lesson'] = lessons[current_index + 1]
+            
+    return context
+
+
+def next_lesson_url(course_id, lessons, lesson, url_name='courses:student:course_learn'):
+    """URL de aprendizado da aula publicada seguinte a `lesson` (ou do curso, se for a última)."""
+    url = reverse(url_name, kwargs={'pk': course_id})
+    next_lesson = next((item for item in lessons if item.order > lesson.order), None)
+    if next_lesson:
+        url += f'?lesson_id={next_lesson.id}'
+    return url
 
 
-class StudentDashboardView(LoginRequiredMixin, StudentRequiredMixin, ListView):
+class CachedPublishedCourseMixin:
+    """
+    Mixin para DetailViews de alunos que obtém o curso publicado (com o
+    professor) do cache versionado por curso, em vez de consultar o banco.
+    """
+    def get_object(self, queryset=None):
+        course = get_published_course(self.kwargs['pk'])
+        if course is None:
+            raise Http404('Curso não encontrado.')
+        return course
+
+
+class StudentDashboardView(LoginRequiredMixin, StudentRequiredMixin, ReadReplicaMixin, ListView):
     """
     Dashboard do aluno mostrando seus cursos matriculados e progresso.
     """
@@ -52,18 +128,13 @@ class StudentDashboardView(LoginRequiredMixin, StudentRequiredMixin, ListView):
         return Enrollment.objects.filter(
             student=self.request.user,
             status=Enrollment.Status.ACTIVE
-        ).select_related('course').order_by('-enrolled_at')
+        ).select_related('course__professor').order_by('-enrolled_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Estatísticas básicas
-        enrollments = self.get_queryset()
-        context['total_enrollments'] = enrollments.count()
-        context['completed_courses'] = Enrollment.objects.filter(
-            student=self.request.user,
-            status=Enrollment.Status.COMPLETED
-        ).count()
+        # Estatísticas básicas em uma única consulta
+        context.update(student_enrollment_stats(self.request.user))
         
         # Cursos recentemente acessados
         context['recent_lessons'] = LessonProgress.objects.filter(
@@ -74,7 +145,7 @@ class StudentDashboardView(LoginRequiredMixin, StudentRequiredMixin, ListView):
         return context
 
 
-class CourseListView(ListView):
+class CourseListView(ReadReplicaMixin, AnonymousResponseCacheMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     Lista todos os cursos publicados disponíveis para matrícula.
     """
@@ -83,12 +154,31 @@ class CourseListView(ListView):
     context_object_name = 'courses'
     paginate_by = 12
     
+    # Parâmetros que alteram a página no cache de visitantes anônimos
+    response_cache_params = ('query', 'order_by', 'page', 'cursor')
+    
+    # Ordenações estáveis (desempate por id) usadas na paginação por chave
+    KEYSET_ORDERINGS = {
+        'title': ('title', 'id'),
+        '-title': ('-title', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        '-created_at': ('-created_at', '-id'),
+    }
+    
+    def get_keyset_ordering(self, queryset):
+        # Resultados ordenados por relevância da busca usam a paginação tradicional
+        ordering = queryset.query.order_by
+        if ordering and ordering[0] == '-search_rank':
+            return None
+        return self.KEYSET_ORDERINGS.get(ordering[0] if ordering else '-created_at')
+    
     def get_queryset(self):
+        # O número de aulas vem do contador desnormalizado (published_lessons_count),
+        # evitando o GROUP BY de um Count('lessons') na consulta do catálogo
         queryset = Course.objects.filter(
             status=Course.Status.PUBLISHED
-        ).select_related('professor').annotate(
-            lessons_count=Count('lessons')
-        )
+        ).select_related('professor')
         
         # Aplica o filtro de busca, se fornecido
         form = CourseSearchForm(self.request.GET)
@@ -97,43 +187,43 @@ class CourseListView(ListView):
             order_by = form.cleaned_data.get('order_by')
             
             if query:
-                queryset = queryset.filter(
-                    Q(title__icontains=query) | 
-                    Q(description__icontains=query) |
-                    Q(short_description__icontains=query)
-                )
+                # Busca indexada (FTS5/tsvector), que já ordena por relevância
+                queryset = get_search_backend().search(queryset, query)
                 
-            if order_by:
+            if order_by and order_by != 'relevance':
                 queryset = queryset.order_by(order_by)
-            else:
+            elif not queryset.query.order_by:
+                # Sem ranking de busca, os mais recentes aparecem primeiro
                 queryset = queryset.order_by('-created_at')
         else:
             queryset = queryset.order_by('-created_at')
             
-        # Para usuários autenticados, marque os cursos em que já estão matriculados
-        if self.request.user.is_authenticated:
-            enrolled_courses = Enrollment.objects.filter(
-                student=self.request.user,
-                status=Enrollment.Status.ACTIVE
-            ).values_list('course_id', flat=True)
-            
-            queryset = queryset.annotate(
-                is_enrolled=Case(
-                    When(id__in=enrolled_courses, then=1),
-                    default=0,
-                    output_field=IntegerField()
-                )
-            )
-        
+        # A consulta não depende do usuário; as matrículas são marcadas em memória
+        # em get_context_data a partir do conjunto em cache
         return queryset
     
+    def get_validator(self):
+        return catalog_validator(self.request.user)
+    
+    def get_response_cache_tags(self):
+        return (CATALOG_CACHE_TAG,)
+    
+    def get_enrolled_course_ids(self):
+        return get_enrolled_course_ids(self.request.user)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_form'] = CourseSearchForm(self.request.GET)
+        
+        # Para usuários autenticados, marque os cursos em que já estão matriculados
+        enrolled_course_ids = self.get_enrolled_course_ids()
+        for course in context['object_list']:
+            course.is_enrolled = course.pk in enrolled_course_ids
+        
         return context
 
 
-class CourseDetailView(DetailView):
+class CourseDetailView(ReadReplicaMixin, AnonymousResponseCacheMixin, ConditionalGetMixin, CachedPublishedCourseMixin, DetailView):
     """
     Exibe os detalhes de um curso específico para alunos.
     """
@@ -145,6 +235,14 @@ class CourseDetailView(DetailView):
         # Somente cursos publicados podem ser visualizados
         return Course.objects.filter(status=Course.Status.PUBLISHED)
     
+    def get_validator(self):
+        user = self.request.user
+        student = user if user.is_authenticated and user.is_student else None
+        return course_validator(self.kwargs['pk'], student=student)
+    
+    def get_response_cache_tags(self):
+        return (course_page_tag(self.kwargs['pk']),)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course = self.object
@@ -153,7 +251,9 @@ class CourseDetailView(DetailView):
         is_enrolled = False
         enrollment = None
         
-        if self.request.user.is_authenticated and self.request.user.is_student:
+        # O conjunto em cache evita a consulta para alunos não matriculados
+        if (self.request.user.is_authenticated and self.request.user.is_student
+                and course.pk in get_enrolled_course_ids(self.request.user)):
             try:
                 enrollment = Enrollment.objects.get(
                     student=self.request.user,
@@ -166,14 +266,6 @@ class CourseDetailView(DetailView):
                 context['enrollment'] = enrollment
                 context['progress_width'] = f"{enrollment.progress}%"
                 
-                # Busca as aulas que o aluno já completou
-                completed_lessons = LessonProgress.objects.filter(
-                    enrollment=enrollment,
-                    is_completed=True
-                ).values_list('lesson_id', flat=True)
-                
-                context['completed_lessons'] = completed_lessons
-                
             except Enrollment.DoesNotExist:
                 pass
                 
@@ -181,18 +273,19 @@ class CourseDetailView(DetailView):
         context['enrollment_form'] = CourseEnrollForm()
         
         # Lista de aulas (só mostra todas se estiver matriculado, caso contrário mostra apenas algumas)
-        lessons = Lesson.objects.filter(
-            course=course,
-            status=Lesson.Status.PUBLISHED
-        ).order_by('order')
+        lessons = get_published_lessons(course.pk)
+        context['total_lessons'] = len(lessons)
+        context['enrolled_students_count'] = get_enrolled_students_count(course.pk)
         
         if not is_enrolled:
             # Se não estiver matriculado, mostra apenas algumas aulas como demonstração
             context['lessons'] = lessons[:2]  # Mostra apenas as 2 primeiras aulas
-            context['total_lessons'] = lessons.count()
         else:
             context['lessons'] = lessons
             
+            # Aulas que o aluno já completou, decodificadas do mapa de conclusão
+            context['completed_lessons'] = enrollment.get_completed_lesson_ids(lessons)
+            
         return context
 
 
@@ -203,50 +296,31 @@ class CourseEnrollView(LoginRequiredMixin, StudentRequiredMixin, FormView):
     form_class = CourseEnrollForm
     template_name = 'courses/student/course_enroll.html'
     
+    def get_course(self):
+        course = get_published_course(self.kwargs['pk'])
+        if course is None:
+            raise Http404('Curso não encontrado.')
+        return course
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['course'] = get_object_or_404(
-            Course,
-            pk=self.kwargs['pk'],
-            status=Course.Status.PUBLISHED
-        )
+        context['course'] = self.get_course()
+        context['lessons'] = get_published_lessons(context['course'].pk)
         return context
     
     def form_valid(self, form):
-        course = get_object_or_404(
-            Course,
-            pk=self.kwargs['pk'],
-            status=Course.Status.PUBLISHED
-        )
+        course = self.get_course()
         
-        # Verifica se o aluno já está matriculado
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=self.request.user,
-            course=course,
-            defaults={'status': Enrollment.Status.ACTIVE}
-        )
+        # Matricula o aluno (ou reativa a matrícula cancelada); os registros de
+        # progresso das aulas são criados em lote pela fila de tarefas
+        enrollment, status = enroll_student(self.request.user, course)
         
-        if not created and enrollment.status == Enrollment.Status.CANCELLED:
-            # Se a matrícula estava cancelada, reativa
-            enrollment.status = Enrollment.Status.ACTIVE
-            enrollment.save()
+        if status == 'reactivated':
             messages.success(self.request, 'Você reativou sua matrícula no curso.')
-        elif not created:
+        elif status == 'existing':
             messages.info(self.request, 'Você já está matriculado neste curso.')
         else:
             messages.success(self.request, 'Matrícula realizada com sucesso!')
-            
-            # Cria registros de progresso para todas as aulas
-            lessons = Lesson.objects.filter(
-                course=course,
-                status=Lesson.Status.PUBLISHED
-            )
-            
-            for lesson in lessons:
-                LessonProgress.objects.get_or_create(
-                    enrollment=enrollment,
-                    lesson=lesson
-                )
         
         return HttpResponseRedirect(self.get_success_url())
     
@@ -254,7 +328,7 @@ class CourseEnrollView(LoginRequiredMixin, StudentRequiredMixin, FormView):
         return reverse('courses:student:course_learn', kwargs={'pk': self.kwargs['pk']})
 
 
-class CourseLearnView(LoginRequiredMixin, EnrollmentRequiredMixin, DetailView):
+class CourseLearnView(LoginRequiredMixin, EnrollmentRequiredMixin, ConditionalGetMixin, CachedPublishedCourseMixin, DetailView):
     """
     Interface para o aluno assistir e acompanhar as aulas de um curso.
     """
@@ -265,62 +339,34 @@ class CourseLearnView(LoginRequiredMixin, EnrollmentRequiredMixin, DetailView):
     def get_queryset(self):
         return Course.objects.filter(status=Course.Status.PUBLISHED)
     
+    def get_validator(self):
+        # Inclui o progresso da matrícula (aulas concluídas e porcentagem)
+        return course_validator(self.kwargs['pk'], student=self.request.user)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course = self.object
         
-        # Obtém a matrícula do aluno
-        enrollment = get_object_or_404(
-            Enrollment,
-            student=self.request.user,
-            course=course,
-            status=Enrollment.Status.ACTIVE
-        )
+        # Matrícula do aluno, carregada uma única vez pelo resolvedor
+        enrollment = self.get_enrollment()
         
         context['enrollment'] = enrollment
         context['progress_width'] = f"{enrollment.progress}%"
         
-        # Obtém todas as aulas do curso em ordem
-        lessons = Lesson.objects.filter(
-            course=course,
-            status=Lesson.Status.PUBLISHED
-        ).order_by('order')
+        # Obtém todas as aulas do curso em ordem (lista em cache por curso)
+        lessons = get_published_lessons(course.pk)
         
         context['lessons'] = lessons
         
-        # Verifica qual aula o aluno deve assistir agora (parâmetro ou próxima não concluída)
-        lesson_id = self.request.GET.get('lesson_id')
-        current_lesson = None
-        
-        if lesson_id:
-            # Se um ID de aula foi fornecido, usa essa aula
-            try:
-                current_lesson = lessons.get(pk=lesson_id)
-            except Lesson.DoesNotExist:
-                pass
-                
-        if not current_lesson and lessons.exists():
-            # Encontra a primeira aula não concluída ou a primeira aula
-            lesson_progress = LessonProgress.objects.filter(
-                enrollment=enrollment,
-                is_completed=False
-            ).order_by('lesson__order').first()
-            
-            if lesson_progress:
-                current_lesson = lesson_progress.lesson
-            else:
-                current_lesson = lessons.first()
-                
-        context['current_lesson'] = current_lesson
-        
-        # Busca as aulas que o aluno já completou para marcar visualmente
-        completed_lessons = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            is_completed=True
-        ).values_list('lesson_id', flat=True)
-        
+        # Aulas que o aluno já completou (mapa de conclusão da matrícula), para
+        # marcar visualmente com verificação O(1) por aula
+        completed_lessons = enrollment.get_completed_lesson_ids(lessons)
         context['completed_lessons'] = completed_lessons
         
+        # Aula atual (parâmetro ou próxima não concluída), vídeo e navegação
+        context.update(lesson_navigation(lessons, completed_lessons, self.request.GET.get('lesson_id')))
+        
+        current_lesson = context['current_lesson']
         if current_lesson:
             # Atualiza ou cria um registro de progresso para esta aula
             lesson_progress, created = LessonProgress.objects.get_or_create(
@@ -328,42 +374,6 @@ class CourseLearnView(LoginRequiredMixin, EnrollmentRequiredMixin, DetailView):
                 lesson=current_lesson
             )
             
-            # Extrai o ID do vídeo do YouTube, se for um vídeo do YouTube
-            youtube_video_id = None
-            if current_lesson.video_url:
-                import re
-                from urllib.parse import urlparse, parse_qs
-                
-                # Pattern para URLs completas do YouTube
-                youtube_regex = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-                
-                youtube_match = re.match(youtube_regex, current_lesson.video_url)
-                if youtube_match:
-                    youtube_video_id = youtube_match.group(6)
-                else:
-                    # Se não der match, tenta com urlparse para URLs do tipo youtu.be
-                    parsed_url = urlparse(current_lesson.video_url)
-                    if 'youtu.be' in parsed_url.netloc:
-                        youtube_video_id = parsed_url.path.lstrip('/')
-                    
-                    # Para URLs do formato youtube.com/watch?v=ID
-                    elif 'youtube.com' in parsed_url.netloc:
-                        query = parse_qs(parsed_url.query)
-                        if 'v' in query:
-                            youtube_video_id = query['v'][0]
-            
-            context['youtube_video_id'] = youtube_video_id
-            
-            # Determina a aula anterior e a próxima
-            lesson_list = list(lessons)
-            current_index = lesson_list.index(current_lesson)
-            
-            if current_index > 0:
-                context['prev_lesson'] = lesson_list[current_index - 1]
-                
-            if current_index < len(lesson_list) - 1:
-                context['next_lesson'] = lesson_list[current_index + 1]
-            
         return context
 
 
@@ -374,43 +384,43 @@ class LessonCompleteView(LoginRequiredMixin, EnrollmentRequiredMixin, View):
     http_method_names = ['post']
     
     def post(self, request, *args, **kwargs):
-        course = get_object_or_404(Course, pk=kwargs['course_id'])
-        lesson = get_object_or_404(Lesson, pk=kwargs['lesson_id'], course=course)
-        
-        # Obtém a matrícula do aluno
-        enrollment = get_object_or_404(
-            Enrollment,
-            student=request.user,
-            course=course,
-            status=Enrollment.Status.ACTIVE
-        )
-        
-        # Marca a aula como concluída
-        lesson_progress, created = LessonProgress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson
-        )
+        # Aula (com o curso) e matrícula, carregadas uma única vez pelo resolvedor
+        lesson = self.get_lesson()
+        course = lesson.course
+        enrollment = self.get_enrollment()
         
-        lesson_progress.complete()
+        # Marca a aula como concluída (repete a transação se o banco estiver bloqueado)
+        complete_lesson(enrollment, lesson)
         
         messages.success(request, 'Aula marcada como concluída!')
         
         # Retorna para a próxima aula ou para a página do curso
-        next_lesson = Lesson.objects.filter(
-            course=course,
-            order__gt=lesson.order,
-            status=Lesson.Status.PUBLISHED
-        ).order_by('order').first()
-        
-        if next_lesson:
-            return HttpResponseRedirect(
-                reverse('courses:student:course_learn', kwargs={'pk': course.id}) +
-                f'?lesson_id={next_lesson.id}'
-            )
-        else:
-            return HttpResponseRedirect(
-                reverse('courses:student:course_learn', kwargs={'pk': course.id})
-            )
+        return HttpResponseRedirect(next_lesson_url(course.pk, get_published_lessons(course.pk), lesson))
+
+
+class LessonHeartbeatView(LoginRequiredMixin, EnrollmentRequiredMixin, View):
+    """
+    Recebe os heartbeats do player em JSON (`{"seconds": 15}`) e os acrescenta
+    ao buffer de courses.heartbeats, sem escrever no banco na requisição.
+    """
+    http_method_names = ['post']
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            seconds = int(json.loads(request.body or b'{}').get('seconds', 0))
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Heartbeat inválido.'}, status=400)
+        if seconds < 0:
+            return JsonResponse({'error': 'Heartbeat inválido.'}, status=400)
+        
+        # A aula precisa estar publicada no curso (lista em cache por curso)
+        lesson_id = kwargs['lesson_id']
+        if not any(lesson.pk == lesson_id for lesson in get_published_lessons(kwargs['course_id'])):
+            raise Http404('Aula não encontrada.')
+        
+        if not record_heartbeat(request.user.pk, kwargs['course_id'], lesson_id, seconds):
+            return JsonResponse({'status': 'dropped'}, status=503)
+        return JsonResponse({'status': 'accepted'}, status=202)
 
 
 class EnrollmentCancelView(LoginRequiredMixin, EnrollmentRequiredMixin, View):
@@ -420,15 +430,8 @@ class EnrollmentCancelView(LoginRequiredMixin, EnrollmentRequiredMixin, View):
     http_method_names = ['post']
     
     def post(self, request, *args, **kwargs):
-        course = get_object_or_404(Course, pk=kwargs['pk'])
-        
-        # Obtém a matrícula do aluno
-        enrollment = get_object_or_404(
-            Enrollment,
-            student=request.user,
-            course=course,
-            status=Enrollment.Status.ACTIVE
-        )
+        # Matrícula do aluno, carregada pelo resolvedor
+        enrollment = self.get_enrollment()
         
         # Cancela a matrícula
         enrollment.cancel()
@@ -0,0 +1,21 @@
+"""
+Tarefas em segundo plano do app courses (ver core.taskqueue).
+"""
+from core.taskqueue import task
+
+from .models import Enrollment
+from .services import recompute_enrollment_progress, seed_lesson_progress
+
+
+@task(priority=10)
+def seed_enrollment_progress(enrollment_id):
+    """Cria os registros de progresso das aulas de uma nova matrícula."""
+    enrollment = Enrollment.objects.filter(pk=enrollment_id).only('pk', 'course_id').first()
+    if enrollment is not None:
+        seed_lesson_progress([enrollment])
+
+
+@task
+def recompute_course_progress(course_id):
+    """Recalcula o progresso das matrículas após uma mudança no número de aulas publicadas."""
+    recompute_enrollment_progress(course_id)
@@ -1,6 +1,6 @@
 from django import template
-import re
-from urllib.parse import urlparse, parse_qs
+
+from courses.video import resolve_youtube_id
 
 register = template.Library()
 
@@ -20,28 +20,7 @@ def get_youtube_id(url):
     Extrai o ID de um vídeo do YouTube a partir da URL.
     Suporta formatos de URL completos e encurtados.
     """
-    if not url:
-        return None
-        
-    # Pattern para URLs completas do YouTube
-    youtube_regex = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    
-    youtube_match = re.match(youtube_regex, url)
-    if youtube_match:
-        return youtube_match.group(6)
-    
-    # Se não der match, tenta com urlparse para URLs do tipo youtu.be
-    parsed_url = urlparse(url)
-    if 'youtu.be' in parsed_url.netloc:
-        return parsed_url.path.lstrip('/')
-    
-    # Para URLs do formato youtube.com/watch?v=ID
-    if 'youtube.com' in parsed_url.netloc:
-        query = parse_qs(parsed_url.query)
-        if 'v' in query:
-            return query['v'][0]
-            
-    return None
+    return resolve_youtube_id(url)
 
 @register.filter
 def get_next(items, current_item):
@@ -1,3 +1,968 @@
-from django.test import TestCase
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import User
+from core.seeding import LoadDataSpec, seed_load_data
+
+from .bitmaps import CompletionBitmap
+from .heartbeats import QUEUE_EVENT_KEY, QUEUE_HEAD_KEY, CacheHeartbeatBuffer
+from .cache import (
+    ENROLLED_COURSES_KEY, STATS_KEY, get_cache_stats, get_course_version, get_enrolled_course_ids, get_published_course,
+    get_published_lessons, reset_cache_stats
+)
+from .models import Course, Enrollment, Lesson, LessonProgress
+from .ordering import ORDER_GAP, ReorderError, move_lesson, next_order, plan_orders, reorder_lessons
+from .query_plans import HOT_QUERIES, explain_hot_queries, hot_query_sample, prepare_planner
+from .search import IcontainsSearchBackend, fold_accents, get_search_backend, query_terms
+from .services import complete_lesson, enroll_cohort, enroll_student, seed_lesson_progress
+from .stats import course_platform_stats, professor_course_stats, student_enrollment_stats
+from .templatetags.course_tags import get_youtube_id
+from .video import resolve_youtube_id
+
+
+class CourseTestCase(TestCase):
+    """
+    Base dos testes com um professor, um aluno e um curso publicado com
+    `lesson_count` aulas publicadas (`cls.lessons`). Com `enroll`, o aluno é
+    matriculado (`cls.enrollment`). O cache é limpo antes de cada teste.
+    """
+    lesson_count = 3
+    enroll = False
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create_user(email='professor@example.com', password='x', user_type='PROFESSOR')
+        cls.student = User.objects.create_user(email='aluno@example.com', password='x', user_type='STUDENT')
+        cls.course = Course.objects.create(
+            professor=cls.professor, title='Violão', price=0, status=Course.Status.PUBLISHED
+        )
+        cls.lessons = [
+            Lesson.objects.create(course=cls.course, title=f'Aula {index}', order=index, status=Lesson.Status.PUBLISHED)
+            for index in range(1, cls.lesson_count + 1)
+        ]
+        cls.enrollment = enroll_student(cls.student, cls.course)[0] if cls.enroll else None
+
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(CourseTestCase):
+    """GET condicional (ETag) do catálogo, do detalhe do curso e da página de aprendizado."""
+
+    def assertRevalidates(self, url, queries):
+        """Uma requisição com a ETag da anterior recebe 304 com `queries` consultas."""
+        # O primeiro acesso define o cookie CSRF, que faz parte da ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_catalog_not_modified(self):
+        # Uma única consulta de agregação sobre os cursos publicados
+        self.assertRevalidates(reverse('courses:student:course_list'), queries=1)
+
+    def test_course_detail_not_modified_until_lesson_changes(self):
+        url = reverse('courses:student:course_detail', kwargs={'pk': self.course.pk})
+        etag = self.assertRevalidates(url, queries=1)
+
+        lesson = self.lessons[0]
+        lesson.title = 'Afinação'
+        lesson.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_course_detail_changes_when_lesson_deleted(self):
+        url = reverse('courses:student:course_detail', kwargs={'pk': self.course.pk})
+        etag = self.client.get(url)['ETag']
+        self.lessons[2].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_learn_page_not_modified_until_progress_changes(self):
+        # Os registros de progresso da matrícula são criados pela fila de tarefas
+        with self.captureOnCommitCallbacks(execute=True):
+            enroll_student(self.student, self.course)
+        self.client.force_login(self.student)
+        url = reverse('courses:student:course_learn', kwargs={'pk': self.course.pk})
+
+        # Sessão e usuário (autenticação) + o validador com o progresso da matrícula
+        etag = self.assertRevalidates(url, queries=3)
+
+        enrollment = Enrollment.objects.get(student=self.student, course=self.course)
+        complete_lesson(enrollment, self.lessons[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('courses:student:course_detail', kwargs={'pk': self.course.pk})
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_professor_course_detail_not_modified(self):
+        self.client.force_login(self.professor)
+        url = reverse('courses:course_detail', kwargs={'pk': self.course.pk})
+        # Sessão, usuário e curso (permissão) + o validador
+        self.assertRevalidates(url, queries=4)
+
+    def test_missing_course_is_not_found(self):
+        url = reverse('courses:student:course_detail', kwargs={'pk': 999})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='W/"x"').status_code, 404)
+
+
+class AnonymousResponseCacheTests(CourseTestCase):
+    """Cache de páginas públicas para visitantes anônimos e invalidação por etiquetas."""
+    lesson_count = 1
+
+    def setUp(self):
+        super().setUp()
+        self.lesson = self.lessons[0]
+        self.catalog_url = reverse('courses:student:course_list')
+        self.detail_url = reverse('courses:student:course_detail', kwargs={'pk': self.course.pk})
+
+    def test_hit_without_queries(self):
+        self.assertEqual(self.client.get(self.catalog_url)['X-Response-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.catalog_url)
+        self.assertEqual(response['X-Response-Cache'], 'HIT')
+
+    def test_query_string_is_normalized(self):
+        self.client.get(self.catalog_url, {'query': 'violão', 'order_by': 'title'})
+        response = self.client.get(self.catalog_url, {'order_by': 'title', 'query': '  violão ', 'utm_source': 'x'})
+        self.assertEqual(response['X-Response-Cache'], 'HIT')
+        response = self.client.get(self.catalog_url, {'query': 'piano'})
+        self.assertEqual(response['X-Response-Cache'], 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(self.catalog_url)
+        self.client.force_login(self.student)
+        self.assertFalse(self.client.get(self.catalog_url).has_header('X-Response-Cache'))
+
+    def test_lesson_edit_purges_course_page_only(self):
+        self.client.get(self.catalog_url)
+        self.client.get(self.detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.title = 'Escalas'
+            self.lesson.save()
+
+        self.assertEqual(self.client.get(self.detail_url)['X-Response-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.catalog_url)['X-Response-Cache'], 'HIT')
+
+    def test_archive_purges_catalog(self):
+        self.client.get(self.catalog_url)
+        course = Course.objects.get(pk=self.course.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.archive()
+
+        response = self.client.get(self.catalog_url)
+        self.assertEqual(response['X-Response-Cache'], 'MISS')
+        self.assertNotContains(response, 'Violão')
+
+
+class ProgressCounterTests(CourseTestCase):
+    """Contadores de aulas concluídas e progresso das matrículas após mudanças no programa."""
+    enroll = True
+
+    def complete(self, lesson):
+        complete_lesson(Enrollment.objects.get(pk=self.enrollment.pk), lesson)
+        return Enrollment.objects.get(pk=self.enrollment.pk)
+
+    def test_complete_lesson_updates_counters(self):
+        enrollment = self.complete(self.lessons[0])
+        self.assertEqual((enrollment.completed_lessons_count, enrollment.progress), (1, 33))
+        self.assertEqual(enrollment.get_completed_lesson_ids(self.lessons), {self.lessons[0].pk})
+
+        # Concluir de novo a mesma aula não altera os contadores
+        enrollment = self.complete(self.lessons[0])
+        self.assertEqual(enrollment.completed_lessons_count, 1)
+
+    def test_complete_is_two_updates(self):
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        progress = LessonProgress.objects.create(enrollment=enrollment, lesson=self.lessons[0])
+        get_published_lessons(self.course.pk)
+
+        # Savepoint, UPDATE do registro, UPDATE da matrícula e liberação do savepoint
+        with self.assertNumQueries(4):
+            progress.complete()
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.completed_lessons_count, enrollment.progress), (1, 33))
+
+    def test_completing_last_lesson_completes_enrollment(self):
+        for lesson in self.lessons:
+            enrollment = self.complete(lesson)
+        self.assertEqual((enrollment.progress, enrollment.status), (100, Enrollment.Status.COMPLETED))
+        self.assertIsNotNone(enrollment.completed_at)
+        self.assertEqual(enrollment.get_completed_lesson_ids(self.lessons), {lesson.pk for lesson in self.lessons})
+
+    def test_deleting_completed_lesson_decrements_counter(self):
+        self.complete(self.lessons[0])
+        # O commit troca a versão da lista de aulas publicadas em cache
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.get(pk=self.lessons[0].pk).delete()
+
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertEqual(enrollment.completed_lessons_count, 0)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).published_lessons_count, 2)
+
+        # A outra aula restante continua pendente: o curso não é concluído
+        enrollment = self.complete(self.lessons[1])
+        self.assertEqual((enrollment.completed_lessons_count, enrollment.progress), (1, 50))
+        self.assertEqual(enrollment.status, Enrollment.Status.ACTIVE)
+
+    def test_unpublishing_completed_lesson_decrements_counter(self):
+        self.complete(self.lessons[0])
+        lesson = Lesson.objects.get(pk=self.lessons[0].pk)
+        lesson.status = Lesson.Status.DRAFT
+        lesson.save()
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_lessons_count, 0)
+
+        # Publicar de novo volta a contar a aula já concluída
+        lesson.publish()
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_lessons_count, 1)
+
+    def bitmap(self):
+        return list(CompletionBitmap(Enrollment.objects.get(pk=self.enrollment.pk).completion_bitmap).positions())
+
+    def test_complete_sets_bitmap_bit(self):
+        Enrollment.objects.get(pk=self.enrollment.pk).rebuild_completion_bitmap()
+        self.complete(self.lessons[1])
+        self.assertEqual(self.bitmap(), [1])
+        self.complete(self.lessons[2])
+        self.assertEqual(self.bitmap(), [1, 2])
+
+    def test_stale_bitmap_is_discarded(self):
+        Enrollment.objects.get(pk=self.enrollment.pk).rebuild_completion_bitmap()
+        stale = Enrollment.objects.get(pk=self.enrollment.pk)
+        # Outra requisição conclui uma aula depois que `stale` foi carregada
+        self.complete(self.lessons[0])
+
+        complete_lesson(stale, self.lessons[1])
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertIsNone(enrollment.completion_bitmap)
+        self.assertEqual(enrollment.completed_lessons_count, 2)
+        self.assertEqual(enrollment.get_completed_lesson_ids(self.lessons), {self.lessons[0].pk, self.lessons[1].pk})
+
+    def test_outline_change_rebuilds_bitmap(self):
+        self.complete(self.lessons[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.get(pk=self.lessons[0].pk).delete()
+
+        # As posições mudam com o programa: o mapa é descartado e reconstruído
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertIsNone(enrollment.completion_bitmap)
+        self.assertEqual(enrollment.get_completed_lesson_ids(self.lessons[1:]), {self.lessons[1].pk})
+        self.assertEqual(self.bitmap(), [0])
+
+    def test_deleting_pending_lesson_keeps_counter(self):
+        self.complete(self.lessons[0])
+        Lesson.objects.get(pk=self.lessons[2].pk).delete()
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_lessons_count, 1)
+
+
+@override_settings(TASKS_EAGER=True)
+class ProgressRecomputeTests(CourseTestCase):
+    """Recálculo do progresso em segundo plano após mudanças no programa publicado."""
+    enroll = True
+
+    def complete(self, *lessons):
+        for lesson in lessons:
+            complete_lesson(Enrollment.objects.get(pk=self.enrollment.pk), lesson)
+
+    def enrollment_state(self):
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        return enrollment.completed_lessons_count, enrollment.progress, enrollment.status
+
+    def test_unpublishing_completed_lesson_recomputes_progress(self):
+        self.complete(self.lessons[0], self.lessons[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.get(pk=self.lessons[0].pk)
+            lesson.status = Lesson.Status.DRAFT
+            lesson.save()
+        self.assertEqual(self.enrollment_state(), (1, 50, Enrollment.Status.ACTIVE))
+
+    def test_recompute_recounts_stale_counters(self):
+        self.complete(self.lessons[0])
+        # Contador divergente (ex.: gravado antes da correção): o recálculo reconta
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons_count=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.get(pk=self.lessons[2].pk).delete()
+        self.assertEqual(self.enrollment_state(), (1, 50, Enrollment.Status.ACTIVE))
+
+    def test_removing_last_lessons_resets_progress(self):
+        self.complete(self.lessons[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            for lesson in Lesson.objects.filter(course=self.course):
+                lesson.delete()
+        self.assertEqual(self.enrollment_state(), (0, 0, Enrollment.Status.ACTIVE))
+
+    def test_removing_pending_lesson_completes_enrollment(self):
+        self.complete(self.lessons[0], self.lessons[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.get(pk=self.lessons[2].pk).delete()
+        self.assertEqual(self.enrollment_state(), (2, 100, Enrollment.Status.COMPLETED))
+
+
+class ReconcileProgressTests(CourseTestCase):
+    """Comando reconcile_progress sobre matrículas com contadores divergentes."""
+    enroll = True
+
+    def setUp(self):
+        super().setUp()
+        seed_lesson_progress([self.enrollment])
+
+    def reconcile(self, *args):
+        output = StringIO()
+        call_command('reconcile_progress', *args, stdout=output)
+        return Enrollment.objects.get(pk=self.enrollment.pk), output.getvalue()
+
+    def test_drifted_enrollment_reaching_100_is_completed(self):
+        # Todas as aulas concluídas nos registros, mas os contadores ficaram para trás
+        LessonProgress.objects.filter(enrollment=self.enrollment).update(is_completed=True)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons_count=1, progress=33)
+
+        enrollment, output = self.reconcile('--dry-run')
+        self.assertEqual((enrollment.progress, enrollment.status), (33, Enrollment.Status.ACTIVE))
+        self.assertIn('1 matrícula(s)', output)
+
+        enrollment, output = self.reconcile()
+        self.assertEqual(
+            (enrollment.completed_lessons_count, enrollment.progress, enrollment.status),
+            (3, 100, Enrollment.Status.COMPLETED)
+        )
+        self.assertIsNotNone(enrollment.completed_at)
+        self.assertIsNone(enrollment.completion_bitmap)
+
+    def test_active_enrollment_at_100_is_completed(self):
+        LessonProgress.objects.filter(enrollment=self.enrollment).update(is_completed=True)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons_count=3, progress=100)
+
+        enrollment, _output = self.reconcile()
+        self.assertEqual((enrollment.progress, enrollment.status), (100, Enrollment.Status.COMPLETED))
+
+    def test_completed_enrollment_keeps_100(self):
+        complete_lesson(Enrollment.objects.get(pk=self.enrollment.pk), self.lessons[0])
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(status=Enrollment.Status.COMPLETED, progress=40)
+
+        enrollment, _output = self.reconcile()
+        self.assertEqual(
+            (enrollment.completed_lessons_count, enrollment.progress, enrollment.status),
+            (1, 100, Enrollment.Status.COMPLETED)
+        )
+
+
+class LessonCompleteViewTests(CourseTestCase):
+    """Conclusão de aula pela view: objetos carregados uma única vez por requisição."""
+    lesson_count = 2
+    enroll = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        seed_lesson_progress([cls.enrollment])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+
+    def complete_url(self, lesson):
+        return reverse('courses:student:lesson_complete', kwargs={
+            'course_id': self.course.pk, 'lesson_id': lesson.pk
+        })
+
+    def test_complete_lesson_queries(self):
+        # Aquece o cache das aulas publicadas do curso
+        self.client.post(self.complete_url(self.lessons[1]))
+
+        # Sessão e usuário, aula (com curso e professor), matrícula, registro de
+        # progresso e a transação com os dois UPDATEs de LessonProgress.complete()
+        with self.assertNumQueries(9):
+            response = self.client.post(self.complete_url(self.lessons[0]))
+        self.assertEqual(response.status_code, 302)
+
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertEqual((enrollment.progress, enrollment.status), (100, Enrollment.Status.COMPLETED))
+        self.assertEqual(enrollment.get_completed_lesson_ids(self.lessons), {lesson.pk for lesson in self.lessons})
+
+    def test_async_complete_loads_enrollment_once(self):
+        url = reverse('courses:student:async_lesson_complete', kwargs={
+            'course_id': self.course.pk, 'lesson_id': self.lessons[0].pk
+        })
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 302)
+
+        # A matrícula verificada pelo mixin é a mesma usada na conclusão
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "courses_enrollment"' in query['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_lessons_count, 1)
+
+
+class QueryPlanTests(TestCase):
+    """Planos das consultas quentes sobre um conjunto de dados sintético."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_load_data(LoadDataSpec(
+            professors=2, courses_per_professor=5, lessons_per_course=3,
+            students=20, enrollments_per_student=3
+        ))
+
+    def test_hot_queries_use_indexes(self):
+        prepare_planner()
+        results = explain_hot_queries(hot_query_sample())
+
+        self.assertEqual(set(results), set(HOT_QUERIES))
+        scans = {name: tables for name, (plan, tables) in results.items() if tables}
+        self.assertEqual(scans, {})
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_catalog_queries_match_the_view(self):
+        sample = hot_query_sample()
+        term = sample['course'].title.split()[0]
+
+        # Mesmos cursos, na mesma ordem, que CourseListView exibe (com a busca indexada)
+        for name, params in (('catalog_first_page', {}), ('catalog_search', {'query': term})):
+            response = self.client.get(reverse('courses:student:course_list'), params)
+            self.assertTrue(response.context['courses'])
+            self.assertEqual(
+                list(HOT_QUERIES[name](sample))[:len(response.context['courses'])],
+                list(response.context['courses'])
+            )
+        self.assertIn(sample['course'], HOT_QUERIES['catalog_search'](sample))
+
+
+class CourseSearchTests(CourseTestCase):
+    """Busca indexada do catálogo: acentos, relevância e manutenção do índice."""
+    lesson_count = 0
+
+    def create(self, title, description='', **kwargs):
+        return Course.objects.create(
+            professor=self.professor, title=title, description=description, price=0, **kwargs
+        )
+
+    def search(self, query):
+        return [course.title for course in get_search_backend().search(Course.objects.all(), query)]
+
+    def test_fold_accents(self):
+        self.assertEqual(fold_accents('Introdução à Música'), 'introducao a musica')
+        self.assertEqual(query_terms('  Violão, "ritmo" OR -jazz*'), ['violao', 'ritmo', 'or', 'jazz'])
+
+    def test_search_ignores_accents_and_case(self):
+        self.create('Introdução à Harmonia')
+        for query in ('introducao', 'INTRODUÇÃO', 'harmôni'):
+            self.assertEqual(self.search(query), ['Introdução à Harmonia'])
+        self.assertEqual(self.search('violao'), ['Violão'])
+
+    def test_title_matches_rank_first(self):
+        # Título, depois resumo, depois descrição
+        self.create('Canto', description='Bateria e canto')
+        self.create('Piano', short_description='Bateria e piano')
+        self.create('Bateria', description='Ritmos básicos')
+        self.assertEqual(self.search('bateria'), ['Bateria', 'Piano', 'Canto'])
+
+    def test_search_syntax_is_neutralized(self):
+        self.assertEqual(self.search('"violão" OR NEAR(x'), [])
+        self.assertEqual(self.search('***'), self.search(''))
+
+    def test_index_follows_save_and_delete(self):
+        course = self.create('Flauta doce')
+        self.assertEqual(self.search('flauta'), ['Flauta doce'])
+
+        course.title = 'Flautim'
+        course.save()
+        self.assertEqual(self.search('doce'), [])
+        self.assertEqual(self.search('flautim'), ['Flautim'])
+
+        course.delete()
+        self.assertEqual(self.search('flautim'), [])
+        self.assertEqual(get_search_backend().rebuild(), 1)
+        self.assertEqual(self.search('violao'), ['Violão'])
+
+    def test_icontains_backend_is_accent_sensitive(self):
+        backend = IcontainsSearchBackend()
+        self.assertEqual(list(backend.search(Course.objects.all(), 'Viol')), [self.course])
+        self.assertEqual(list(backend.search(Course.objects.all(), 'violao')), [])
+
+
+class LessonOrderingTests(CourseTestCase):
+    """Reordenação de aulas com ordem espaçada."""
+    lesson_count = 0
+
+    def create_lessons(self, orders):
+        return [
+            Lesson.objects.create(course=self.course, title=f'Aula {index}', order=order)
+            for index, order in enumerate(orders)
+        ]
+
+    def sequence(self):
+        return list(Lesson.objects.filter(course=self.course).order_by('order').values_list('pk', flat=True))
+
+    def test_plan_orders_moves_only_the_misplaced_lessons(self):
+        # A última aula vai para o início: só ela muda, abaixo da primeira
+        changes = plan_orders([(4, 4096), (1, 1024), (2, 2048), (3, 3072)])
+        self.assertEqual(list(changes), [4])
+        self.assertLess(changes[4], 1024)
+
+        # A primeira vai para o fim: valor acima de todos os atuais
+        self.assertEqual(plan_orders([(2, 2048), (3, 3072), (1, 1024)]), {1: 4096})
+        self.assertEqual(plan_orders([(1, 1024), (2, 2048)]), {})
+
+    def test_plan_orders_fills_gaps_without_collisions(self):
+        current = [(1, 10), (3, 30), (4, 40), (2, 20), (5, 50)]
+        changes = plan_orders(current)
+        orders = [changes.get(lesson_id, order) for lesson_id, order in current]
+        self.assertEqual(orders, sorted(orders))
+        self.assertEqual(len(set(orders)), len(orders))
+        self.assertFalse(set(changes.values()) & {order for _lesson_id, order in current})
+
+        # Sem inteiro livre entre as vizinhas
+        self.assertIsNone(plan_orders([(1, 1), (3, 3), (2, 2)]))
+
+    def test_reorder_lessons(self):
+        lessons = self.create_lessons([ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP, 4 * ORDER_GAP])
+        new_order = [lessons[3].pk, lessons[0].pk, lessons[1].pk, lessons[2].pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reorder_lessons(self.course, new_order), 1)
+        self.assertEqual(self.sequence(), new_order)
+        self.assertEqual(next_order(self.course), 4 * ORDER_GAP)
+
+    def test_reorder_lessons_renumbers_when_out_of_space(self):
+        lessons = self.create_lessons([1, 2, 3])
+        new_order = [lessons[0].pk, lessons[2].pk, lessons[1].pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reorder_lessons(self.course, new_order), 3)
+        self.assertEqual(self.sequence(), new_order)
+        self.assertEqual(
+            list(Lesson.objects.filter(course=self.course).order_by('order').values_list('order', flat=True)),
+            [ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP]
+        )
+
+    def test_move_lesson(self):
+        first, second, third = self.create_lessons([ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            move_lesson(self.course, third.pk, before=first.pk)
+            self.assertEqual(self.sequence(), [third.pk, first.pk, second.pk])
+            move_lesson(self.course, third.pk, after=second.pk)
+            self.assertEqual(self.sequence(), [first.pk, second.pk, third.pk])
+            move_lesson(self.course, first.pk)
+            self.assertEqual(self.sequence(), [second.pk, third.pk, first.pk])
+
+    def test_invalid_order_is_rejected(self):
+        first, second = self.create_lessons([ORDER_GAP, 2 * ORDER_GAP])
+        for lesson_ids in ([first.pk], [first.pk, first.pk], [first.pk, second.pk, 999]):
+            with self.assertRaises(ReorderError):
+                reorder_lessons(self.course, lesson_ids)
+        with self.assertRaises(ReorderError):
+            move_lesson(self.course, first.pk, before=999)
+        self.assertEqual(self.sequence(), [first.pk, second.pk])
+
+
+class CacheHeartbeatBufferTests(TestCase):
+    """Fila de heartbeats no cache compartilhado."""
+
+    def setUp(self):
+        cache.clear()
+        self.buffer = CacheHeartbeatBuffer(100)
+
+    def test_drain_returns_events_in_order(self):
+        for index in range(3):
+            self.assertTrue(self.buffer.append(index))
+        self.assertEqual(self.buffer.drain(), ([0, 1, 2], 0))
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_slot_not_yet_written_is_kept(self):
+        self.buffer.append('antes')
+        # Outro processo reservou o número, mas ainda não gravou o evento
+        cache.incr(QUEUE_HEAD_KEY)
+        self.buffer.append('depois')
+
+        self.assertEqual(self.buffer.drain(), (['antes'], 0))
+        self.assertEqual(self.buffer.pending(), 2)
+
+        cache.set(QUEUE_EVENT_KEY.format(index=2), 'atrasado')
+        self.assertEqual(self.buffer.drain(), (['atrasado', 'depois'], 0))
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_missing_slot_is_lost_after_grace(self):
+        cache.add(QUEUE_HEAD_KEY, 0, None)
+        cache.incr(QUEUE_HEAD_KEY)
+        self.buffer.append('depois')
+
+        with override_settings(HEARTBEAT_QUEUE_GRACE=5):
+            self.assertEqual(self.buffer.drain(), ([], 0))
+        with override_settings(HEARTBEAT_QUEUE_GRACE=0):
+            self.assertEqual(self.buffer.drain(), (['depois'], 1))
+        self.assertEqual(self.buffer.pending(), 0)
+
+
+@override_settings(
+    SQL_INSTRUMENTATION=True, SQL_BUDGET_STRICT=True, SQL_REPEATED_QUERY_THRESHOLD=1
+)
+class StudentDashboardTests(CourseTestCase):
+    """O dashboard do aluno não repete consultas por matrícula (professor do curso)."""
+    enroll = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(3):
+            professor = User.objects.create_user(
+                email=f'professor{index}@example.com', password='x', user_type='PROFESSOR'
+            )
+            course = Course.objects.create(
+                professor=professor, title=f'Curso {index}', price=0, status=Course.Status.PUBLISHED
+            )
+            enroll_student(cls.student, course)
+
+    def test_dashboard_within_budget(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('courses:student:dashboard'))
+        self.assertContains(response, 'professor2@example.com')
+        self.assertLessEqual(int(response['X-SQL-Queries']), 8)
+
+
+class CohortEnrollmentTests(CourseTestCase):
+    """Matrícula de turmas (enroll_cohort) e criação em lote do progresso das aulas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Lesson.objects.create(course=cls.course, title='Rascunho', order=10, status=Lesson.Status.DRAFT)
+        cls.students = [
+            User.objects.create_user(email=f'aluno{index}@example.com', password='x', user_type='STUDENT')
+            for index in range(6)
+        ]
+
+    def emails(self, count):
+        return [student.email for student in self.students[:count]]
+
+    def test_seed_lesson_progress(self):
+        enrollments = [enroll_student(student, self.course)[0] for student in self.students[:2]]
+        self.assertEqual(seed_lesson_progress([]), 0)
+        self.assertEqual(seed_lesson_progress(enrollments), 6)
+        # Registros existentes são ignorados; aulas em rascunho não recebem progresso
+        self.assertEqual(seed_lesson_progress(enrollments), 6)
+        self.assertEqual(LessonProgress.objects.filter(enrollment__in=enrollments).count(), 6)
+        self.assertFalse(LessonProgress.objects.filter(lesson__status=Lesson.Status.DRAFT).exists())
+
+    def test_enroll_cohort(self):
+        result = enroll_cohort(self.course, [
+            *self.emails(3), ' aluno3@EXAMPLE.COM ', '', 'professor@example.com', 'ninguem@example.com'
+        ], chunk_size=2)
+
+        self.assertEqual((result.created, result.reactivated, result.existing), (4, 0, 0))
+        self.assertEqual(result.not_students, ['professor@example.com'])
+        self.assertEqual(result.not_found, ['ninguem@example.com'])
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 4)
+        self.assertEqual(LessonProgress.objects.filter(enrollment__course=self.course).count(), 12)
+
+    def test_rerun_is_idempotent(self):
+        enroll_cohort(self.course, self.emails(3))
+        result = enroll_cohort(self.course, self.emails(3))
+        self.assertEqual((result.created, result.reactivated, result.existing), (0, 0, 3))
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(LessonProgress.objects.filter(enrollment__course=self.course).count(), 9)
+
+    def test_existing_and_cancelled_enrollments(self):
+        enrollment = enroll_student(self.students[0], self.course)[0]
+        enroll_student(self.students[1], self.course)
+        enrollment.status = Enrollment.Status.CANCELLED
+        enrollment.save()
+
+        result = enroll_cohort(self.course, self.emails(3))
+        self.assertEqual((result.created, result.reactivated, result.existing), (1, 1, 1))
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.status, Enrollment.Status.ACTIVE)
+
+    def test_queries_do_not_grow_with_the_cohort(self):
+        with CaptureQueriesContext(connection) as small:
+            enroll_cohort(self.course, self.emails(2))
+        Enrollment.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            enroll_cohort(self.course, self.emails(6))
+        self.assertEqual(len(large), len(small))
+
+    def test_enrolled_course_cache_is_invalidated(self):
+        student = self.students[0]
+        self.assertEqual(get_enrolled_course_ids(student), frozenset())
+        enroll_cohort(self.course, [student.email])
+        self.assertEqual(get_enrolled_course_ids(student), {self.course.pk})
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'turma.csv'
+            path.write_text('nome,email\nA,aluno0@example.com\nB,aluno1@example.com\nC,ninguem@example.com\n')
+            stdout = StringIO()
+            call_command('enroll_cohort', str(self.course.pk), str(path), stdout=stdout)
+            self.assertIn('2 matrícula(s) criada(s)', stdout.getvalue())
+            self.assertIn('Usuário não encontrado: ninguem@example.com', stdout.getvalue())
+
+            path = Path(directory) / 'turma.jsonl'
+            path.write_text('{"email": "aluno0@example.com"}\n\n{"email": "aluno2@example.com"}\n')
+            stdout = StringIO()
+            call_command('enroll_cohort', self.course.slug, str(path), stdout=stdout)
+            self.assertIn('1 matrícula(s) criada(s), 0 reativada(s), 1 já existente(s)', stdout.getvalue())
+
+            path.write_text('{"nome": "A"}\n')
+            with self.assertRaisesMessage(CommandError, 'Linha 1 inválida'):
+                call_command('enroll_cohort', self.course.slug, str(path), stdout=StringIO())
+
+
+class YoutubeVideoTests(CourseTestCase):
+    """Resolução do ID do YouTube na gravação da aula, e não a cada renderização."""
+    lesson_count = 1
+    enroll = True
+    video_id = 'dQw4w9WgXcQ'
+
+    def setUp(self):
+        super().setUp()
+        resolve_youtube_id.cache_clear()
+
+    def test_resolve_youtube_id(self):
+        urls = {
+            f'https://www.youtube.com/watch?v={self.video_id}': self.video_id,
+            f'https://m.youtube.com/watch?feature=share&v={self.video_id}&t=30': self.video_id,
+            f'https://youtu.be/{self.video_id}?t=30': self.video_id,
+            f'https://www.youtube.com/embed/{self.video_id}': self.video_id,
+            f'https://www.youtube-nocookie.com/embed/{self.video_id}': self.video_id,
+            f'https://youtube.com/shorts/{self.video_id}?feature=share': self.video_id,
+            f' {self.video_id} ': self.video_id,
+            'https://www.youtube.com/channel/UCabcdefghijk': None,
+            'https://www.youtube.com/watch?v=curto': None,
+            'https://youtu.be/': None,
+            'https://vimeo.com/123456789': None,
+            '': None,
+            None: None,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(resolve_youtube_id(url), expected)
+
+    def test_save_stores_the_id(self):
+        lesson = self.lessons[0]
+        lesson.video_url = f'https://youtu.be/{self.video_id}'
+        lesson.save()
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).youtube_id, self.video_id)
+
+        lesson.video_url = 'https://youtu.be/aaaaaaaaaaa'
+        lesson.save()
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).youtube_id, 'aaaaaaaaaaa')
+
+        lesson.video_url = 'https://vimeo.com/123456789'
+        lesson.save()
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).youtube_id, '')
+
+    def test_learn_page_uses_the_stored_id(self):
+        lesson = self.lessons[0]
+        lesson.video_url = f'https://www.youtube.com/watch?v={self.video_id}'
+        lesson.save()
+        seed_lesson_progress([self.enrollment])
+        self.client.force_login(self.student)
+
+        with mock.patch('courses.student_views.resolve_youtube_id') as resolve:
+            response = self.client.get(reverse('courses:student:course_learn', kwargs={'pk': self.course.pk}))
+        resolve.assert_not_called()
+        self.assertContains(response, f'https://www.youtube.com/embed/{self.video_id}?rel=0')
+
+    def test_filter_is_memoized(self):
+        url = f'https://www.youtube.com/watch?v={self.video_id}'
+        self.assertEqual(get_youtube_id(url), self.video_id)
+        self.assertEqual(get_youtube_id(url), self.video_id)
+        info = resolve_youtube_id.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_backfill_video_ids(self):
+        lesson = self.lessons[0]
+        other = Lesson.objects.create(
+            course=self.course, title='Vimeo', order=2, video_url='https://vimeo.com/123456789'
+        )
+        Lesson.objects.filter(pk=lesson.pk).update(video_url=f'https://youtu.be/{self.video_id}')
+
+        stdout = StringIO()
+        call_command('backfill_video_ids', batch_size=1, stdout=stdout)
+        self.assertIn('1 de 2 aula(s)', stdout.getvalue())
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).youtube_id, self.video_id)
+        self.assertEqual(Lesson.objects.get(pk=other.pk).youtube_id, '')
+
+
+class CourseCacheTests(CourseTestCase):
+    """Dados de curso em cache sob versões trocadas pelos sinais, e contadores de acertos."""
+
+    def setUp(self):
+        super().setUp()
+        reset_cache_stats()
+
+    def test_cached_course_data(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(get_published_course(self.course.pk), self.course)
+            self.assertEqual(get_published_lessons(self.course.pk), self.lessons)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_published_course(self.course.pk).professor, self.professor)
+            self.assertEqual(get_published_lessons(self.course.pk), self.lessons)
+        self.assertIsNone(get_published_course(0))
+
+    def test_course_and_lesson_changes_bump_the_version(self):
+        get_published_lessons(self.course.pk)
+        version = get_course_version(self.course.pk)
+
+        lesson = self.lessons[0]
+        lesson.title = 'Nova aula'
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        self.assertGreater(get_course_version(self.course.pk), version)
+        self.assertEqual(get_published_lessons(self.course.pk)[0].title, 'Nova aula')
+
+        version = get_course_version(self.course.pk)
+        self.course.status = Course.Status.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.save()
+        self.assertGreater(get_course_version(self.course.pk), version)
+        self.assertIsNone(get_published_course(self.course.pk))
+
+    def test_hit_and_miss_counters(self):
+        get_published_course(self.course.pk)
+        get_published_course(self.course.pk)
+        get_published_course(self.course.pk)
+        self.assertEqual(get_cache_stats(), {'hits': 2, 'misses': 1, 'hit_ratio': 2 / 3})
+
+        stdout = StringIO()
+        call_command('cache_stats', reset=True, stdout=stdout)
+        self.assertIn('Taxa de acerto: 66.7%', stdout.getvalue())
+        self.assertEqual(get_cache_stats()['hits'], 0)
+
+    def test_counters_are_flushed_periodically(self):
+        hits = STATS_KEY.format(name='hits')
+        get_published_course(self.course.pk)
+        self.assertEqual(get_cache_stats()['misses'], 1)
+        with self.settings(COURSE_CACHE_STATS_FLUSH_INTERVAL=60):
+            get_published_course(self.course.pk)
+            get_published_course(self.course.pk)
+            # Os acertos ficam no processo até o próximo envio
+            self.assertIsNone(cache.get(hits))
+        with self.settings(COURSE_CACHE_STATS_FLUSH_INTERVAL=0):
+            get_published_course(self.course.pk)
+            self.assertEqual(cache.get(hits), 3)
+
+
+class EnrolledCourseIdsTests(CourseTestCase):
+    """Conjunto em cache dos cursos com matrícula ativa de cada aluno."""
+    enroll = True
+
+    def test_anonymous_users_skip_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_enrolled_course_ids(AnonymousUser()), frozenset())
+
+    def test_cached_as_packed_integers(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_enrolled_course_ids(self.student), {self.course.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_enrolled_course_ids(self.student), {self.course.pk})
+        self.assertIsInstance(cache.get(ENROLLED_COURSES_KEY.format(user_id=self.student.pk)), bytes)
+
+    def test_invalidated_by_enrollment_changes(self):
+        other = Course.objects.create(
+            professor=self.professor, title='Piano', price=0, status=Course.Status.PUBLISHED
+        )
+        get_enrolled_course_ids(self.student)
+        enrollment = enroll_student(self.student, other)[0]
+        self.assertEqual(get_enrolled_course_ids(self.student), {self.course.pk, other.pk})
+
+        enrollment.status = Enrollment.Status.CANCELLED
+        enrollment.save(update_fields=['status'])
+        self.assertEqual(get_enrolled_course_ids(self.student), {self.course.pk})
+
+        self.enrollment.delete()
+        self.assertEqual(get_enrolled_course_ids(self.student), frozenset())
+
+    def test_catalog_marks_enrollment_from_the_cached_set(self):
+        Course.objects.create(professor=self.professor, title='Piano', price=0, status=Course.Status.PUBLISHED)
+        self.client.force_login(self.student)
+        url = reverse('courses:student:course_list')
+        response = self.client.get(url)
+        enrolled = {course.title: course.is_enrolled for course in response.context['object_list']}
+        self.assertEqual(enrolled, {'Violão': True, 'Piano': False})
+
+        # O conjunto já está em cache: a lista de cursos não consulta matrículas
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('courses_enrollment' in query['sql'] for query in queries))
+
+
+class DashboardStatsTests(CourseTestCase):
+    """Totais dos dashboards em uma consulta por tabela, iguais às contagens por status."""
+    enroll = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Course.objects.create(professor=cls.professor, title='Rascunho', price=0)
+        archived = Course.objects.create(
+            professor=cls.professor, title='Arquivado', price=0, status=Course.Status.ARCHIVED
+        )
+        completed = enroll_student(cls.student, archived)[0]
+        completed.status = Enrollment.Status.COMPLETED
+        completed.save()
+        other = User.objects.create_user(email='outro@example.com', password='x', user_type='STUDENT')
+        cancelled = enroll_student(other, cls.course)[0]
+        cancelled.status = Enrollment.Status.CANCELLED
+        cancelled.save()
+
+    def test_professor_course_stats(self):
+        courses = Course.objects.filter(professor=self.professor)
+        with self.assertNumQueries(1):
+            stats = professor_course_stats(self.professor)
+        self.assertEqual(stats, {
+            'total_courses': courses.count(),
+            'published_courses': courses.filter(status=Course.Status.PUBLISHED).count(),
+            'draft_courses': courses.filter(status=Course.Status.DRAFT).count(),
+        })
+        self.assertEqual(stats, {'total_courses': 3, 'published_courses': 1, 'draft_courses': 1})
+
+    def test_student_enrollment_stats(self):
+        enrollments = Enrollment.objects.filter(student=self.student)
+        with self.assertNumQueries(1):
+            stats = student_enrollment_stats(self.student)
+        self.assertEqual(stats, {
+            'total_enrollments': enrollments.filter(status=Enrollment.Status.ACTIVE).count(),
+            'completed_courses': enrollments.filter(status=Enrollment.Status.COMPLETED).count(),
+        })
+        self.assertEqual(stats, {'total_enrollments': 1, 'completed_courses': 1})
+
+    def test_course_platform_stats(self):
+        with self.assertNumQueries(2):
+            stats = course_platform_stats()
+        self.assertEqual(stats, {
+            'total_courses': 3,
+            'published_courses': 1,
+            'draft_courses': 1,
+            'total_enrollments': Enrollment.objects.count(),
+            'active_enrollments': Enrollment.objects.filter(status=Enrollment.Status.ACTIVE).count(),
+            'completed_enrollments': Enrollment.objects.filter(status=Enrollment.Status.COMPLETED).count(),
+        })
+        self.assertEqual(stats['total_enrollments'], 3)
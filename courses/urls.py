@@ -1,6 +1,7 @@
 from django.urls import path, include
 from . import views
 from . import student_views
+from . import async_views
 
 app_name = 'courses'
 
@@ -14,6 +15,14 @@ student_patterns = [
     path('course/<int:pk>/cancel/', student_views.EnrollmentCancelView.as_view(), name='enrollment_cancel'),
     path('course/<int:course_id>/lesson/<int:lesson_id>/complete/', 
          student_views.LessonCompleteView.as_view(), name='lesson_complete'),
+    path('course/<int:course_id>/lesson/<int:lesson_id>/heartbeat/',
+         student_views.LessonHeartbeatView.as_view(), name='lesson_heartbeat'),
+    
+    # Versões assíncronas dos caminhos mais acessados, para implantação ASGI
+    path('async/catalog/', async_views.AsyncCourseListView.as_view(), name='async_course_list'),
+    path('async/course/<int:pk>/learn/', async_views.AsyncCourseLearnView.as_view(), name='async_course_learn'),
+    path('async/course/<int:course_id>/lesson/<int:lesson_id>/complete/',
+         async_views.AsyncLessonCompleteView.as_view(), name='async_lesson_complete'),
 ]
 
 urlpatterns = [
@@ -32,6 +41,7 @@ urlpatterns = [
     path('<int:course_id>/lessons/create/', views.LessonCreateView.as_view(), name='lesson_create'),
     path('lessons/<int:pk>/update/', views.LessonUpdateView.as_view(), name='lesson_update'),
     path('lessons/<int:pk>/delete/', views.LessonDeleteView.as_view(), name='lesson_delete'),
+    path('<int:course_id>/lessons/reorder/', views.LessonReorderView.as_view(), name='lesson_reorder'),
     
     # Alunos - Incluir submódulo de URLs
     path('student/', include((student_patterns, 'student'))),
@@ -0,0 +1,51 @@
+"""
+Resolução de URLs de vídeo para o ID usado no player incorporado.
+
+Compartilhado por Lesson.save(), pela view de aprendizado e pelo filtro
+`get_youtube_id`, para que o parsing da URL aconteça uma única vez.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
+
+# Pattern para URLs completas do YouTube (watch, embed, v/, shorts/, live/, youtu.be, youtube-nocookie)
+YOUTUBE_REGEX = re.compile(
+    r'(https?://)?(www\.|m\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/'
+    r'(watch\?v=|embed/|v/|shorts/|live/|.+\?v=)?([\w-]{11})(?![\w-])'
+)
+
+# ID informado diretamente, sem URL
+YOUTUBE_ID_REGEX = re.compile(r'[\w-]{11}')
+
+
+@lru_cache(maxsize=4096)
+def resolve_youtube_id(url):
+    """
+    Extrai o ID de um vídeo do YouTube a partir da URL (ou do próprio ID).
+    Suporta formatos de URL completos e encurtados. Retorna None se a URL
+    não for do YouTube.
+    """
+    if not url:
+        return None
+    url = url.strip()
+
+    if YOUTUBE_ID_REGEX.fullmatch(url):
+        return url
+
+    youtube_match = YOUTUBE_REGEX.match(url)
+    if youtube_match:
+        return youtube_match.group(6)
+
+    # Se não der match, tenta com urlparse para URLs do tipo youtu.be
+    parsed_url = urlparse(url)
+    if 'youtu.be' in parsed_url.netloc:
+        video_id = parsed_url.path.lstrip('/').split('/')[0]
+        return video_id if YOUTUBE_ID_REGEX.fullmatch(video_id) else None
+
+    # Para URLs do formato youtube.com/watch?v=ID
+    if 'youtube.com' in parsed_url.netloc:
+        query = parse_qs(parsed_url.query)
+        if 'v' in query and YOUTUBE_ID_REGEX.fullmatch(query['v'][0]):
+            return query['v'][0]
+
+    return None
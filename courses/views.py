@@ -1,3 +1,5 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, View
@@ -6,8 +8,16 @@ from django.contrib import messages
 from django.db.models import Count
 from django.http import HttpResponseRedirect, JsonResponse
 
+from core.conditional import ConditionalGetMixin
+from core.pagination import KeysetPaginationMixin
+from core.routers import ReadReplicaMixin
+
 from .models import Course, Lesson
+from .conditional import course_validator
+from .ordering import ReorderError, move_lesson, reorder_lessons
+from .resolvers import CourseResolverMixin
 from .forms import CourseForm, LessonForm, CoursePublishForm
+from .stats import professor_course_stats
 
 
 class ProfessorRequiredMixin(UserPassesTestMixin):
@@ -18,24 +28,37 @@ class ProfessorRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_authenticated and self.request.user.is_professor
 
 
-class ProfessorCourseMixin(UserPassesTestMixin):
+class ProfessorCourseMixin(CourseResolverMixin, UserPassesTestMixin):
     """
     Mixin para verificar se o curso pertence ao professor logado.
+    
+    O curso (ou a aula, nas views de aulas) é carregado uma única vez pelo
+    resolvedor da requisição e reaproveitado pela view e pelo formulário.
     """
     def test_func(self):
         if not self.request.user.is_authenticated or not self.request.user.is_professor:
             return False
             
-        # Obter o curso da URL
-        course_id = self.kwargs.get('course_id') or self.kwargs.get('pk')
-        if course_id:
-            course = get_object_or_404(Course, pk=course_id)
-            return course.professor == self.request.user
+        # Curso da URL (ou da aula), com 404 se não existir
+        if self.course_resolver.course_id is not None or self.lesson_url_kwarg in self.kwargs:
+            return self.get_course().professor_id == self.request.user.pk
             
         return True  # Para CreateView, que não tem curso ainda
 
 
-class DashboardView(LoginRequiredMixin, ProfessorRequiredMixin, ListView):
+class ProfessorLessonMixin(ProfessorCourseMixin):
+    """
+    Mixin para views de uma aula existente (aula em `pk`): verifica o curso da
+    aula e usa a aula já carregada como objeto da view.
+    """
+    course_url_kwargs = ()
+    lesson_url_kwarg = 'pk'
+    
+    def get_object(self, queryset=None):
+        return self.get_lesson()
+
+
+class DashboardView(LoginRequiredMixin, ProfessorRequiredMixin, ReadReplicaMixin, ListView):
     """
     Dashboard do professor mostrando seus cursos e estatísticas gerais.
     """
@@ -51,32 +74,35 @@ class DashboardView(LoginRequiredMixin, ProfessorRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Estatísticas básicas
-        courses = self.get_queryset()
-        context['total_courses'] = courses.count()
-        context['published_courses'] = courses.filter(status=Course.Status.PUBLISHED).count()
-        context['draft_courses'] = courses.filter(status=Course.Status.DRAFT).count()
+        # Estatísticas básicas em uma única consulta
+        context.update(professor_course_stats(self.request.user))
         
-        # Cursos recentemente editados
-        context['recent_courses'] = courses.order_by('-updated_at')[:5]
+        # Cursos recentemente editados, a partir da lista já carregada
+        context['recent_courses'] = sorted(
+            self.object_list, key=lambda course: course.updated_at, reverse=True
+        )[:5]
         
         return context
 
 
-class CourseListView(LoginRequiredMixin, ProfessorRequiredMixin, ListView):
+class CourseListView(LoginRequiredMixin, ProfessorRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Lista todos os cursos do professor logado.
     """
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
+    paginate_by = 20
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        # Filtra os cursos do professor logado
-        return Course.objects.filter(professor=self.request.user).order_by('-created_at')
+        # Filtra os cursos do professor logado, com a contagem de aulas na mesma consulta
+        return Course.objects.filter(professor=self.request.user).annotate(
+            total_lessons=Count('lessons')
+        ).order_by('-created_at')
 
 
-class CourseDetailView(LoginRequiredMixin, ProfessorCourseMixin, DetailView):
+class CourseDetailView(LoginRequiredMixin, ProfessorCourseMixin, ConditionalGetMixin, DetailView):
     """
     Exibe os detalhes de um curso específico, incluindo suas aulas.
     """
@@ -84,6 +110,13 @@ class CourseDetailView(LoginRequiredMixin, ProfessorCourseMixin, DetailView):
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
     
+    def get_object(self, queryset=None):
+        return self.get_course()
+    
+    def get_validator(self):
+        # Inclui rascunhos: o professor vê todas as aulas do curso
+        return course_validator(self.kwargs['pk'], published_only=False)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Adiciona as aulas do curso ao contexto
@@ -119,6 +152,9 @@ class CourseUpdateView(LoginRequiredMixin, ProfessorCourseMixin, UpdateView):
     form_class = CourseForm
     template_name = 'courses/course_form.html'
     
+    def get_object(self, queryset=None):
+        return self.get_course()
+    
     def get_success_url(self):
         return reverse('courses:course_detail', kwargs={'pk': self.object.pk})
     
@@ -135,6 +171,9 @@ class CourseDeleteView(LoginRequiredMixin, ProfessorCourseMixin, DeleteView):
     template_name = 'courses/course_confirm_delete.html'
     success_url = reverse_lazy('courses:course_list')
     
+    def get_object(self, queryset=None):
+        return self.get_course()
+    
     def delete(self, request, *args, **kwargs):
         messages.success(self.request, 'Curso excluído com sucesso!')
         return super().delete(request, *args, **kwargs)
@@ -149,11 +188,12 @@ class CoursePublishView(LoginRequiredMixin, ProfessorCourseMixin, FormView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['course'] = get_object_or_404(Course, pk=self.kwargs['pk'])
+        context['course'] = self.get_course()
+        context['total_lessons'] = context['course'].get_total_lessons()
         return context
     
     def form_valid(self, form):
-        course = get_object_or_404(Course, pk=self.kwargs['pk'])
+        course = self.get_course()
         course.status = Course.Status.PUBLISHED
         course.save()
         messages.success(self.request, f'O curso "{course.title}" foi publicado com sucesso!')
@@ -175,12 +215,12 @@ class LessonCreateView(LoginRequiredMixin, ProfessorCourseMixin, CreateView):
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         # Passa o curso atual para o formulário
-        kwargs['course'] = get_object_or_404(Course, pk=self.kwargs['course_id'])
+        kwargs['course'] = self.get_course()
         return kwargs
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['course'] = get_object_or_404(Course, pk=self.kwargs['course_id'])
+        context['course'] = self.get_course()
         return context
     
     def get_success_url(self):
@@ -191,7 +231,7 @@ class LessonCreateView(LoginRequiredMixin, ProfessorCourseMixin, CreateView):
         return super().form_valid(form)
 
 
-class LessonUpdateView(LoginRequiredMixin, ProfessorCourseMixin, UpdateView):
+class LessonUpdateView(LoginRequiredMixin, ProfessorLessonMixin, UpdateView):
     """
     Atualiza uma aula existente.
     """
@@ -212,7 +252,7 @@ class LessonUpdateView(LoginRequiredMixin, ProfessorCourseMixin, UpdateView):
         return super().form_valid(form)
 
 
-class LessonDeleteView(LoginRequiredMixin, ProfessorCourseMixin, DeleteView):
+class LessonDeleteView(LoginRequiredMixin, ProfessorLessonMixin, DeleteView):
     """
     Exclui uma aula.
     """
@@ -230,3 +270,29 @@ class LessonDeleteView(LoginRequiredMixin, ProfessorCourseMixin, DeleteView):
     def delete(self, request, *args, **kwargs):
         messages.success(self.request, 'Aula excluída com sucesso!')
         return super().delete(request, *args, **kwargs)
+
+
+class LessonReorderView(LoginRequiredMixin, ProfessorCourseMixin, View):
+    """
+    Reordena as aulas de um curso em uma transação. Recebe JSON com a ordem
+    completa (`{"lessons": [3, 1, 2]}`) ou um movimento
+    (`{"move": {"lesson": 3, "before": 1}}`, ou `"after"`) e retorna a nova
+    ordem das aulas.
+    """
+    http_method_names = ['post']
+    
+    def post(self, request, *args, **kwargs):
+        course = self.get_course()
+        try:
+            data = json.loads(request.body or b'{}')
+            if 'lessons' in data:
+                updated = reorder_lessons(course, data['lessons'])
+            else:
+                move = data['move']
+                updated = move_lesson(course, move['lesson'], before=move.get('before'), after=move.get('after'))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            message = str(error) if isinstance(error, ReorderError) else 'Requisição de reordenação inválida.'
+            return JsonResponse({'error': message}, status=400)
+        
+        lessons = Lesson.objects.filter(course=course).order_by('order').values('id', 'order')
+        return JsonResponse({'updated': updated, 'lessons': list(lessons)})
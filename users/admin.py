@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PlatformStatsSnapshot
+
+
+@admin.register(PlatformStatsSnapshot)
+class PlatformStatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('refreshed_at', 'total_users', 'total_courses', 'total_enrollments')
+    readonly_fields = [field.name for field in PlatformStatsSnapshot._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
@@ -1,8 +1,11 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm, UserChangeForm
+from django.template import loader
 from django.utils.translation import gettext_lazy as _
 
+from core.taskqueue import enqueue
+
 User = get_user_model()
 
 
@@ -40,3 +43,21 @@ class CustomUserChangeForm(UserChangeForm):
         # Tornar alguns campos obrigatórios
         self.fields['first_name'].required = True
         self.fields['last_name'].required = True
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """
+    Formulário de redefinição de senha que apenas renderiza o email na
+    requisição; o envio é feito em segundo plano (tarefa core.tasks.send_email).
+    """
+    def send_mail(self, subject_template_name, email_template_name, context,
+                  from_email, to_email, html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        # O assunto do email não pode conter quebras de linha
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_message = None
+        if html_email_template_name is not None:
+            html_message = loader.render_to_string(html_email_template_name, context)
+        
+        enqueue('core.tasks.send_email', args=[subject, body, from_email, [to_email], html_message])
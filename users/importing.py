@@ -0,0 +1,198 @@
+"""
+Importação em lote de usuários (comando import_users).
+
+As linhas chegam de um iterador (o arquivo é lido linha a linha) e são
+processadas em lotes de tamanho fixo, de modo que a memória não depende do
+tamanho do arquivo. Para cada lote:
+
+1. as linhas são validadas (email, tipo de usuário, nomes) e os emails já
+   cadastrados ou repetidos no arquivo são ignorados, com uma consulta;
+2. as senhas são convertidas em hash em um pool de processos (o PBKDF2 é
+   limitado pela CPU) ou, sem senha no arquivo ou com `hash_passwords=False`,
+   as contas recebem uma senha inutilizável até a redefinição;
+3. os usernames são alocados de uma vez (core.slugs.assign_unique_values) e
+   os usuários são inseridos com bulk_create em uma transação.
+
+Depois de cada lote gravado, `on_batch(result)` é chamado com o número da
+última linha processada, o que permite registrar um ponto de retomada.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from core.slugs import assign_unique_values
+
+# Mensagens de linhas inválidas guardadas no resultado (as demais só são contadas)
+MAX_REPORTED_ERRORS = 50
+
+# Tentativas de um lote quando outro processo cria os mesmos emails/usernames
+BATCH_ATTEMPTS = 3
+
+
+@dataclass
+class UserImportResult:
+    """Resumo de uma importação de usuários."""
+    created: int = 0
+    existing: int = 0
+    invalid: int = 0
+    last_row: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def processed(self):
+        return self.created + self.existing + self.invalid
+
+    @property
+    def throughput(self):
+        """Linhas processadas por segundo."""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'Linha {row_number}: {message}')
+
+
+def clean_row(data):
+    """
+    Valida uma linha do arquivo e retorna os campos do usuário. Levanta
+    ValidationError com a descrição do problema.
+    """
+    User = get_user_model()
+    if not isinstance(data, dict):
+        raise ValidationError('registro inválido')
+
+    email = User.objects.normalize_email((data.get('email') or '').strip())
+    if not email:
+        raise ValidationError('email não informado')
+    validate_email(email)
+
+    user_type = (data.get('user_type') or User.Types.STUDENT).strip().upper()
+    if user_type not in User.Types.values:
+        raise ValidationError(f'tipo de usuário desconhecido: {user_type}')
+
+    names = {}
+    for name in ('first_name', 'last_name'):
+        value = (data.get(name) or '').strip()
+        if len(value) > User._meta.get_field(name).max_length:
+            raise ValidationError(f'{name} muito longo')
+        names[name] = value
+
+    return {
+        'email': email,
+        'user_type': user_type,
+        'password': data.get('password') or None,
+        **names,
+    }
+
+
+def _setup_worker():
+    """Inicializa o Django nos processos do pool quando não herdado (spawn)."""
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def _hash_passwords(passwords, pool):
+    """Hashes das senhas (None = senha inutilizável), no pool se disponível."""
+    to_hash = [password for password in passwords if password]
+    if pool is not None and to_hash:
+        hashed = iter(pool.map(make_password, to_hash, chunksize=max(1, len(to_hash) // 32)))
+    else:
+        hashed = iter([make_password(password) for password in to_hash])
+    return [next(hashed) if password else make_password(None) for password in passwords]
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_batch(cleaned, hashed):
+    """Insere os usuários ainda não cadastrados; retorna (criados, existentes)."""
+    User = get_user_model()
+    with transaction.atomic():
+        existing = set(User.objects.filter(
+            email__in=[fields['email'] for fields in cleaned]
+        ).values_list('email', flat=True))
+
+        users = [
+            User(
+                email=fields['email'],
+                first_name=fields['first_name'],
+                last_name=fields['last_name'],
+                user_type=fields['user_type'],
+                password=password,
+            )
+            for fields, password in zip(cleaned, hashed)
+            if fields['email'] not in existing
+        ]
+        assign_unique_values(users, 'username', lambda user: User.username_base(user.email))
+        User.objects.bulk_create(users)
+    return len(users), len(existing)
+
+
+def import_users(rows, batch_size=1000, hash_passwords=True, workers=None, on_batch=None):
+    """
+    Importa os usuários de `rows`, um iterável de (número da linha, dados).
+    Emails já cadastrados são ignorados, o que torna a importação repetível.
+    """
+    result = UserImportResult()
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) if hash_passwords else None
+
+    try:
+        for batch in _batches(rows, batch_size):
+            cleaned, seen = [], set()
+            for row_number, data in batch:
+                try:
+                    fields = clean_row(data)
+                except ValidationError as error:
+                    result.add_error(row_number, '; '.join(error.messages))
+                    continue
+                if fields['email'] in seen:
+                    result.existing += 1
+                    continue
+                seen.add(fields['email'])
+                cleaned.append(fields)
+
+            passwords = [fields['password'] if hash_passwords else None for fields in cleaned]
+            hashed = _hash_passwords(passwords, pool)
+
+            for attempt in range(BATCH_ATTEMPTS):
+                try:
+                    created, existing = _insert_batch(cleaned, hashed)
+                    break
+                except IntegrityError:
+                    # Emails ou usernames criados por outro processo entre a
+                    # leitura e o INSERT: o lote é refeito com os dados atuais
+                    if attempt == BATCH_ATTEMPTS - 1:
+                        raise
+
+            result.created += created
+            result.existing += existing
+            result.last_row = batch[-1][0]
+            result.elapsed = time.perf_counter() - started
+            if on_batch:
+                on_batch(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,110 @@
+import csv
+import json
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import import_users
+
+
+def read_rows(path, skip=0):
+    """
+    Lê as linhas de um arquivo CSV (cabeçalho com `email` e, opcionalmente,
+    `first_name`, `last_name`, `user_type` e `password`) ou JSONL, uma a uma,
+    retornando (número da linha, dados). As `skip` primeiras são puladas.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if Path(path).suffix.lower() in ('.jsonl', '.ndjson'):
+            row_number = 0
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                row_number += 1
+                if row_number <= skip:
+                    continue
+                try:
+                    yield row_number, json.loads(line)
+                except ValueError:
+                    # Registrada como linha inválida pela validação
+                    yield row_number, None
+        else:
+            reader = csv.DictReader(handle)
+            if 'email' not in (reader.fieldnames or []):
+                raise CommandError('O arquivo CSV deve possuir uma coluna "email".')
+            for row_number, row in enumerate(reader, start=1):
+                if row_number > skip:
+                    yield row_number, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuários de um arquivo CSV ou JSONL em lotes, com hash das senhas em '
+        'paralelo e ponto de retomada em caso de falha'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .jsonl com os usuários')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Usuários inseridos por transação (padrão: 1000)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos para o hash das senhas (padrão: número de CPUs)')
+        parser.add_argument('--unusable-passwords', action='store_true',
+                            help='Ignora as senhas do arquivo: as contas exigem redefinição de senha')
+        parser.add_argument('--checkpoint',
+                            help='Arquivo do ponto de retomada (padrão: <arquivo>.checkpoint)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continua a partir do ponto de retomada de uma execução interrompida')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not Path(path).exists():
+            raise CommandError(f'Arquivo não encontrado: {path}')
+
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        skip = 0
+        if options['resume'] and Path(checkpoint).exists():
+            with open(checkpoint) as source:
+                skip = json.load(source)['last_row']
+            self.stdout.write(f'Retomando após a linha {skip}.')
+
+        def on_batch(result):
+            self.save_checkpoint(checkpoint, path, result.last_row)
+            self.stdout.write(
+                f'  linha {result.last_row}: {result.created} criado(s), {result.existing} existente(s), '
+                f'{result.invalid} inválido(s) ({result.throughput:.0f} linhas/s)'
+            )
+
+        try:
+            result = import_users(
+                read_rows(path, skip),
+                batch_size=options['batch_size'],
+                hash_passwords=not options['unusable_passwords'],
+                workers=options['workers'],
+                on_batch=on_batch,
+            )
+        except Exception:
+            if Path(checkpoint).exists():
+                self.stderr.write(f'Importação interrompida; execute novamente com --resume (ponto: {checkpoint}).')
+            raise
+
+        if Path(checkpoint).exists():
+            os.remove(checkpoint)
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(error))
+        if result.invalid > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'... e mais {result.invalid - len(result.errors)} linha(s) inválida(s)'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} usuário(s) criado(s), {result.existing} já existente(s), '
+            f'{result.invalid} linha(s) inválida(s) em {result.elapsed:.2f}s ({result.throughput:.0f} linhas/s)'
+        ))
+
+    def save_checkpoint(self, checkpoint, path, last_row):
+        """Grava o ponto de retomada de forma atômica (arquivo temporário + rename)."""
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as output:
+            json.dump({'path': str(path), 'last_row': last_row}, output)
+        os.replace(temporary, checkpoint)
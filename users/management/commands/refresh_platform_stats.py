@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.stats import refresh_platform_stats
+
+
+class Command(BaseCommand):
+    help = 'Atualiza o snapshot de estatísticas usado pelo dashboard administrativo'
+
+    def handle(self, *args, **options):
+        snapshot = refresh_platform_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Estatísticas atualizadas: {snapshot.total_users} usuário(s), '
+            f'{snapshot.total_courses} curso(s), {snapshot.total_enrollments} matrícula(s).'
+        ))
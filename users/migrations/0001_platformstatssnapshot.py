@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.PositiveIntegerField(default=0, verbose_name='usuários')),
+                ('total_admins', models.PositiveIntegerField(default=0, verbose_name='administradores')),
+                ('total_professors', models.PositiveIntegerField(default=0, verbose_name='professores')),
+                ('total_students', models.PositiveIntegerField(default=0, verbose_name='alunos')),
+                ('total_courses', models.PositiveIntegerField(default=0, verbose_name='cursos')),
+                ('published_courses', models.PositiveIntegerField(default=0, verbose_name='cursos publicados')),
+                ('draft_courses', models.PositiveIntegerField(default=0, verbose_name='cursos em rascunho')),
+                ('total_enrollments', models.PositiveIntegerField(default=0, verbose_name='matrículas')),
+                ('active_enrollments', models.PositiveIntegerField(default=0, verbose_name='matrículas ativas')),
+                ('completed_enrollments', models.PositiveIntegerField(default=0, verbose_name='matrículas concluídas')),
+                ('refreshed_at', models.DateTimeField(verbose_name='atualizado em')),
+            ],
+            options={
+                'verbose_name': 'estatísticas da plataforma',
+                'verbose_name_plural': 'estatísticas da plataforma',
+            },
+        ),
+    ]
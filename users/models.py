@@ -1,3 +1,35 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class PlatformStatsSnapshot(models.Model):
+    """
+    Totais da plataforma materializados para o dashboard administrativo.
+    Mantém um único registro, atualizado pelo comando refresh_platform_stats
+    (ver users.stats), para que o dashboard não precise agregar as tabelas de
+    usuários e matrículas a cada acesso.
+    """
+    total_users = models.PositiveIntegerField(_('usuários'), default=0)
+    total_admins = models.PositiveIntegerField(_('administradores'), default=0)
+    total_professors = models.PositiveIntegerField(_('professores'), default=0)
+    total_students = models.PositiveIntegerField(_('alunos'), default=0)
+    total_courses = models.PositiveIntegerField(_('cursos'), default=0)
+    published_courses = models.PositiveIntegerField(_('cursos publicados'), default=0)
+    draft_courses = models.PositiveIntegerField(_('cursos em rascunho'), default=0)
+    total_enrollments = models.PositiveIntegerField(_('matrículas'), default=0)
+    active_enrollments = models.PositiveIntegerField(_('matrículas ativas'), default=0)
+    completed_enrollments = models.PositiveIntegerField(_('matrículas concluídas'), default=0)
+    refreshed_at = models.DateTimeField(_('atualizado em'))
+    
+    class Meta:
+        verbose_name = _('estatísticas da plataforma')
+        verbose_name_plural = _('estatísticas da plataforma')
+    
+    def __str__(self):
+        return f'Estatísticas de {self.refreshed_at:%d/%m/%Y %H:%M}'
+    
+    def as_dict(self):
+        return {
+            field.name: getattr(self, field.name)
+            for field in self._meta.concrete_fields if field.name != 'id'
+        }
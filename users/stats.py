@@ -0,0 +1,64 @@
+"""
+Estatísticas do dashboard administrativo.
+
+Os totais são lidos do PlatformStatsSnapshot quando ele foi atualizado há
+menos de PLATFORM_STATS_MAX_AGE segundos; caso contrário (ou se a configuração
+for 0), são calculados na hora com agregações condicionais, uma consulta por
+tabela.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from courses.stats import course_platform_stats
+
+from .models import PlatformStatsSnapshot
+
+User = get_user_model()
+
+
+def user_type_stats():
+    """Totais de usuários por tipo em uma única consulta."""
+    return User.objects.aggregate(
+        total_users=Count('pk'),
+        total_admins=Count('pk', filter=Q(user_type=User.Types.ADMIN)),
+        total_professors=Count('pk', filter=Q(user_type=User.Types.PROFESSOR)),
+        total_students=Count('pk', filter=Q(user_type=User.Types.STUDENT)),
+    )
+
+
+def compute_platform_stats():
+    """Calcula todos os totais da plataforma diretamente no banco."""
+    stats = user_type_stats()
+    stats.update(course_platform_stats())
+    return stats
+
+
+def refresh_platform_stats():
+    """Recalcula os totais e grava o registro único de PlatformStatsSnapshot."""
+    stats = compute_platform_stats()
+    stats['refreshed_at'] = timezone.now()
+    snapshot, created = PlatformStatsSnapshot.objects.update_or_create(pk=1, defaults=stats)
+    return snapshot
+
+
+def get_platform_stats():
+    """
+    Retorna os totais da plataforma, com a chave `refreshed_at` indicando a data
+    do snapshot usado (None quando calculados na hora).
+    """
+    max_age = getattr(settings, 'PLATFORM_STATS_MAX_AGE', 0)
+    if max_age:
+        snapshot = PlatformStatsSnapshot.objects.filter(
+            pk=1,
+            refreshed_at__gte=timezone.now() - timedelta(seconds=max_age)
+        ).first()
+        if snapshot:
+            return snapshot.as_dict()
+
+    stats = compute_platform_stats()
+    stats['refreshed_at'] = None
+    return stats
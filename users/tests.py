@@ -1,3 +1,200 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import User
+from courses.models import Course, Enrollment
+
+from .importing import _insert_batch, import_users
+from .models import PlatformStatsSnapshot
+from .stats import compute_platform_stats, get_platform_stats, refresh_platform_stats, user_type_stats
+
+
+class PlatformStatsTests(TestCase):
+    """Totais do dashboard administrativo e o snapshot que os materializa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='x', user_type='ADMIN')
+        cls.professor = User.objects.create_user(email='professor@example.com', password='x', user_type='PROFESSOR')
+        students = [
+            User.objects.create_user(email=f'aluno{index}@example.com', password='x', user_type='STUDENT')
+            for index in range(3)
+        ]
+        course = Course.objects.create(
+            professor=cls.professor, title='Violão', price=0, status=Course.Status.PUBLISHED
+        )
+        Course.objects.create(professor=cls.professor, title='Rascunho', price=0)
+        for student, status in zip(students, Enrollment.Status.values):
+            Enrollment.objects.create(student=student, course=course, status=status)
+
+    def test_user_type_stats(self):
+        with self.assertNumQueries(1):
+            stats = user_type_stats()
+        self.assertEqual(stats, {
+            'total_users': User.objects.count(),
+            'total_admins': User.objects.filter(user_type=User.Types.ADMIN).count(),
+            'total_professors': User.objects.filter(user_type=User.Types.PROFESSOR).count(),
+            'total_students': User.objects.filter(user_type=User.Types.STUDENT).count(),
+        })
+        self.assertEqual(stats, {'total_users': 5, 'total_admins': 1, 'total_professors': 1, 'total_students': 3})
+
+    def test_compute_platform_stats(self):
+        with self.assertNumQueries(3):
+            stats = compute_platform_stats()
+        self.assertEqual(stats['total_courses'], 2)
+        self.assertEqual(stats['published_courses'], 1)
+        self.assertEqual(
+            (stats['total_enrollments'], stats['active_enrollments'], stats['completed_enrollments']),
+            (3, 1, 1)
+        )
+
+    def test_refresh_snapshot(self):
+        snapshot = refresh_platform_stats()
+        refresh_platform_stats()
+        self.assertEqual(PlatformStatsSnapshot.objects.count(), 1)
+
+        stats = snapshot.as_dict()
+        refreshed_at = stats.pop('refreshed_at')
+        self.assertEqual(stats, compute_platform_stats())
+        self.assertIsNotNone(refreshed_at)
+
+        stdout = StringIO()
+        call_command('refresh_platform_stats', stdout=stdout)
+        self.assertIn('5 usuário(s), 2 curso(s), 3 matrícula(s)', stdout.getvalue())
+
+    @override_settings(PLATFORM_STATS_MAX_AGE=60)
+    def test_recent_snapshot_is_used(self):
+        refresh_platform_stats()
+        User.objects.create_user(email='novo@example.com', password='x', user_type='STUDENT')
+
+        with self.assertNumQueries(1):
+            stats = get_platform_stats()
+        self.assertEqual(stats['total_users'], 5)
+        self.assertIsNotNone(stats['refreshed_at'])
+
+        # Um snapshot antigo é ignorado e os totais são calculados na hora
+        PlatformStatsSnapshot.objects.update(refreshed_at=timezone.now() - timedelta(seconds=61))
+        stats = get_platform_stats()
+        self.assertEqual(stats['total_users'], 6)
+        self.assertIsNone(stats['refreshed_at'])
+
+    @override_settings(PLATFORM_STATS_MAX_AGE=0)
+    def test_snapshot_disabled(self):
+        refresh_platform_stats()
+        User.objects.create_user(email='novo@example.com', password='x', user_type='STUDENT')
+        self.assertEqual(get_platform_stats()['total_users'], 6)
+
+    @override_settings(PLATFORM_STATS_MAX_AGE=60)
+    def test_dashboard(self):
+        refresh_platform_stats()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('users:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_students'], 3)
+
+
+CSV_HEADER = 'email,first_name,last_name,user_type,password\n'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+    """Importação em lote de usuários (import_users) a partir de um CSV pequeno."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(email='ana@example.com', password='x', first_name='Ana')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'usuarios.csv'
+        self.checkpoint = Path(f'{self.path}.checkpoint')
+
+    def write(self, *lines):
+        self.path.write_text(CSV_HEADER + ''.join(f'{line}\n' for line in lines), encoding='utf-8')
+
+    def run_command(self, *args):
+        stdout = StringIO()
+        call_command('import_users', str(self.path), '--batch-size=2', '--workers=1', *args,
+                     stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_import(self):
+        self.write(
+            'bia@example.com,Bia,Souza,professor,segredo123',
+            'bia@EXAMPLE.COM,Bia,Repetida,,',
+            'sem-arroba,X,Y,,',
+            'ana@example.com,Ana,Outra,,',
+            'caio@example.com,Caio,,ALIEN,',
+            ',Sem,Email,,',
+            'duda@example.com,Duda,,,',
+        )
+        output = self.run_command()
+
+        self.assertIn('2 usuário(s) criado(s), 2 já existente(s), 3 linha(s) inválida(s)', output)
+        self.assertIn('Linha 3: Informe um endereço de email válido.', output)
+        self.assertIn('Linha 5: tipo de usuário desconhecido: ALIEN', output)
+        self.assertIn('Linha 6: email não informado', output)
+
+        bia = User.objects.get(email='bia@example.com')
+        self.assertEqual((bia.first_name, bia.user_type), ('Bia', User.Types.PROFESSOR))
+        self.assertTrue(bia.check_password('segredo123'))
+        duda = User.objects.get(email='duda@example.com')
+        self.assertFalse(duda.has_usable_password())
+        self.assertEqual(User.objects.get(email='ana@example.com').last_name, '')
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_unusable_passwords(self):
+        self.write('bia@example.com,Bia,,,segredo123')
+        self.run_command('--unusable-passwords')
+        self.assertFalse(User.objects.get(email='bia@example.com').has_usable_password())
+
+    def test_usernames_are_unique_within_a_batch(self):
+        rows = enumerate([{'email': 'ana@outro.com'}, {'email': 'ana@terceiro.com'}, {'email': 'bia@example.com'}], 1)
+        result = import_users(rows, batch_size=10, hash_passwords=False)
+        self.assertEqual(result.created, 3)
+        usernames = dict(User.objects.values_list('email', 'username'))
+        self.assertEqual(len(set(usernames.values())), 4)
+        self.assertEqual(usernames['bia@example.com'], 'bia')
+        self.assertTrue(usernames['ana@terceiro.com'].startswith('ana-'))
+
+    def test_resume_after_a_failure(self):
+        self.write(*(f'aluno{index}@example.com,Aluno,{index},,' for index in range(1, 6)))
+
+        # O segundo lote falha: o ponto de retomada aponta para o fim do primeiro
+        with mock.patch('users.importing._insert_batch', side_effect=self.failing_insert(fail_on=2)), \
+                self.assertRaisesMessage(RuntimeError, 'falhou'):
+            self.run_command('--unusable-passwords')
+        self.assertEqual(json.loads(self.checkpoint.read_text())['last_row'], 2)
+        self.assertEqual(User.objects.filter(email__startswith='aluno').count(), 2)
+
+        output = self.run_command('--unusable-passwords', '--resume')
+        self.assertIn('Retomando após a linha 2.', output)
+        self.assertIn('3 usuário(s) criado(s), 0 já existente(s)', output)
+        self.assertEqual(User.objects.filter(email__startswith='aluno').count(), 5)
+        self.assertFalse(self.checkpoint.exists())
+
+    def failing_insert(self, fail_on):
+        calls = []
+
+        def insert(cleaned, hashed):
+            calls.append(1)
+            if len(calls) == fail_on:
+                raise RuntimeError('falhou')
+            return _insert_batch(cleaned, hashed)
+
+        return insert
+
+    def test_csv_without_email_column(self):
+        self.path.write_text('nome\nAna\n', encoding='utf-8')
+        with self.assertRaisesMessage(CommandError, 'coluna "email"'):
+            self.run_command()
@@ -5,7 +5,11 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 
+from core.pagination import KeysetPaginationMixin
+from core.routers import ReadReplicaMixin
+
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .stats import get_platform_stats
 
 User = get_user_model()
 
@@ -18,7 +22,7 @@ class AdminRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_authenticated and self.request.user.is_admin
 
 
-class DashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
+class DashboardView(LoginRequiredMixin, AdminRequiredMixin, ReadReplicaMixin, TemplateView):
     """
     View para o dashboard do administrador.
     """
@@ -27,26 +31,25 @@ class DashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Estatísticas de usuários
-        users = User.objects.all()
-        context['total_users'] = users.count()
-        context['total_admins'] = users.filter(user_type=User.Types.ADMIN).count()
-        context['total_professors'] = users.filter(user_type=User.Types.PROFESSOR).count()
-        context['total_students'] = users.filter(user_type=User.Types.STUDENT).count()
+        # Estatísticas da plataforma (snapshot recente ou agregação condicional)
+        context.update(get_platform_stats())
         
         # Usuários recentes
-        context['recent_users'] = users.order_by('-date_joined')[:5]
+        context['recent_users'] = User.objects.order_by('-date_joined')[:5]
         
         return context
 
 
-class UserListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class UserListView(LoginRequiredMixin, AdminRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View para listar todos os usuários (apenas admins podem acessar).
     """
     model = User
     template_name = 'users/user_list.html'
     context_object_name = 'users'
+    paginate_by = 25
+    keyset_ordering = ('-date_joined', '-id')
+    count_total = True
     
     def get_queryset(self):
         return User.objects.all().order_by('-date_joined')